@@ -0,0 +1,268 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+_MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plc_models.json')
+
+_DIGITS = '0123456789ABCDEF'
+
+# Size of a family an open model does not list, e.g. one added by custom device rules
+OPEN_POINTS = 65536
+
+# Special relay that is always ON, for rungs without a condition
+ALWAYS_ON = 'SM400'
+
+
+class DeviceSpaceError(ValueError):
+    """An address that does not exist on the model, is taken, or cannot be found"""
+
+
+class PlcModel:
+    """Device families of one CPU model: points and numbering radix per prefix
+
+    An ``open`` model also accepts families it does not list, numbered in
+    decimal up to OPEN_POINTS.
+    """
+
+    def __init__(self, name: str, label: str, devices: Dict[str, Tuple[int, int]], open: bool = False,
+                 always_on: str = ALWAYS_ON):
+        self.name = name
+        self.label = label
+        self.devices = devices  # prefix -> (points, radix)
+        self.open = open
+        self.always_on = always_on
+        # Longest prefix first, so a two-letter family is never read as a one-letter one
+        self._prefixes = sorted(devices, key=len, reverse=True)
+
+    def device(self, prefix: str) -> Tuple[int, int]:
+        """(points, radix) of a family; raises DeviceSpaceError if the model has none"""
+        device = self.devices.get(prefix)
+        if device is None:
+            if not self.open:
+                raise DeviceSpaceError(f"{self.label} has no {prefix} devices")
+            device = (OPEN_POINTS, 10)
+        return device
+
+    def format(self, prefix: str, number: int) -> str:
+        radix = self.device(prefix)[1]
+        if radix == 10:
+            return f'{prefix}{number}'
+        return f'{prefix}{number:o}' if radix == 8 else f'{prefix}{number:X}'
+
+    def parse(self, address: str) -> Tuple[str, int]:
+        """(prefix, number) of an address; raises DeviceSpaceError if the model has no such device"""
+        text = address.strip().upper()
+        for prefix in self._prefixes:
+            digits = text[len(prefix):]
+            if text.startswith(prefix) and digits and all(d in _DIGITS[:self.devices[prefix][1]] for d in digits):
+                number = int(digits, self.devices[prefix][1])
+                if number >= self.devices[prefix][0]:
+                    raise DeviceSpaceError(f"{address} does not exist on {self.label} ({self.span(prefix)})")
+                return prefix, number
+        prefix = text.rstrip('0123456789')
+        if prefix in self.devices and prefix != text:
+            radix = {8: 'octal', 16: 'hexadecimal'}.get(self.devices[prefix][1], 'decimal')
+            raise DeviceSpaceError(f"{address} is not a valid address on {self.label}: {prefix} devices are numbered in {radix}")
+        if self.open and prefix and prefix != text and prefix not in self.devices:
+            number = int(text[len(prefix):])
+            if number < OPEN_POINTS:
+                return prefix, number
+        raise DeviceSpaceError(f"{address} is not a device address on {self.label}")
+
+    def span(self, prefix: str) -> str:
+        return f'{self.format(prefix, 0)}-{self.format(prefix, self.device(prefix)[0] - 1)}'
+
+
+def _load_config(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_models(config: dict) -> Dict[str, PlcModel]:
+    models = {}
+    for name, entry in config.items():
+        if 'alias' in entry:
+            continue
+        devices = {
+            prefix: (int(device['points']), int(device.get('radix', 10)))
+            for prefix, device in entry['devices'].items()
+        }
+        models[name] = PlcModel(name, entry.get('label', name), devices, bool(entry.get('open')),
+                                entry.get('always_on', ALWAYS_ON))
+    for name, entry in config.items():
+        if 'alias' in entry:
+            models[name] = models[entry['alias']]
+    return models
+
+
+# Loaded once per process; PLC_MODELS_PATH points at a site-specific table
+MODELS_CONFIG = _load_config(os.environ.get('PLC_MODELS_PATH') or _MODELS_PATH)
+MODELS = _load_models(MODELS_CONFIG)
+
+
+def model_for(plc_type: str) -> PlcModel:
+    model = MODELS.get((plc_type or '').lower())
+    if model is None:
+        raise ValueError(f"Unknown plc_type {plc_type!r}; expected one of: {', '.join(MODELS)}")
+    return model
+
+
+class AllocationPlan:
+    """What a conversion may allocate: the model, reserved ranges and pinned addresses
+
+    ``reserved`` holds (prefix, first, last) number ranges no variable may
+    take; ``pinned`` maps a symbol key to the address it must get. Both are
+    checked against the model when the plan is built.
+    """
+
+    def __init__(self, model: PlcModel, reserved: Iterable[str] = (), pinned: Optional[Dict[str, str]] = None):
+        self.model = model
+        self.reserved = []
+        for entry in reserved:
+            first, _, last = str(entry).partition('-')
+            prefix, low = model.parse(first)
+            high = low
+            if last:
+                last_prefix, high = model.parse(last if not last[0].isdigit() else prefix + last)
+                if last_prefix != prefix or high < low:
+                    raise DeviceSpaceError(f"Invalid reserved range {entry!r}")
+            self.reserved.append((prefix, low, high))
+
+        self.pinned = {}
+        owners = {}
+        for key, address in (pinned or {}).items():
+            prefix, number = model.parse(address)
+            address = model.format(prefix, number)
+            if address in owners:
+                raise DeviceSpaceError(f"{address} is pinned to both {owners[address]} and {key}")
+            if any(p == prefix and low <= number <= high for p, low, high in self.reserved):
+                raise DeviceSpaceError(f"{address} pinned to {key} is in a reserved range")
+            owners[address] = key
+            self.pinned[key] = address
+
+    def allocator(self) -> 'DeviceAllocator':
+        allocator = DeviceAllocator(self.model, self.pinned)
+        for prefix, low, high in self.reserved:
+            allocator.reserve(prefix, low, high)
+        for address in self.pinned.values():
+            allocator.claim(address)
+        return allocator
+
+
+@lru_cache(maxsize=32)
+def _plan(plc_type: str, config_json: str) -> AllocationPlan:
+    config = json.loads(config_json)
+    if not isinstance(config, dict):
+        raise ValueError("options.device_allocation must be an object")
+    reserved = config.get('reserved') or []
+    pinned = config.get('pinned') or {}
+    if not isinstance(reserved, list) or not isinstance(pinned, dict):
+        raise ValueError("device_allocation.reserved must be a list and device_allocation.pinned an object")
+    return AllocationPlan(model_for(plc_type), reserved, pinned)
+
+
+def plan_for_options(plc_type: str = "mitsubishi", options: Optional[dict] = None) -> AllocationPlan:
+    """Allocation plan for a request: ``plc_type`` plus ``options["device_allocation"]``
+
+    Raises ValueError for an unknown model or an invalid range or address.
+    """
+    config = (options or {}).get('device_allocation') or {}
+    return _plan(plc_type, json.dumps(config, sort_keys=True))
+
+
+class DeviceAllocator:
+    """Used addresses as one bitset (a Python int) per device family
+
+    First-fit allocation starts at the lowest bit that may be free, so
+    allocating in sequence finds its bit at once; released bits lower that
+    mark again for reuse.
+    """
+
+    def __init__(self, model: PlcModel, pinned: Optional[Dict[str, str]] = None):
+        self.model = model
+        self.pinned = pinned or {}
+        self._pinned_addresses = set(self.pinned.values())
+        self._used: Dict[str, int] = {}
+        self._reserved: Dict[str, int] = {}
+        self._low: Dict[str, int] = {}
+
+    def allocate(self, prefix: str, key: Optional[str] = None) -> str:
+        """Lowest free address in a family, or the address pinned to ``key``
+
+        Raises DeviceSpaceError if the family is full or ``key`` is pinned
+        to an address of another family.
+        """
+        pinned = self.pinned.get(key) if key is not None else None
+        if pinned is not None:
+            if self.model.parse(pinned)[0] != prefix:
+                raise DeviceSpaceError(f"{key} is pinned to {pinned} but needs a {prefix} device")
+            return pinned
+        points = self.model.device(prefix)[0]
+        used = self._used.get(prefix, 0)
+        low = self._low.get(prefix, 0)
+        free = ~used >> low
+        number = low + (free & -free).bit_length() - 1
+        if number >= points:
+            raise DeviceSpaceError(
+                f"No free {prefix} devices left on {self.model.label}: all {points} ({self.model.span(prefix)}) are in use"
+            )
+        self._used[prefix] = used | (1 << number)
+        self._low[prefix] = number + 1
+        return self.model.format(prefix, number)
+
+    def claim(self, address: str) -> str:
+        """Take one specific address; raises DeviceSpaceError if it is in use"""
+        prefix, number = self.model.parse(address)
+        used = self._used.get(prefix, 0)
+        if used >> number & 1:
+            raise DeviceSpaceError(f"{address} is already in use")
+        self._used[prefix] = used | (1 << number)
+        return self.model.format(prefix, number)
+
+    def reserve(self, prefix: str, first: int, last: int):
+        mask = ((1 << (last - first + 1)) - 1) << first
+        self._used[prefix] = self._used.get(prefix, 0) | mask
+        self._reserved[prefix] = self._reserved.get(prefix, 0) | mask
+
+    def release(self, address: str):
+        """Free an address for reuse; pinned and reserved addresses stay taken"""
+        if address in self._pinned_addresses:
+            return
+        try:
+            prefix, number = self.model.parse(address)
+        except DeviceSpaceError:
+            return
+        if self._reserved.get(prefix, 0) >> number & 1:
+            return
+        self._used[prefix] = self._used.get(prefix, 0) & ~(1 << number)
+        self._low[prefix] = min(self._low.get(prefix, 0), number)
+
+    def usage(self) -> Dict[str, dict]:
+        """Per family in use: points, used, reserved, free and fragmentation
+
+        ``largest_free_block`` is the longest run of consecutive free
+        addresses; ``fragmentation`` is the share of free addresses outside
+        it, 0 when the free space is one block.
+        """
+        report = {}
+        for prefix, used in self._used.items():
+            if not used:
+                continue
+            points = self.model.device(prefix)[0]
+            reserved = bin(self._reserved.get(prefix, 0)).count('1')
+            taken = bin(used).count('1')
+            free = points - taken
+            # Free runs are the runs of zeros in the bitset, padded to the family size
+            bits = format(used, 'b').zfill(points)[::-1]
+            largest = max((len(run) for run in bits.split('1')), default=0)
+            report[prefix] = {
+                'range': self.model.span(prefix),
+                'points': points,
+                'used': taken - reserved,
+                'reserved': reserved,
+                'free': free,
+                'largest_free_block': largest,
+                'fragmentation': round(1 - largest / free, 4) if free else 0.0
+            }
+        return report
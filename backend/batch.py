@@ -0,0 +1,241 @@
+"""Whole-project conversion: many ST files, one shared device namespace
+
+Files are converted independently in parallel, then merged in file order:
+a variable name gets the same device in every file that uses it, and
+addresses never collide across files. Run without a server:
+
+    python batch.py project/ extra.st project.zip -o report.json
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from allocator import DeviceSpaceError, plan_for_options
+from converter import SimpleLadderConverter
+from device_rules import load_rules_file, rules_for_options
+from diagnostics import DEVICE_SPACE, ERROR, Diagnostic, is_failure, payload as diagnostics_payload
+from profiling import Timings
+from st_parser import parse_source
+from symbols import build_device_map
+from upload import SourceDecoder
+
+ST_SUFFIXES = ('.st', '.txt')
+
+
+def expand_archive(name: str, data: bytes) -> List[Tuple[str, bytes]]:
+    """Return (name, bytes) for a file, or for each ST file inside a zip
+
+    Archive members are named ``name/member`` and come out sorted, so the
+    device allocation order does not depend on how the zip was built.
+    """
+    if not zipfile.is_zipfile(io.BytesIO(data)):
+        return [(name or 'upload.st', data)]
+    prefix = f'{name}/' if name else ''
+    files = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in sorted(archive.infolist(), key=lambda info: info.filename):
+            if not info.is_dir() and info.filename.lower().endswith(ST_SUFFIXES):
+                files.append((prefix + info.filename, archive.read(info)))
+    return files
+
+
+def decode_source(data: bytes, encoding: Optional[str] = None) -> str:
+    return SourceDecoder(encoding).decode(data, final=True)
+
+
+def convert_file(name: str, source_code: str, plc_type: str = "mitsubishi", options: Optional[dict] = None) -> dict:
+    """Convert one file with its own converter; addresses are file-local"""
+    timings = Timings()
+    start = time.perf_counter()
+    with timings.phase('parse'):
+        unit, parse_errors, parse_warnings = parse_source(source_code, timings)
+    parsed = time.perf_counter()
+    converter = SimpleLadderConverter(rules_for_options(options), timings)
+    with timings.phase('declarations'):
+        pous = converter.declare(unit, parse_errors, parse_warnings)
+    with timings.phase('logic'):
+        rungs = list(converter.iter_pou_rungs(pous))
+    return {
+        'name': name,
+        'rungs': rungs,
+        'variable_map': converter.symbols.addresses(),
+        'device_info': {device['device_address']: device for device in converter.device_list()},
+        'errors': converter.errors,
+        'warnings': converter.warnings,
+        'parse_time': parsed - start,
+        'convert_time': time.perf_counter() - parsed,
+        'timings': timings
+    }
+
+
+def convert_files(files: List[Tuple[str, str]], plc_type: str = "mitsubishi",
+                  options: Optional[dict] = None) -> List[dict]:
+    """convert_file over a share of the project, as one worker job"""
+    return [convert_file(name, source, plc_type, options) for name, source in files]
+
+
+def split_jobs(files: List[Tuple[str, str]], jobs: int) -> List[List[Tuple[int, str, str]]]:
+    """Deal files round-robin into at most ``jobs`` lists, keeping their index"""
+    shares = [[] for _ in range(max(1, min(jobs, len(files))))]
+    for index, (name, source) in enumerate(files):
+        shares[index % len(shares)].append((index, name, source))
+    return shares
+
+
+def run_share(share: List[Tuple[int, str, str]], plc_type: str = "mitsubishi",
+              options: Optional[dict] = None) -> List[Tuple[int, dict]]:
+    results = convert_files([(name, source) for _, name, source in share], plc_type, options)
+    return [(index, result) for (index, _, _), result in zip(share, results)]
+
+
+def merge_results(results: Iterable[dict], plc_type: str = "mitsubishi", options: Optional[dict] = None) -> dict:
+    """Re-address every file into one namespace and build the combined report
+
+    Results must be in file order; the first file to mention a variable
+    decides its device, so the merge is deterministic regardless of which
+    worker finished first. Files are converted with decimal addresses;
+    the merge allocates the final ones on the ``plc_type`` model.
+    """
+    devices = plan_for_options(plc_type, options).allocator()
+    variable_map = {}
+    device_info = {}
+    files = []
+    errors = []
+    warnings = []
+
+    for result in results:
+        remap = {}
+        unallocated = set()  # Local addresses of variables the model has no room for
+        file_errors = list(result['errors'])
+        for var_name, local_addr in result['variable_map'].items():
+            if var_name not in variable_map:
+                try:
+                    variable_map[var_name] = devices.allocate(local_addr.rstrip('0123456789'), var_name)
+                except DeviceSpaceError as e:
+                    unallocated.add(local_addr)
+                    file_errors.append(Diagnostic(ERROR, DEVICE_SPACE, f"{e}; rungs using it were skipped", None, var_name))
+                    continue
+                info = result['device_info'].get(local_addr)
+                if info is not None:
+                    device_info[variable_map[var_name]] = info
+            remap[local_addr] = variable_map[var_name]
+
+        kept = [rung for rung in result['rungs'] if not (unallocated and rung.addresses() & unallocated)]
+        rungs = [rung.remap(remap).to_dict() for rung in kept]
+
+        errors.extend(f"{result['name']}: {message}" for message in file_errors)
+        warnings.extend(f"{result['name']}: {message}" for message in result['warnings'])
+        files.append({
+            'name': result['name'],
+            'success': not is_failure(len(kept), file_errors),
+            'rung_count': len(kept),
+            'ladder_data': {'rungs': rungs},
+            **diagnostics_payload(file_errors, result['warnings']),
+            'parse_time': result['parse_time'],
+            'convert_time': result['convert_time']
+        })
+
+    return {
+        'success': all(entry['success'] for entry in files),
+        'metadata': {
+            'plc_type': plc_type,
+            'generated_at': datetime.now().isoformat()
+        },
+        'files': files,
+        'device_map': build_device_map(variable_map),
+        'device_list': [
+            {
+                'device_address': device_addr,
+                'variable_name': info['variable_name'],
+                'device_type': info['device_type']
+            }
+            for device_addr, info in device_info.items()
+        ],
+        'device_usage': devices.usage(),
+        'errors': errors,
+        'warnings': warnings,
+        'summary': {
+            'file_count': len(files),
+            'rung_count': sum(entry['rung_count'] for entry in files),
+            'device_count': len(variable_map),
+            'parse_time': sum(entry['parse_time'] for entry in files),
+            'convert_time': sum(entry['convert_time'] for entry in files)
+        }
+    }
+
+
+def convert_batch(files: List[Tuple[str, str]], plc_type: str = "mitsubishi",
+                  max_workers: Optional[int] = None, options: Optional[dict] = None) -> dict:
+    """Convert a project in local worker processes and merge the results"""
+    start = time.perf_counter()
+    workers = max_workers or os.cpu_count() or 1
+    shares = split_jobs(files, workers)
+    if len(shares) == 1:
+        indexed = run_share(shares[0], plc_type, options)
+    else:
+        with ProcessPoolExecutor(max_workers=len(shares)) as pool:
+            indexed = [item for part in pool.map(run_share, shares, [plc_type] * len(shares), [options] * len(shares)) for item in part]
+    indexed.sort(key=lambda item: item[0])
+    report = merge_results((result for _, result in indexed), plc_type, options)
+    report['summary']['workers'] = len(shares)
+    report['summary']['wall_time'] = time.perf_counter() - start
+    return report
+
+
+def _collect(paths: List[str]) -> List[Tuple[str, bytes]]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.lower().endswith(ST_SUFFIXES):
+                        full_path = os.path.join(root, name)
+                        with open(full_path, 'rb') as f:
+                            files.append((os.path.relpath(full_path, path), f.read()))
+        else:
+            with open(path, 'rb') as f:
+                files.extend(expand_archive(os.path.basename(path), f.read()))
+    return files
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert a whole ST project to ladder without the server")
+    parser.add_argument('paths', nargs='+', help=".st files, directories or zip archives")
+    parser.add_argument('-o', '--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--plc-type', default='mitsubishi')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--encoding', default=None, help="Source encoding (default: detect UTF-8 / Shift-JIS)")
+    parser.add_argument('--rules', default=None, help="Device classification rules (JSON or YAML)")
+    args = parser.parse_args(argv)
+
+    options = {'device_rules': load_rules_file(args.rules)} if args.rules else None
+
+    files = [(name, decode_source(data, args.encoding)) for name, data in _collect(args.paths)]
+    if not files:
+        print("No ST files found", file=sys.stderr)
+        return 1
+
+    report = convert_batch(files, args.plc_type, args.workers, options)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    summary = report['summary']
+    print(f"{summary['file_count']} files, {summary['rung_count']} rungs, {summary['device_count']} devices "
+          f"in {summary['wall_time']:.2f}s ({summary['workers']} workers)", file=sys.stderr)
+    return 0 if report['success'] else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Device allocator benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_allocator.py
+    python benchmarks/bench_allocator.py --plc-type fx5u --churn 20000
+
+Fills each device family of a PLC model to --fill of its capacity with
+first-fit allocations, then frees and reallocates random addresses
+(--churn times), as a live session does while variables come and go.
+Prints the time per operation and the usage report at the end.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from allocator import plan_for_options  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark device allocation")
+    parser.add_argument('--plc-type', default='mitsubishi')
+    parser.add_argument('--fill', type=float, default=0.9, help="Share of each family to allocate")
+    parser.add_argument('--churn', type=int, default=10000, help="Release/allocate pairs after filling")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    plan = plan_for_options(args.plc_type)
+    allocator = plan.allocator()
+    rng = random.Random(args.seed)
+    print(f"{'family':<8} {'points':>8} {'allocate':>12} {'churn':>12}")
+    for prefix, (points, _) in plan.model.devices.items():
+        count = int(points * args.fill)
+        start = time.perf_counter()
+        addresses = [allocator.allocate(prefix) for _ in range(count)]
+        filled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.churn):
+            index = rng.randrange(count)
+            allocator.release(addresses[index])
+            addresses[index] = allocator.allocate(prefix)
+        churned = time.perf_counter() - start
+        print(f"{prefix:<8} {points:>8} {filled / count * 1e6:>10.2f}us {churned / max(args.churn, 1) * 1e6:>10.2f}us")
+
+    print()
+    for prefix, usage in allocator.usage().items():
+        print(f"{prefix:<8} {usage}")
+
+
+if __name__ == '__main__':
+    main()
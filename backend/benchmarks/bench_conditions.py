@@ -0,0 +1,78 @@
+"""Condition compiler benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_conditions.py
+    python benchmarks/bench_conditions.py ../sample-test.st project.st
+
+Converts each program twice: with conditions.ConditionCompiler and with
+the compiler's simplifications off (AND/OR/NOT translated one to one, NOT
+pushed down to normally-closed contacts). Prints rungs, contacts and the
+Mitsubishi instruction-list steps a PLC scans per cycle for both, and the
+conversion time, then the compiled program again with each fan-out mode.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from conditions import ConditionCompiler  # noqa: E402
+from converter import FAN_OUT_MODES, SimpleLadderConverter  # noqa: E402
+from corpus import generate_program  # noqa: E402
+from ladder import contact_count, instruction_count, rungs_to_json  # noqa: E402
+from st_parser import parse_source  # noqa: E402
+
+DEFAULT_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'sample_warehouse.st')
+
+
+def convert(unit, simplify: bool, fan_out=None):
+    converter = SimpleLadderConverter(fan_out=fan_out)
+    converter.conditions = ConditionCompiler(simplify=simplify)
+    start = time.perf_counter()
+    rungs = list(converter.iter_rungs(unit))
+    return rungs, time.perf_counter() - start
+
+
+def measure(unit, simplify: bool, fan_out=None) -> dict:
+    rungs, elapsed = convert(unit, simplify, fan_out)
+    for _ in range(4):
+        elapsed = min(elapsed, convert(unit, simplify, fan_out)[1])
+    return {
+        'rungs': len(rungs),
+        'contacts': sum(contact_count(rung.contacts) for rung in rungs),
+        'steps': sum(instruction_count(rung) for rung in rungs),
+        'bytes': len(rungs_to_json(rungs).encode('utf-8')),
+        'time': elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the condition compiler")
+    parser.add_argument('files', nargs='*', default=[DEFAULT_FILE])
+    parser.add_argument('--corpus', type=int, default=100, help="Also run a generated program with this many stations (0 to skip)")
+    args = parser.parse_args()
+
+    programs = [(os.path.basename(path), open(path, encoding='utf-8').read()) for path in args.files]
+    if args.corpus:
+        programs.append((f'corpus-{args.corpus}', generate_program(args.corpus)))
+
+    print(f"{'program':<22} {'':<10} {'rungs':>7} {'contacts':>9} {'steps':>8} {'bytes':>9} {'time':>9}")
+    for name, source in programs:
+        unit, _, _ = parse_source(source)
+        plain = measure(unit, False)
+        compiled = measure(unit, True)
+        rows = [('plain', plain), ('compiled', compiled)]
+        rows += [(f'+{mode}', measure(unit, True, mode)) for mode in FAN_OUT_MODES]
+        for label, row in rows:
+            print(f"{name:<22} {label:<10} {row['rungs']:>7} {row['contacts']:>9} {row['steps']:>8} "
+                  f"{row['bytes']:>9} {row['time'] * 1000:>7.2f}ms")
+        print(f"{'':<22} {'reduction':<10} {1 - compiled['rungs'] / plain['rungs']:>7.0%} "
+              f"{1 - compiled['contacts'] / plain['contacts']:>9.0%} {1 - compiled['steps'] / plain['steps']:>8.0%} "
+              f"{1 - compiled['bytes'] / plain['bytes']:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Instruction list export round-trip benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py ../sample_warehouse.st --corpus 1000
+
+Converts each program, exports it as an instruction list, reads the list
+back into rungs and compares them with the originals (descriptions aside,
+as an instruction list carries none). Prints the export and re-read
+speed, the output size, whether the step count matches
+ladder.instruction_count, whether every rung survived the round trip,
+and the peak memory of a streaming export to a null sink. The export
+itself holds one rung at a time; the peak is mostly the parsed program.
+Exits 1 when a step count or a rung does not match.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from corpus import generate_program  # noqa: E402
+from converter import SimpleLadderConverter  # noqa: E402
+from export import export_source, instruction_list, parse_instruction_list, read_instructions  # noqa: E402
+from ladder import Rung, instruction_count  # noqa: E402
+from st_parser import parse_source  # noqa: E402
+
+DEFAULT_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', '..', '*.st')))
+
+
+def bare(rung: Rung) -> Rung:
+    """The rung without descriptions"""
+    coils = tuple(value if i % 2 == 0 else '' for i, value in enumerate(rung.coils))
+    return Rung(_bare_contacts(rung.contacts), rung.coil_address, '', coils)
+
+
+def _bare_contacts(contacts: tuple) -> tuple:
+    out = ()
+    for i in range(0, len(contacts), 3):
+        if contacts[i] is None:
+            out += (None, tuple(_bare_contacts(branch) for branch in contacts[i + 1]), None)
+        else:
+            out += (contacts[i], '', contacts[i + 2])
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the instruction list export round trip")
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES)
+    parser.add_argument('--corpus', type=int, default=300, help="Also run a generated program with this many stations (0 to skip)")
+    args = parser.parse_args()
+
+    programs = [(os.path.basename(path), open(path, encoding='utf-8').read()) for path in args.files]
+    if args.corpus:
+        programs.append((f'corpus-{args.corpus}', generate_program(args.corpus)))
+
+    print(f"{'program':<22} {'rungs':>6} {'steps':>7} {'bytes':>9} {'export':>12} {'re-read':>12} "
+          f"{'steps ok':>9} {'round trip':>11} {'peak':>9}")
+    failed = False
+    for name, source in programs:
+        unit, parse_errors, parse_warnings = parse_source(source)
+        rungs = list(SimpleLadderConverter().iter_rungs(unit, parse_errors, parse_warnings))
+
+        start = time.perf_counter()
+        text = ''.join(instruction_list(rungs))
+        exported = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read = list(read_instructions(parse_instruction_list(text.splitlines())))
+        reread = time.perf_counter() - start
+
+        steps = text.count('\n') - 1  # without END
+        steps_ok = steps == sum(instruction_count(rung) for rung in rungs)
+        same = len(read) == len(rungs) and all(a == bare(b) for a, b in zip(read, rungs))
+        failed = failed or not (steps_ok and same)
+
+        tracemalloc.start()
+        for _ in export_source(SimpleLadderConverter(), source):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{name:<22} {len(rungs):>6} {steps:>7} {len(text.encode('utf-8')):>9} "
+              f"{steps / exported:>8.0f}st/s {len(read) / reread:>8.0f}rg/s "
+              f"{'yes' if steps_ok else 'NO':>9} {'yes' if same else 'NO':>11} {peak / 1024:>7.0f}KB")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
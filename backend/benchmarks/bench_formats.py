@@ -0,0 +1,64 @@
+"""Response format benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_formats.py
+    python benchmarks/bench_formats.py ../sample-test.st project.st --corpus 300
+
+Converts each program once and encodes the /api/convert response in every
+representation the server negotiates: JSON and MessagePack with the
+string table, each plain, gzip and (when the brotli package is installed)
+br. Prints the body size, its ratio to plain JSON, the encode time, and the
+transfer time at --mbps, the plant-floor link speed.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from corpus import generate_program  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+from response_formats import JSON_TYPE, MSGPACK_TYPE, brotli, encode_response, variant  # noqa: E402
+
+DEFAULT_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'sample_warehouse.st')
+
+
+def response_payload(client: TestClient, source: str) -> bytes:
+    response = client.post('/api/convert', json={'source_code': source}, headers={'Accept-Encoding': 'identity'})
+    response.raise_for_status()
+    return response.content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response encodings")
+    parser.add_argument('files', nargs='*', default=[DEFAULT_FILE])
+    parser.add_argument('--corpus', type=int, default=300, help="Also run a generated program with this many stations (0 to skip)")
+    parser.add_argument('--mbps', type=float, default=2.0, help="Link speed for the transfer-time column")
+    args = parser.parse_args()
+
+    programs = [(os.path.basename(path), open(path, encoding='utf-8').read()) for path in args.files]
+    if args.corpus:
+        programs.append((f'corpus-{args.corpus}', generate_program(args.corpus)))
+
+    codings = [None, 'gzip'] + (['br'] if brotli is not None else [])
+    client = TestClient(app)
+    print(f"{'program':<22} {'format':<14} {'bytes':>10} {'ratio':>7} {'encode':>9} {'transfer':>10}")
+    for name, source in programs:
+        payload = response_payload(client, source)
+        for media_type in (JSON_TYPE, MSGPACK_TYPE):
+            for coding in codings:
+                start = time.perf_counter()
+                body = encode_response(payload, media_type, coding)
+                elapsed = time.perf_counter() - start
+                transfer = len(body) * 8 / (args.mbps * 1e6)
+                print(f"{name:<22} {variant(media_type, coding):<14} {len(body):>10} {len(body) / len(payload):>7.1%} "
+                      f"{elapsed * 1000:>7.2f}ms {transfer * 1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
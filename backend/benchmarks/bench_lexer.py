@@ -0,0 +1,66 @@
+"""Lexer scaling benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_lexer.py
+
+Tokenizes a synthetic program at doubling sizes, in one pass and fed to the
+streaming tokenizer in 64KB chunks, and prints throughput. The per-MB time
+should stay flat as the input grows.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lexer import StreamTokenizer, tokenize  # noqa: E402
+
+BLOCK = '''(* ステーション {n} *)
+FUNCTION_BLOCK Station{n}
+VAR
+    Sensor{n} : BOOL; // 入力
+    Motor{n} : BOOL;
+END_VAR
+IF Sensor{n} AND NOT Stop THEN
+    Motor{n} := TRUE; ;モーター起動
+END_IF;
+END_FUNCTION_BLOCK
+'''
+
+
+def make_source(blocks: int) -> str:
+    body = ''.join(BLOCK.format(n=n) for n in range(blocks))
+    return body + 'PROGRAM Main\nVAR\n    Stop : BOOL;\nEND_VAR\nEND_PROGRAM\n'
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stream_tokens(source: str, chunk_size: int = 64 * 1024) -> int:
+    tokenizer = StreamTokenizer()
+    count = 0
+    for start in range(0, len(source), chunk_size):
+        count += len(tokenizer.feed(source[start:start + chunk_size]))
+    return count + len(tokenizer.close())
+
+
+def main():
+    print(f"{'size':>10} {'tokenize':>10} {'s/MB':>8} {'stream':>9} {'s/MB':>8}")
+    for blocks in (500, 1000, 2000, 4000, 8000):
+        source = make_source(blocks)
+        megabytes = len(source.encode('utf-8')) / 1e6
+        lex_time = best_of(lambda: sum(1 for _ in tokenize(source)))
+        stream_time = best_of(lambda: stream_tokens(source))
+        print(f"{megabytes:>8.2f}MB {lex_time:>9.3f}s {lex_time / megabytes:>8.3f} "
+              f"{stream_time:>8.3f}s {stream_time / megabytes:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Parallel POU conversion benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_parallel.py
+    python benchmarks/bench_parallel.py --blocks 96 --stations-per-block 20
+
+Converts a generated project with many function blocks serially
+(converter.run_conversion) and with parallel.convert_parallel at several
+worker counts, checks that every parallel result equals the serial one,
+and prints the wall time and speedup.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import st_parser  # noqa: E402
+from converter import run_conversion  # noqa: E402
+from corpus import generate_project  # noqa: E402
+from parallel import convert_parallel  # noqa: E402
+
+
+def comparable(result: dict) -> dict:
+    result = dict(result, metadata=dict(result['metadata']))
+    del result['metadata']['generated_at']
+    del result['timings']
+    return result
+
+
+def timed(fn):
+    best = float('inf')
+    result = None
+    for _ in range(3):
+        st_parser._ast_cache.clear()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel POU conversion")
+    parser.add_argument('--blocks', type=int, default=48)
+    parser.add_argument('--stations-per-block', type=int, default=10)
+    parser.add_argument('--workers', type=int, nargs='+')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({2, 4, cores} & set(range(2, cores + 1))) or [2]
+
+    source = generate_project(args.blocks, args.stations_per_block)
+    serial_time, serial = timed(lambda: run_conversion(source))
+    print(f"{args.blocks} blocks, {source.count(chr(10))} lines, {serial['rung_count']} rungs, {cores} cores")
+    print(f"{'workers':>8} {'time':>8} {'speedup':>8}")
+    print(f"{'serial':>8} {serial_time:>7.3f}s {1.0:>7.2f}x")
+
+    for count in workers:
+        elapsed, result = timed(lambda: convert_parallel(source, max_workers=count))
+        assert comparable(result) == comparable(serial), f"{count} workers: output differs from serial run"
+        print(f"{count:>8} {elapsed:>7.3f}s {serial_time / elapsed:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Rung representation benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_rungs.py
+
+Converts programs with up to ~400k contacts and compares the compact Rung
+objects serialized by ladder.rungs_to_json with element dicts validated and
+dumped through ConversionResponse. Reports the time to build the rungs, the
+memory they hold, and serialization time and throughput.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pydantic import BaseModel  # noqa: E402
+
+from converter import SimpleLadderConverter  # noqa: E402
+from ladder import contact_count, rungs_to_json  # noqa: E402
+from st_parser import parse_source  # noqa: E402
+
+BLOCK = '''IF Sensor{n} AND NOT Stop AND Ready{m} AND Auto THEN
+    Motor{n} := Start{m} AND NOT Fault{n};
+    Lamp{m} := TRUE;
+END_IF;
+'''
+
+
+class ConversionResponse(BaseModel):
+    # Same shape as main.ConversionResponse, without importing the app
+    success: bool
+    ladder_data: dict
+    device_map: dict
+    device_list: List[dict]
+    errors: List[str]
+    warnings: List[str]
+    processing_time: float
+
+
+def make_source(blocks: int) -> str:
+    body = ''.join(BLOCK.format(n=n, m=n % 97) for n in range(blocks))
+    return f'PROGRAM Main\n{body}END_PROGRAM\n'
+
+
+def timed(fn) -> float:
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained_mb(fn) -> float:
+    """Memory still allocated by fn's result, measured with tracemalloc"""
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Also keeps the result alive until it has been measured
+    assert result, "fn built no rungs"
+    return current / 1e6
+
+
+def build_dicts(unit):
+    return [rung.to_dict() for rung in SimpleLadderConverter().iter_rungs(unit)]
+
+
+def build_compact(unit):
+    return list(SimpleLadderConverter().iter_rungs(unit))
+
+
+def check_clean(unit):
+    converter = SimpleLadderConverter()
+    list(converter.iter_rungs(unit))
+    if converter.errors:
+        raise SystemExit(f"Conversion reported {len(converter.errors)} errors, first: {converter.errors[0]}")
+
+
+def serialize_dicts(rungs):
+    response = ConversionResponse(
+        success=True, ladder_data={'rungs': rungs}, device_map={}, device_list=[],
+        errors=[], warnings=[], processing_time=0.0
+    )
+    return response.model_dump_json()
+
+
+def main():
+    print(f"{'contacts':>9} {'':>8} {'build':>8} {'memory':>9} {'serialize':>10} {'MB/s':>7}")
+    for blocks in (5000, 10000, 20000, 40000):
+        unit, _, _ = parse_source(make_source(blocks))
+        check_clean(unit)
+        dicts = build_dicts(unit)
+        compact = build_compact(unit)
+        assert json.loads(rungs_to_json(compact)) == dicts
+
+        contacts = sum(contact_count(rung.contacts) for rung in compact)
+        size_mb = len(rungs_to_json(compact).encode('utf-8')) / 1e6
+        for label, build, serialize, rungs in (
+            ('dicts', build_dicts, serialize_dicts, dicts),
+            ('compact', build_compact, rungs_to_json, compact),
+        ):
+            build_time = timed(lambda: build(unit))
+            memory = retained_mb(lambda: build(unit))
+            serialize_time = timed(lambda: serialize(rungs))
+            print(f"{contacts:>9} {label:>8} {build_time:>7.3f}s {memory:>7.1f}MB "
+                  f"{serialize_time:>9.3f}s {size_mb / serialize_time:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
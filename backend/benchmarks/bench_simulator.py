@@ -0,0 +1,51 @@
+"""Ladder simulator benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_simulator.py
+    python benchmarks/bench_simulator.py ../sample-test.st --vectors 4096 65536 1048576
+
+Runs simulator.differential_test on each program at several batch sizes
+and prints the scan cycles simulated per second (input vectors times
+scans, ladder and ST together), the rung evaluations per second, and
+whether the ladder matched the ST.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from corpus import generate_program  # noqa: E402
+from simulator import differential_test  # noqa: E402
+
+DEFAULT_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'sample_warehouse.st')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ladder simulator")
+    parser.add_argument('files', nargs='*', default=[DEFAULT_FILE])
+    parser.add_argument('--vectors', type=int, nargs='+', default=[4096, 65536, 1048576])
+    parser.add_argument('--scans', type=int, default=4)
+    parser.add_argument('--corpus', type=int, default=20, help="Also run a generated program with this many stations (0 to skip)")
+    args = parser.parse_args()
+
+    programs = [(os.path.basename(path), open(path, encoding='utf-8').read()) for path in args.files]
+    if args.corpus:
+        programs.append((f'corpus-{args.corpus}', generate_program(args.corpus)))
+
+    print(f"{'program':<22} {'rungs':>6} {'vectors':>9} {'scans/s':>12} {'rungs/s':>12} {'result':>10}")
+    for name, source in programs:
+        for vectors in args.vectors:
+            # Keep simulating after a mismatch so every size measures the same work
+            report = differential_test(source, vectors, args.scans, stop_at_mismatch=False)
+            scans = report['scans']
+            result = 'equal' if report['equivalent'] else f"differs@{report['mismatch']['scan']}"
+            print(f"{name:<22} {report['rungs']:>6} {report['vectors']:>9} "
+                  f"{report['scan_evaluations_per_second']:>12.3g} {report['rung_evaluations_per_second']:>12.3g} "
+                  f"{result:>10}  ({scans} scans)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Cold start benchmark
+
+Run from the backend directory:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10
+
+Starts a fresh interpreter per run, with and without the startup warm-up
+(STARTUP_WARMUP), and measures the app import, the lifespan startup and
+the first and second /api/convert of sample_warehouse.st through the test
+client. Prints the median of each over --runs.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE = os.path.join(BACKEND, '..', 'sample_warehouse.st')
+
+_CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+from fastapi.testclient import TestClient
+source = open(sys.argv[1], encoding='utf-8').read()
+with TestClient(main.app) as client:
+    started = time.perf_counter() - start - imported
+    latencies = []
+    for i in range(2):
+        begin = time.perf_counter()
+        client.post('/api/convert', json={'source_code': source + chr(10) * i})
+        latencies.append(time.perf_counter() - begin)
+print(json.dumps([imported, started] + latencies))
+'''
+
+
+def run(warmup: bool) -> list:
+    env = {**os.environ, 'STARTUP_WARMUP': '1' if warmup else '0'}
+    output = subprocess.run([sys.executable, '-c', _CHILD, SAMPLE], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend cold start")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'warm-up':<8} {'import':>10} {'startup':>10} {'first':>10} {'second':>10}")
+    for warmup in (False, True):
+        samples = [run(warmup) for _ in range(args.runs)]
+        medians = [statistics.median(column) for column in zip(*samples)]
+        print(f"{'on' if warmup else 'off':<8} " + ' '.join(f"{value * 1000:>8.1f}ms" for value in medians))
+
+
+if __name__ == '__main__':
+    main()
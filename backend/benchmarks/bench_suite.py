@@ -0,0 +1,220 @@
+"""Converter benchmark suite
+
+Run from the backend directory:
+
+    python benchmarks/bench_suite.py -o results.json
+    python benchmarks/bench_suite.py --baseline results.json --threshold 0.2
+
+Converts generated programs (see corpus.py) at several sizes and records
+convert() throughput, time per phase, peak memory and /api/convert latency
+as JSON. With --baseline, every metric is compared with a previous run and
+the exit status is 1 when any of them got slower or bigger than the
+threshold allows.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Every API request must reach the converter, not the result cache
+os.environ['RESULT_CACHE_SIZE'] = '0'
+os.environ.pop('RESULT_CACHE_PATH', None)
+
+import st_parser  # noqa: E402
+from converter import CONVERTER_VERSION, SimpleLadderConverter  # noqa: E402
+from corpus import PRESETS, generate_program  # noqa: E402
+from ladder import rungs_to_json  # noqa: E402
+from lexer import tokenize  # noqa: E402
+
+# Differences below these are noise, whatever the ratio
+_ABSOLUTE_FLOOR = {'_s': 0.002, '_ms': 2.0, '_mb': 0.5}
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_phases(source: str, repeat: int) -> dict:
+    """Best time of each pipeline phase, run in isolation"""
+    tokens = list(tokenize(source))
+    unit = st_parser.STParser(tokens).parse()
+
+    def logic():
+        converter = SimpleLadderConverter()
+        return list(converter.iter_pou_rungs(converter.declare(unit)))
+
+    converter = SimpleLadderConverter()
+    rungs = list(converter.iter_pou_rungs(converter.declare(unit)))
+    return {
+        'tokenize_s': best_of(lambda: list(tokenize(source)), repeat),
+        'parse_s': best_of(lambda: st_parser.STParser(tokens).parse(), repeat),
+        'declarations_s': best_of(lambda: SimpleLadderConverter().declare(unit), repeat),
+        # iter_pou_rungs needs declared devices, so this one includes declare()
+        'logic_s': best_of(logic, repeat) - best_of(lambda: SimpleLadderConverter().declare(unit), repeat),
+        'device_list_s': best_of(converter.device_list, repeat),
+        'serialize_s': best_of(lambda: rungs_to_json(rungs), repeat),
+    }
+
+
+def convert_uncached(source: str):
+    st_parser._ast_cache.clear()
+    converter = SimpleLadderConverter()
+    result = converter.convert(source)
+    if converter.errors:
+        # A benchmark of a conversion that dropped statements measures the wrong thing
+        raise SystemExit(f"Conversion reported {len(converter.errors)} errors, first: {converter.errors[0]}")
+    return result
+
+
+def measure_api(sources: dict, requests: int) -> dict:
+    """/api/convert latency through the real app, worker pool included"""
+    from fastapi.testclient import TestClient
+    import main
+
+    latencies = {}
+    with TestClient(main.app) as client:
+        client.post('/api/convert', json={'source_code': 'X := Y;'})  # start the workers
+        for name, source in sources.items():
+            samples = []
+            for i in range(requests):
+                # A distinct comment defeats the AST cache in the worker
+                body = {'source_code': f'{source}\n(* run {i} *)\n'}
+                start = time.perf_counter()
+                response = client.post('/api/convert', json=body)
+                samples.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+            samples.sort()
+            latencies[name] = {
+                'p50_ms': statistics.median(samples),
+                'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                'mean_ms': statistics.mean(samples),
+            }
+    return latencies
+
+
+def run_suite(sizes, repeat: int, api_requests: int, seed: int) -> dict:
+    results = {}
+    sources = {}
+    for name in sizes:
+        source = generate_program(PRESETS[name], seed)
+        sources[name] = source
+        megabytes = len(source.encode('utf-8')) / 1e6
+        lines = source.count('\n')
+
+        ladder_data, _, device_list = convert_uncached(source)
+        convert_s = best_of(lambda: convert_uncached(source), repeat)
+
+        tracemalloc.start()
+        convert_uncached(source)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            'stations': PRESETS[name],
+            'lines': lines,
+            'bytes': len(source.encode('utf-8')),
+            'rungs': len(ladder_data['rungs']),
+            'devices': len(device_list),
+            'convert_s': convert_s,
+            'lines_per_s': lines / convert_s,
+            'mb_per_s': megabytes / convert_s,
+            'peak_memory_mb': peak / 1e6,
+            'phases': measure_phases(source, repeat),
+        }
+        print(f"{name:>8}: {lines} lines, {results[name]['rungs']} rungs, {convert_s:.3f}s "
+              f"({results[name]['lines_per_s']:.0f} lines/s), peak {results[name]['peak_memory_mb']:.1f}MB",
+              file=sys.stderr)
+
+    if api_requests:
+        for name, latency in measure_api(sources, api_requests).items():
+            results[name]['api'] = latency
+            print(f"{name:>8}: /api/convert p50 {latency['p50_ms']:.1f}ms p95 {latency['p95_ms']:.1f}ms",
+                  file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'converter_version': CONVERTER_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def _flatten(metrics: dict, prefix: str = '') -> dict:
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        elif key.endswith(tuple(_ABSOLUTE_FLOOR)) and '_per_' not in key:  # throughputs grow when faster
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Metrics that grew by more than threshold (a fraction) over the baseline"""
+    regressions = []
+    for name, metrics in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        old = _flatten(previous)
+        for metric, value in _flatten(metrics).items():
+            if metric not in old or old[metric] <= 0:
+                continue
+            floor = next(limit for suffix, limit in _ABSOLUTE_FLOOR.items() if metric.endswith(suffix))
+            if value > old[metric] * (1 + threshold) and value - old[metric] > floor:
+                regressions.append((name, metric, old[metric], value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ST to ladder converter")
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium', 'large'], choices=sorted(PRESETS))
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the best is kept")
+    parser.add_argument('--api-requests', type=int, default=5, help="Requests per size, 0 to skip the API")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="Write results JSON here")
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.repeat, args.api_requests, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name} {metric}: {old:.4g} -> {new:.4g} (+{(new / old - 1) * 100:.0f}%)",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
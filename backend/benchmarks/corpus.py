@@ -0,0 +1,223 @@
+"""Synthetic ST corpus generator
+
+Run from the backend directory:
+
+    python benchmarks/corpus.py --stations 200 -o /tmp/line.st
+    python benchmarks/corpus.py --out-dir /tmp/corpus   # every preset
+    python benchmarks/corpus.py --blocks 48 -o /tmp/project.st
+
+Programs look like the plant code we convert: a VAR_GLOBAL block of shared
+signals, one FUNCTION_BLOCK per station type, and a main PROGRAM that
+sequences every station with nested IF/ELSIF and CASE, timers, and Japanese
+comments. With --blocks the stations are spread over that many function
+blocks instead. Output is deterministic for a given size and seed.
+"""
+import argparse
+import os
+import random
+from typing import List
+
+# Stations per preset; each station is about 11 variables and 50 lines
+PRESETS = {
+    'small': 10,
+    'medium': 100,
+    'large': 1000,
+    'xlarge': 4000,
+}
+
+_STATION_KINDS = ('Conveyor', 'Lift', 'Pusher', 'Sorter')
+
+_COMMENTS = (
+    '// 安全インターロック',
+    '// 搬送制御',
+    '(* 原点復帰シーケンス *)',
+    '// 異常時は即停止',
+    '(* ステップ制御\n       工程ごとに出力を切替 *)',
+)
+
+_FUNCTION_BLOCK = '''(* {kind} ステーション *)
+FUNCTION_BLOCK {kind}Station
+VAR_INPUT
+    RunCmd : BOOL;
+    ItemSensor : BOOL;
+    Interlock : BOOL;
+END_VAR
+VAR_OUTPUT
+    DriveMotor : BOOL;
+    DoneLamp : BOOL;
+END_VAR
+VAR
+    Busy : BOOL;
+    StepNo : DINT;
+    Delay : TIME;
+END_VAR
+IF RunCmd AND NOT Interlock THEN
+    IF ItemSensor THEN
+        DriveMotor := TRUE; ;モーター起動
+        Busy := TRUE;
+    ELSE
+        DriveMotor := FALSE;
+    END_IF;
+ELSIF Busy AND NOT ItemSensor THEN
+    DoneLamp := TRUE;
+    Busy := FALSE;
+END_IF;
+END_FUNCTION_BLOCK
+
+'''
+
+
+def _station_vars(n: int) -> List[str]:
+    return [
+        f'    Start{n}Button : BOOL;  // 起動',
+        f'    Stop{n}Button : BOOL;',
+        f'    Item{n}Sensor : BOOL;',
+        f'    Pos{n}Sensor : BOOL;',
+        f'    Belt{n}Motor : BOOL;',
+        f'    Ready{n}Lamp : BOOL;',
+        f'    Step{n} : DINT := 0;',
+        f'    Count{n} : DINT;',
+        f'    Busy{n} : BOOL;',
+        f'    Timer{n} : TIME;',
+    ]
+
+
+def _station_logic(n: int, rng: random.Random) -> str:
+    comment = rng.choice(_COMMENTS)
+    limit = rng.randint(3, 50)
+    return f'''{comment}
+IF EmergencyStop OR Fault THEN
+    Belt{n}Motor := FALSE;
+    Ready{n}Lamp := FALSE;
+    Step{n} := 0;
+ELSIF SystemRun AND Start{n}Button AND NOT Stop{n}Button THEN
+    Busy{n} := TRUE;
+    IF Item{n}Sensor AND NOT Pos{n}Sensor THEN
+        Belt{n}Motor := TRUE;
+        IF Count{n} >= {limit} THEN
+            Ready{n}Lamp := TRUE;
+            Count{n} := 0;
+        ELSE
+            Count{n} := Count{n} + 1;
+        END_IF;
+    ELSIF Pos{n}Sensor THEN
+        Belt{n}Motor := FALSE;
+    END_IF;
+END_IF;
+
+CASE Step{n} OF
+    0:
+        IF Busy{n} AND Item{n}Sensor THEN
+            Step{n} := 10;
+        END_IF;
+    10, 11:
+        Belt{n}Motor := TRUE; ;搬送中
+        IF Pos{n}Sensor THEN
+            Step{n} := 20;
+        END_IF;
+    20..29:
+        Belt{n}Motor := FALSE;
+        Station{n}(RunCmd := Busy{n}, ItemSensor := Item{n}Sensor, Interlock := Fault);
+        Step{n} := 0;
+ELSE
+    Step{n} := 0;
+END_CASE;
+
+'''
+
+
+def generate_program(stations: int, seed: int = 0) -> str:
+    """ST source for a line of ``stations`` stations"""
+    rng = random.Random(seed)
+    parts = [f'(* 自動生成テストプログラム: {stations} ステーション *)\n']
+
+    parts.append('VAR_GLOBAL\n')
+    parts.append('    EmergencyStop : BOOL;  // 非常停止\n')
+    parts.append('    SystemRun : BOOL;\n')
+    parts.append('    Fault : BOOL;\n')
+    parts.append('    AlarmBuzzer : BOOL;\n')
+    parts.append('END_VAR\n\n')
+
+    for kind in _STATION_KINDS:
+        parts.append(_FUNCTION_BLOCK.format(kind=kind))
+
+    parts.append('PROGRAM Main\nVAR\n')
+    for n in range(stations):
+        parts.append('\n'.join(_station_vars(n)) + '\n')
+        kind = _STATION_KINDS[n % len(_STATION_KINDS)]
+        parts.append(f'    Station{n} : {kind}Station;\n')
+    parts.append('END_VAR\n\n')
+
+    parts.append('IF EmergencyStop THEN\n    SystemRun := FALSE;\n    AlarmBuzzer := TRUE;\nEND_IF;\n\n')
+    for n in range(stations):
+        parts.append(_station_logic(n, rng))
+    parts.append('END_PROGRAM\n')
+    return ''.join(parts)
+
+
+def generate_project(blocks: int, stations_per_block: int = 10, seed: int = 0) -> str:
+    """ST source with the stations spread over ``blocks`` function blocks
+
+    The shape of a large project with many POUs, as opposed to
+    generate_program's single big PROGRAM.
+    """
+    rng = random.Random(seed)
+    parts = [f'(* 自動生成テストプロジェクト: {blocks} ブロック *)\n']
+    parts.append('VAR_GLOBAL\n    EmergencyStop : BOOL;\n    SystemRun : BOOL;\n    Fault : BOOL;\nEND_VAR\n\n')
+    for kind in _STATION_KINDS:
+        parts.append(_FUNCTION_BLOCK.format(kind=kind))
+
+    for b in range(blocks):
+        first = b * stations_per_block
+        stations = range(first, first + stations_per_block)
+        parts.append(f'(* ライン {b} *)\nFUNCTION_BLOCK Line{b}\nVAR\n')
+        for n in stations:
+            parts.append('\n'.join(_station_vars(n)) + '\n')
+            parts.append(f'    Station{n} : {_STATION_KINDS[n % len(_STATION_KINDS)]}Station;\n')
+        parts.append('END_VAR\n')
+        for n in stations:
+            parts.append(_station_logic(n, rng))
+        parts.append('END_FUNCTION_BLOCK\n\n')
+
+    parts.append('PROGRAM Main\nVAR\n')
+    parts.append(''.join(f'    Line{b}Block : Line{b};\n' for b in range(blocks)))
+    parts.append('END_VAR\n')
+    parts.append(''.join(f'Line{b}Block();\n' for b in range(blocks)))
+    parts.append('END_PROGRAM\n')
+    return ''.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic ST programs")
+    parser.add_argument('--stations', type=int, help="Stations in the generated line")
+    parser.add_argument('--preset', choices=sorted(PRESETS), help="Named size instead of --stations")
+    parser.add_argument('--blocks', type=int, help="Spread the stations over this many function blocks")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--encoding', default='utf-8', help="e.g. cp932 for Shift-JIS files")
+    parser.add_argument('-o', '--output', help="Write one program to this file")
+    parser.add_argument('--out-dir', help="Write every preset into this directory")
+    args = parser.parse_args()
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        for name, stations in PRESETS.items():
+            path = os.path.join(args.out_dir, f'{name}.st')
+            with open(path, 'w', encoding=args.encoding) as f:
+                f.write(generate_program(stations, args.seed))
+            print(path)
+        return
+
+    stations = args.stations or PRESETS[args.preset or 'small']
+    if args.blocks:
+        source = generate_project(args.blocks, max(1, stations // args.blocks), args.seed)
+    else:
+        source = generate_program(stations, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding=args.encoding) as f:
+            f.write(source)
+    else:
+        print(source, end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def cache_hasher(plc_type: str, options: Optional[dict], version: str):
+    """sha256 primed with everything but the source, for streamed uploads"""
+    normalized = json.dumps(options or {}, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha256()
+    for part in (version, plc_type, normalized):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest
+
+
+def config_fingerprint(*tables) -> str:
+    """Short digest of configuration tables loaded at startup
+
+    Folded into the cache version so results converted under a site's
+    previous tables are not served after the tables change.
+    """
+    normalized = json.dumps(tables, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(source_code: str, plc_type: str, options: Optional[dict], version: str) -> str:
+    """Content address for a conversion: same inputs and converter version, same key"""
+    digest = cache_hasher(plc_type, options, version)
+    digest.update(source_code.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Serialized conversion responses, in memory with an optional SQLite tier
+
+    The memory tier is an LRU bounded by entry count and total payload
+    bytes. Both tiers expire entries ``ttl`` seconds after they were stored.
+    The SQLite tier survives restarts and is shared by every worker process
+    pointed at the same file.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, payload)
+        self._bytes = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, stored_at REAL, payload BLOB)'
+            )
+            self._db.execute('DELETE FROM results WHERE stored_at < ?', (time.time() - ttl,))
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        return cls(
+            max_entries=int(os.environ.get('RESULT_CACHE_SIZE', '256')),
+            max_bytes=int(os.environ.get('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+            ttl=float(os.environ.get('RESULT_CACHE_TTL', '3600')),
+            path=os.environ.get('RESULT_CACHE_PATH') or None
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, payload = entry
+            if now - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return payload
+            self._evict(key)
+
+        if self._db is not None:
+            row = self._db.execute(
+                'SELECT stored_at, payload FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and now - row[0] < self.ttl:
+                self._remember(key, row[0], bytes(row[1]))
+                self._hits += 1
+                self._disk_hits += 1
+                return bytes(row[1])
+
+        self._misses += 1
+        return None
+
+    def put(self, key: str, payload: bytes):
+        stored_at = time.time()
+        self._remember(key, stored_at, payload)
+        if self._db is not None:
+            self._db.execute(
+                'INSERT OR REPLACE INTO results (key, stored_at, payload) VALUES (?, ?, ?)',
+                (key, stored_at, payload)
+            )
+
+    def _remember(self, key: str, stored_at: float, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (stored_at, payload)
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self._hits,
+            'disk_hits': self._disk_hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+            'persistent': self._db is not None
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,398 @@
+"""Boolean condition compiler
+
+Turns the conditions a statement runs under into a series/parallel contact
+network. Expressions are built into a DAG in negation normal form, so NOT
+only ever sits on a single contact (a normally-closed contact). Identical
+subexpressions are shared. Constants are folded, and AND/OR are flattened
+and simplified (idempotence, complements, absorption). Conditions over a
+few inputs are also minimized with Quine-McCluskey, as a sum of products
+and as a product of sums, then factored. The candidate with the fewest
+contacts wins.
+
+Nodes are plain tuples:
+
+* ``('lit', atom, positive)``: one contact; ``atom`` is the variable name
+  or the text of a comparison
+* ``('and', children)`` / ``('or', children)``: series / parallel
+* ``TRUE`` / ``FALSE``
+
+Children keep source order, so output is deterministic and follows the
+program where no reduction applies.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from st_ast import BinaryOp, Literal, Name, UnaryOp, format_expr
+
+TRUE = ('const', True)
+FALSE = ('const', False)
+
+# Truth tables grow as 2**n and prime implicants up to 3**n; above this many
+# inputs only the algebraic simplifications run
+MAX_MINIMIZE_INPUTS = 6
+
+# Minimization depends only on the shape of a condition, with variables
+# numbered in order of appearance, so programs that repeat one shape over
+# different variables (stations, axes, ...) minimize it once
+_shapes: Dict[tuple, tuple] = {}
+_SHAPES_MAX = 4096
+_BUILT_MAX = 65536
+
+_DECIMAL = re.compile(r'[+-]?\d+\Z')
+
+
+class ConditionCompiler:
+    """Compiles condition lists to contact networks, memoizing by node"""
+
+    def __init__(self, max_inputs: int = MAX_MINIMIZE_INPUTS, simplify: bool = True):
+        self.max_inputs = max_inputs
+        self.simplify = simplify
+        self._nodes: Dict[tuple, tuple] = {}  # shallow key -> the one node with that shape
+        self._built: Dict[tuple, tuple] = {}  # (id(expr), positive) -> (expr, node)
+        self._minimized: Dict[int, tuple] = {}  # id(node) -> minimized node
+        self._exclusive: Dict[str, Tuple[str, int]] = {}  # 'sel = 3' -> ('sel', 3)
+
+    def compile(self, conditions: list) -> tuple:
+        """The minimized network for the AND of ``conditions``"""
+        node = self._and([self._build(condition, True) for condition in conditions])
+        return self.minimize(node) if self.simplify else node
+
+    # DAG construction
+
+    def _literal(self, atom: str, positive: bool) -> tuple:
+        node = ('lit', atom, positive)
+        return self._nodes.setdefault(node, node)
+
+    def _intern(self, kind: str, children: tuple) -> tuple:
+        """The shared node for ``kind`` over ``children``
+
+        Children are shared nodes already, so their ids identify them and
+        the key never hashes a whole subtree.
+        """
+        key = (kind, tuple(map(id, children)))
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = (kind, children)
+        return node
+
+    def _build(self, expr, positive: bool) -> tuple:
+        """Node for ``expr`` (or its negation), with NOT pushed down to the contacts
+
+        Nested IFs repeat their outer conditions in every condition list, so
+        nodes are remembered per expression object; the entry keeps the
+        expression alive, which keeps its id from being reused.
+        """
+        built = self._built.get((id(expr), positive))
+        if built is not None and built[0] is expr:
+            return built[1]
+        if len(self._built) >= _BUILT_MAX:
+            self._built.clear()
+        node = self._build_node(expr, positive)
+        self._built[(id(expr), positive)] = (expr, node)
+        return node
+
+    def _build_node(self, expr, positive: bool) -> tuple:
+        if isinstance(expr, UnaryOp) and expr.op == 'NOT':
+            return self._build(expr.operand, not positive)
+        if isinstance(expr, Literal) and expr.text in ('TRUE', 'FALSE'):
+            return TRUE if (expr.text == 'TRUE') == positive else FALSE
+        if isinstance(expr, BinaryOp):
+            op = expr.op
+            if op in ('AND', 'OR'):
+                # De Morgan: NOT (a AND b) is NOT a OR NOT b
+                children = [self._build(expr.left, positive), self._build(expr.right, positive)]
+                return self._and(children) if (op == 'AND') == positive else self._or(children)
+            if op == 'XOR':
+                left, right = expr.left, expr.right
+                return self._or([
+                    self._and([self._build(left, True), self._build(right, not positive)]),
+                    self._and([self._build(left, False), self._build(right, positive)])
+                ])
+            if op in ('=', '<>'):
+                # x = TRUE, flag <> FALSE, ...
+                for operand, other in ((expr.left, expr.right), (expr.right, expr.left)):
+                    if isinstance(other, Literal) and other.text in ('TRUE', 'FALSE'):
+                        return self._build(operand, positive == ((other.text == 'TRUE') == (op == '=')))
+        atom = expr.name if isinstance(expr, Name) else format_expr(expr)
+        if isinstance(expr, BinaryOp) and expr.op == '=' and isinstance(expr.right, Literal) \
+                and _DECIMAL.match(expr.right.text):
+            self._exclusive[atom] = (format_expr(expr.left), int(expr.right.text))
+        return self._literal(atom, positive)
+
+    def _and(self, children: List[tuple]) -> tuple:
+        return self._combine('and', children, TRUE, FALSE)
+
+    def _or(self, children: List[tuple]) -> tuple:
+        return self._combine('or', children, FALSE, TRUE)
+
+    def _combine(self, kind: str, children: List[tuple], identity: tuple, dominant: tuple) -> tuple:
+        # Constants are the TRUE / FALSE singletons and other nodes are
+        # shared, so identity comparisons are exact
+        flat = []
+        for child in children:
+            if child[0] == kind:
+                flat.extend(child[1])
+            elif child is dominant:
+                return dominant
+            elif child is not identity:
+                flat.append(child)
+        if len(flat) < 2:
+            return flat[0] if flat else identity
+        if not self.simplify:
+            return self._intern(kind, tuple(flat))
+
+        members = {}
+        literals = set()
+        nested = False
+        for child in flat:
+            if id(child) in members:
+                continue
+            if child[0] == 'lit':
+                if (child[1], not child[2]) in literals:
+                    return dominant  # x AND NOT x, x OR NOT x
+                literals.add((child[1], child[2]))
+            else:
+                nested = True
+            members[id(child)] = child
+        unique = list(members.values())
+
+        if nested:
+            # Absorption: a AND (a OR b) is a, a OR (a AND b) is a
+            unique = [
+                child for child in unique
+                if child[0] == 'lit' or not any(id(grandchild) in members for grandchild in child[1])
+            ]
+        if len(unique) == 1:
+            return unique[0]
+        return self._intern(kind, tuple(unique))
+
+    # Minimization
+
+    def minimize(self, node: tuple) -> tuple:
+        if node[0] in ('const', 'lit'):
+            return node
+        minimized = self._minimized.get(id(node))
+        if minimized is None:
+            minimized = self._minimized[id(node)] = self._minimize(node)
+        return minimized
+
+    def _minimize(self, node: tuple) -> tuple:
+        index: Dict[str, int] = {}
+        shape = _shape(node, index)
+        if len(index) > self.max_inputs:
+            return node
+        atoms = list(index)
+        tests = [atom for atom in atoms if atom in self._exclusive]
+        if node[0] == 'and' and len(tests) < 2 and all(child[0] == 'lit' for child in node[1]):
+            return node  # distinct contacts in series are already minimal
+
+        # Which inputs test one selector against which constants
+        selectors: Dict[str, int] = {}
+        values: Dict[tuple, int] = {}
+        exclusions = tuple(
+            (index[atom], selectors.setdefault(self._exclusive[atom][0], len(selectors)),
+             values.setdefault(self._exclusive[atom], len(values)))
+            for atom in tests
+        )
+        key = (shape, exclusions)
+        minimized = _shapes.get(key)
+        if minimized is None:
+            if len(_shapes) >= _SHAPES_MAX:
+                _shapes.clear()
+            minimized = _shapes[key] = _shape(self._minimize_node(node, atoms), index)
+        return self._instantiate(minimized, atoms)
+
+    def _instantiate(self, shape: tuple, atoms: List[str]) -> tuple:
+        head = shape[0]
+        if head.__class__ is int:
+            return self._literal(atoms[head], shape[1])
+        if head == 'const':
+            return TRUE if shape[1] else FALSE
+        return self._intern(head, tuple(self._instantiate(child, atoms) for child in shape[1]))
+
+    def _minimize_node(self, node: tuple, atoms: List[str]) -> tuple:
+        # Bit-parallel truth table: bit i of a table is the value under the
+        # assignment whose binary digits are the atoms' values
+        size = 1 << len(atoms)
+        full = (1 << size) - 1
+        columns = dict(zip(atoms, _columns(len(atoms))))
+        on = _evaluate(node, columns, full)
+
+        # Two equality tests on one selector with different constants can
+        # never both hold (CASE labels)
+        dont_care = 0
+        tests = [(atom, self._exclusive[atom]) for atom in atoms if atom in self._exclusive]
+        for i, (atom, (selector, value)) in enumerate(tests):
+            for other, (other_selector, other_value) in tests[i + 1:]:
+                if selector == other_selector and value != other_value:
+                    dont_care |= columns[atom] & columns[other]
+        on &= ~dont_care
+
+        if not on:
+            return FALSE
+        if on | dont_care == full:
+            return TRUE
+
+        candidates = [node]
+        sum_of_products = self._cover(on, dont_care, atoms, True)
+        candidates.append(self._factor(sum_of_products))
+        product_of_sums = self._cover(full & ~on & ~dont_care, dont_care, atoms, False)
+        candidates.append(self._factor_dual(product_of_sums))
+        return min(candidates, key=lambda candidate: (contact_count(candidate), depth(candidate)))
+
+    def _cover(self, on: int, dont_care: int, atoms: List[str], positive: bool) -> List[List[tuple]]:
+        """Minimal cubes covering ``on`` as literal lists
+
+        With ``positive`` false the cubes describe the off-set, and their
+        literals come out complemented for a product of sums.
+        """
+        width = len(atoms)
+        minterms = [i for i in range(1 << width) if on >> i & 1]
+        terms = minterms + [i for i in range(1 << width) if dont_care >> i & 1]
+        chosen = _select_cover(_prime_implicants(terms, width), minterms)
+
+        cubes = []
+        for value, mask in chosen:
+            cube = []
+            for index, atom in enumerate(atoms):
+                if not mask >> index & 1:
+                    literal_positive = bool(value >> index & 1)
+                    cube.append(self._literal(atom, literal_positive == positive))
+            cubes.append(cube)
+        return cubes
+
+    def _factor(self, cubes: List[List[tuple]]) -> tuple:
+        """Factor a sum of products by pulling out the most shared literal"""
+        return self._factor_cubes(cubes, self._and, self._or)
+
+    def _factor_dual(self, clauses: List[List[tuple]]) -> tuple:
+        """Factor a product of sums the same way"""
+        return self._factor_cubes(clauses, self._or, self._and)
+
+    def _factor_cubes(self, cubes: List[List[tuple]], inner, outer) -> tuple:
+        if len(cubes) == 1:
+            return inner(cubes[0])
+        counts: Dict[tuple, int] = {}
+        for cube in cubes:
+            for literal in cube:
+                counts[literal] = counts.get(literal, 0) + 1
+        best = max(counts, key=lambda literal: counts[literal], default=None)
+        if best is None or counts[best] < 2:
+            return outer([inner(cube) for cube in cubes])
+        sharing = [[literal for literal in cube if literal is not best] for cube in cubes if best in cube]
+        rest = [cube for cube in cubes if best not in cube]
+        if any(not cube for cube in sharing):
+            factored = best  # best alone is one of the cubes and absorbs the others
+        else:
+            factored = inner([best, self._factor_cubes(sharing, inner, outer)])
+        if not rest:
+            return factored
+        return outer([factored, self._factor_cubes(rest, inner, outer)])
+
+
+def _shape(node: tuple, index: Dict[str, int]) -> tuple:
+    """``node`` with each atom replaced by its number in ``index``
+
+    Atoms not yet in ``index`` are numbered in order of appearance.
+    """
+    kind = node[0]
+    if kind == 'lit':
+        return (index.setdefault(node[1], len(index)), node[2])
+    if kind == 'const':
+        return node
+    return (kind, tuple(_shape(child, index) for child in node[1]))
+
+
+@lru_cache(maxsize=None)
+def _columns(width: int) -> Tuple[int, ...]:
+    """Truth table of each input: input i is runs of 2**i zeros then ones"""
+    size = 1 << width
+    columns = []
+    for index in range(width):
+        run = 1 << index
+        block = ((1 << run) - 1) << run
+        column = 0
+        for start in range(0, size, 2 * run):
+            column |= block << start
+        columns.append(column)
+    return tuple(columns)
+
+
+def _evaluate(node: tuple, columns: Dict[str, int], full: int) -> int:
+    kind = node[0]
+    if kind == 'lit':
+        column = columns[node[1]]
+        return column if node[2] else full & ~column
+    if kind == 'const':
+        return full if node[1] else 0
+    values = [_evaluate(child, columns, full) for child in node[1]]
+    result = values[0]
+    for value in values[1:]:
+        result = result & value if kind == 'and' else result | value
+    return result
+
+
+def _prime_implicants(terms: List[int], width: int) -> List[Tuple[int, int]]:
+    """Quine-McCluskey: every prime implicant as (value, don't-care mask)"""
+    current = {(term, 0) for term in terms}
+    primes = set()
+    while current:
+        merged = set()
+        used = set()
+        by_mask: Dict[int, List[int]] = {}
+        for value, mask in current:
+            by_mask.setdefault(mask, []).append(value)
+        for mask, values in by_mask.items():
+            present = set(values)
+            for value in values:
+                for bit in range(width):
+                    flag = 1 << bit
+                    if mask & flag or value & flag:
+                        continue
+                    partner = value | flag
+                    if partner in present:
+                        merged.add((value, mask | flag))
+                        used.add((value, mask))
+                        used.add((partner, mask))
+        primes |= current - used
+        current = merged
+    return sorted(primes, key=lambda prime: (-bin(prime[1]).count('1'), prime))
+
+
+def _select_cover(primes: List[Tuple[int, int]], minterms: List[int]) -> List[Tuple[int, int]]:
+    """Essential primes, then greedily the prime covering most of the rest"""
+    def covers(prime, term):
+        value, mask = prime
+        return term & ~mask == value
+
+    remaining = set(minterms)
+    chosen = []
+    for term in minterms:
+        covering = [prime for prime in primes if covers(prime, term)]
+        if len(covering) == 1 and covering[0] not in chosen:
+            chosen.append(covering[0])
+    for prime in chosen:
+        remaining -= {term for term in remaining if covers(prime, term)}
+
+    while remaining:
+        # Larger cubes have fewer contacts; primes are sorted that way
+        best = max(primes, key=lambda prime: sum(1 for term in remaining if covers(prime, term)))
+        chosen.append(best)
+        remaining -= {term for term in remaining if covers(best, term)}
+    return chosen
+
+
+def contact_count(node: tuple) -> int:
+    kind = node[0]
+    if kind == 'lit':
+        return 1
+    if kind == 'const':
+        return 0
+    return sum(contact_count(child) for child in node[1])
+
+
+def depth(node: tuple) -> int:
+    if node[0] in ('lit', 'const'):
+        return 0
+    return 1 + max(depth(child) for child in node[1])
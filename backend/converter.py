@@ -0,0 +1,432 @@
+from sys import intern
+from typing import Callable, Iterator, List, Optional
+from datetime import datetime
+
+from allocator import AllocationPlan, DeviceSpaceError, plan_for_options
+from st_ast import (
+    Assignment, BinaryOp, CallStatement, CaseRange, CaseStatement, CompilationUnit, ControlStatement,
+    IfStatement, LoopStatement, Name, POU, UnaryOp, VarDeclaration, format_expr
+)
+from conditions import FALSE, ConditionCompiler, contact_count
+from diagnostics import CONVERSION_FAILED, DEVICE_SPACE, ERROR, UNREACHABLE, UNSUPPORTED, WARNING, Diagnostic
+from device_rules import DEFAULT_RULES, DeviceRules, rules_for_options
+from ladder import Rung, rungs_to_json
+from lexer import tokenize
+from profiling import Timings, profile_call
+from st_parser import parse_source, parse_tokens
+from symbols import Scope, Symbol, SymbolTable
+
+# Bump whenever the generated ladder for the same source changes, so cached
+# results from older releases are not served
+CONVERTER_VERSION = "10"
+
+# How rungs under one shared condition avoid repeating its contacts:
+# 'relay' drives an internal relay from the condition once, 'coils' puts
+# consecutive outputs on one rung as parallel coils
+FAN_OUT_MODES = ('relay', 'coils')
+
+# run_conversion reports progress(0) after this many tokens while parsing
+PARSE_PROGRESS_TOKENS = 4096
+
+
+def fan_out_for_options(options: Optional[dict]) -> Optional[str]:
+    """``options["fan_out"]``, or None; raises ValueError for an unknown mode"""
+    fan_out = (options or {}).get('fan_out')
+    if fan_out is not None and fan_out not in FAN_OUT_MODES:
+        raise ValueError(f"options.fan_out must be one of: {', '.join(FAN_OUT_MODES)}")
+    return fan_out
+
+
+class SimpleLadderConverter:
+    def __init__(self, rules: Optional[DeviceRules] = None, timings: Optional[Timings] = None,
+                 fan_out: Optional[str] = None, allocation: Optional[AllocationPlan] = None):
+        self.allocation = allocation or plan_for_options()  # PLC model, reserved ranges and pinned addresses
+        self.devices = self.allocation.allocator()  # Used addresses per device family, see allocator.py
+        self.symbols = SymbolTable()  # Scoped variables and their device addresses
+        self._scope = self.symbols.globals  # Scope of the POU being converted
+        self.errors = []
+        self.warnings = []
+        self.used_names = None  # When a set, collects every symbol key rungs refer to
+        self.rules = rules or DEFAULT_RULES  # Device classification, see device_rules.py
+        self.timings = timings  # Per-construct conversion times, see profiling.Timings
+        self.conditions = ConditionCompiler()  # Condition lists to contact networks
+        self._compiled = (None, None, None)  # Last (conditions, network, contacts); a body shares one list
+        self.fan_out = fan_out  # None or one of FAN_OUT_MODES
+        self._relays = 0
+
+    def convert(self, source_code: str, plc_type: str = "mitsubishi") -> tuple:
+        # Parse the whole source into an AST in one pass
+        unit, parse_errors, parse_warnings = parse_source(source_code)
+        return self.convert_ast(unit, plc_type, parse_errors, parse_warnings)
+
+    def convert_ast(self, unit: CompilationUnit, plc_type: str = "mitsubishi",
+                    parse_errors: Optional[List[Diagnostic]] = None,
+                    parse_warnings: Optional[List[Diagnostic]] = None) -> tuple:
+        """Generate rungs from an already parsed program"""
+        ladder_data = {
+            'rungs': [rung.to_dict() for rung in self.iter_rungs(unit, parse_errors, parse_warnings)],
+            'metadata': {
+                'plc_type': plc_type,
+                'generated_at': datetime.now().isoformat()
+            }
+        }
+
+        device_map = {
+            'inputs': {},
+            'outputs': {},
+            'internals': {},
+            'timers': {},
+            'counters': {}
+        }
+
+        return ladder_data, device_map, self.device_list()
+
+    def iter_rungs(self, unit: CompilationUnit, parse_errors: Optional[List[Diagnostic]] = None,
+                   parse_warnings: Optional[List[Diagnostic]] = None) -> Iterator[Rung]:
+        """Yield rungs one top-level statement at a time
+
+        Devices, errors and warnings are complete once the generator is
+        exhausted; rungs already yielded are never revisited.
+        """
+        pous = self.declare(unit, parse_errors, parse_warnings)
+        yield from self.iter_pou_rungs(pous)
+
+    def declare(self, unit: CompilationUnit, parse_errors: Optional[List[Diagnostic]] = None,
+                parse_warnings: Optional[List[Diagnostic]] = None) -> List[POU]:
+        """Reset state and allocate every declared variable
+
+        Returns the POUs in conversion order for iter_pou_rungs().
+        """
+        self.devices = self.allocation.allocator()
+        self.symbols = SymbolTable()
+        self._scope = self.symbols.globals
+        self._relays = 0
+        self.errors = []
+        self.warnings = []
+
+        self.errors.extend(parse_errors or [])
+        self.warnings.extend(parse_warnings or [])
+
+        # Function blocks are laid out before the programs that call them
+        pous = [pou for pou in unit.pous if pou.kind != 'PROGRAM']
+        pous += [pou for pou in unit.pous if pou.kind == 'PROGRAM']
+
+        # First pass: Build the symbol table from every declaration
+        for block in unit.var_blocks:
+            for declaration in block.declarations:
+                self._parse_variable_declaration(declaration)
+        for pou in pous:
+            scope = self.symbols.scope(pou.kind, pou.name)
+            for block in pou.var_blocks:
+                for declaration in block.declarations:
+                    self._parse_variable_declaration(declaration, scope)
+        return pous
+
+    def iter_pou_rungs(self, pous: List[POU]) -> Iterator[Rung]:
+        """Second pass: Walk the statements of each POU in its own scope"""
+        for pou in pous:
+            self._scope = self.symbols.scope(pou.kind, pou.name)
+            for statement in pou.body:
+                yield from self._convert_statements([statement], [])
+        self._scope = self.symbols.globals
+
+    def device_list(self) -> List[dict]:
+        """Formatted device list for the API response"""
+        return self.symbols.device_list()
+
+    def _parse_variable_declaration(self, declaration: VarDeclaration, scope: Optional[Scope] = None):
+        data_type = declaration.data_type
+        scope = scope or self.symbols.globals
+
+        for var_name in declaration.names:
+            if var_name in scope.symbols:
+                continue
+
+            device = self.rules.classify(var_name, data_type)
+            if device is None:
+                # FB instances and other types without a device of their own
+                scope.instances.setdefault(var_name, data_type)
+                continue
+
+            # Program variables share their key with a same-named global
+            key = self.symbols.key(scope, var_name)
+            symbol = self.symbols.keys.get(key)
+            if symbol is None:
+                prefix, device_type = device
+                try:
+                    address = self._allocate(prefix, key)
+                except DeviceSpaceError as e:
+                    # Left undeclared; statements that use it report their own error
+                    self.errors.append(Diagnostic(ERROR, DEVICE_SPACE, str(e), declaration.span, key))
+                    continue
+                symbol = self.symbols.add(Symbol(key, intern(address), device_type, data_type))
+            scope.symbols[var_name] = symbol
+
+    def _implicit(self, var_name: str, prefix: str) -> Symbol:
+        """Allocate an undeclared name as a global on first use"""
+        return self.symbols.add(Symbol(intern(var_name), intern(self._allocate(prefix, var_name))))
+
+    def _allocate(self, prefix: str, key: str) -> str:
+        """Lowest free address in a device family, or the one pinned to ``key``"""
+        return self.devices.allocate(prefix, key)
+
+    def _forget(self, key: str):
+        """Drop a symbol and free its address for reuse"""
+        symbol = self.symbols.remove(key)
+        if symbol is not None:
+            self.devices.release(symbol.address)
+
+    def _convert_statements(self, statements: list, conditions: list) -> List[Rung]:
+        """Translate a statement list executed under the given conditions"""
+        rungs = []
+        if statements and self._network(conditions) == FALSE:
+            self.warnings.append(Diagnostic(
+                WARNING, UNREACHABLE, "Statements can never execute and were skipped", statements[0].span
+            ))
+            return rungs
+        if self.fan_out == 'relay' and conditions:
+            conditions = self._relay_conditions(statements, conditions, rungs)
+
+        timings = self.timings
+        shared = None  # With 'coils' fan-out, the rung the next output joins
+        for statement in statements:
+            if timings is not None:
+                timings.start()
+            output = None
+            try:
+                if isinstance(statement, IfStatement):
+                    rungs.extend(self._convert_if_statement(statement, conditions))
+                elif isinstance(statement, CaseStatement):
+                    rungs.extend(self._convert_case_statement(statement, conditions))
+                elif isinstance(statement, Assignment):
+                    output = self._convert_assignment(statement, conditions)
+                elif isinstance(statement, CallStatement):
+                    output = self._build_rung(statement.call.name, format_expr(statement.call), conditions)
+                elif isinstance(statement, LoopStatement):
+                    self.warnings.append(Diagnostic(
+                        WARNING, UNSUPPORTED, f"{statement.kind} loops are not supported and were skipped",
+                        statement.span, statement.kind
+                    ))
+                elif isinstance(statement, ControlStatement):
+                    pass
+
+            except Exception as e:
+                self.errors.append(Diagnostic(ERROR, CONVERSION_FAILED, str(e), statement.span))
+            if output is None:
+                shared = None
+            elif shared is not None and output.contacts == shared.contacts:
+                shared.coils += (output.coil_address, output.coil_description)
+            else:
+                rungs.append(output)
+                shared = output if self.fan_out == 'coils' else None
+            if timings is not None:
+                timings.stop(f'convert.{type(statement).__name__}')
+        return rungs
+
+    def _relay_conditions(self, statements: list, conditions: list, rungs: List[Rung]) -> list:
+        """Evaluate conditions several rungs share once, into an internal relay
+
+        Appends the relay's rung and returns the conditions the body uses
+        instead: the relay contact alone, which nested bodies extend. Only
+        done when it saves contacts.
+        """
+        contacts = contact_count(self._network(conditions))
+        if (_count_outputs(statements) - 1) * (contacts - 1) < 2:
+            return conditions
+
+        key = f'_COND{self._relays}'
+        while key in self.symbols.keys:
+            self._relays += 1
+            key = f'_COND{self._relays}'
+        self._relays += 1
+        prefix, device_type = self.rules.default
+        self.symbols.add(Symbol(intern(key), intern(self._allocate(prefix, key)), device_type, 'BOOL'))
+
+        text = ' AND '.join(format_expr(condition, 3) for condition in conditions)
+        rungs.append(self._build_rung(key, f'{key} := {text}', conditions))
+        return [Name(key)]
+
+    def _convert_if_statement(self, statement: IfStatement, conditions: list) -> List[Rung]:
+        return self._convert_branches(statement.branches, statement.else_body, conditions)
+
+    def _convert_case_statement(self, statement: CaseStatement, conditions: list) -> List[Rung]:
+        return self._convert_branches(case_branches(statement), statement.else_body, conditions)
+
+    def _convert_branches(self, branches: list, else_body: Optional[list], conditions: list) -> List[Rung]:
+        """Each branch runs only when every earlier branch condition was false"""
+        rungs = []
+        previous = []
+        for condition, body in branches:
+            rungs.extend(self._convert_statements(body, conditions + previous + [condition]))
+            previous.append(UnaryOp('NOT', condition))
+        if else_body:
+            rungs.extend(self._convert_statements(else_body, conditions + previous))
+        return rungs
+
+    def _convert_assignment(self, statement: Assignment, conditions: list) -> Rung:
+        var_name = statement.target.name
+        value = format_expr(statement.value)
+        return self._build_rung(var_name, f'{var_name} := {value}', conditions)
+
+    def _network(self, conditions: list) -> tuple:
+        if conditions is not self._compiled[0]:
+            self._compiled = (conditions, self.conditions.compile(conditions), None)
+        return self._compiled[1]
+
+    def _build_rung(self, var_name: str, description: str, conditions: list) -> Rung:
+        """One rung: the compiled condition network driving a single coil"""
+        # Resolve the coil in the current scope; undeclared coils follow the
+        # same rules as BOOL declarations but never land on an input
+        coil = self.symbols.resolve(self._scope, var_name)
+        if coil is None:
+            prefix = (self.rules.match(var_name) or self.rules.default)[0]
+            if prefix == 'X':
+                prefix = self.rules.default[0]
+            coil = self._implicit(var_name, prefix)
+
+        network = self._network(conditions)
+        contacts = self._compiled[2]
+        if contacts is None:
+            contacts = self._contacts(network)
+            self._compiled = (conditions, network, contacts)
+        if self.used_names is not None:
+            self.used_names.add(coil.key)
+        return Rung(contacts, coil.address, description)
+
+    def _contacts(self, node: tuple) -> tuple:
+        """Flat contact tuple (see ladder.Rung) for a condition network node"""
+        kind = node[0]
+        if kind == 'and':
+            contacts = ()
+            for child in node[1]:
+                contacts += self._contacts(child)
+            return contacts
+        if kind == 'or':
+            return (None, tuple(self._contacts(child) for child in node[1]), None)
+        if kind == 'const':
+            return ()
+
+        _, atom, normally_open = node
+        symbol = self.symbols.resolve(self._scope, atom)
+        if symbol is None:
+            # Undeclared variables are classified by name; comparisons
+            # and other expressions are read as inputs
+            device = self.rules.match(atom) if atom.replace('.', '_').isidentifier() else None
+            symbol = self._implicit(atom, device[0] if device else 'X')
+        if self.used_names is not None:
+            self.used_names.add(symbol.key)
+        # Addresses and contact names repeat across rungs; interning keeps
+        # one copy of each
+        return (symbol.address, intern(atom), normally_open)
+
+
+def case_branches(statement: CaseStatement) -> list:
+    """CASE arms as the ``(condition, body)`` branches of the equivalent IF/ELSIF chain"""
+    branches = []
+    for branch in statement.branches:
+        condition = None
+        for label in branch.labels:
+            if isinstance(label, CaseRange):
+                test = BinaryOp('AND', BinaryOp('>=', statement.selector, label.low),
+                                BinaryOp('<=', statement.selector, label.high))
+            else:
+                test = BinaryOp('=', statement.selector, label)
+            condition = test if condition is None else BinaryOp('OR', condition, test)
+        branches.append((condition, branch.body))
+    return branches
+
+
+def _count_outputs(statements: list) -> int:
+    """Rungs a statement list produces, nested bodies included"""
+    count = 0
+    for statement in statements:
+        if isinstance(statement, (Assignment, CallStatement)):
+            count += 1
+        elif isinstance(statement, (IfStatement, CaseStatement)):
+            bodies = [body for _, body in statement.branches] if isinstance(statement, IfStatement) \
+                else [branch.body for branch in statement.branches]
+            for body in bodies + [statement.else_body or []]:
+                count += _count_outputs(body)
+    return count
+
+
+def run_conversion(source_code: str, plc_type: str = "mitsubishi", options: Optional[dict] = None,
+                   progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Convert ST source and return a picklable result payload
+
+    Runs inside the conversion worker processes, so everything the API layer
+    needs from the converter instance is copied into the returned dict.
+    With ``options={"profile": true}`` the source is parsed afresh (not from
+    the AST cache) under cProfile and the payload carries a ``profile``.
+    ``progress`` is passed on to run_ast_conversion and also called with 0
+    every PARSE_PROGRESS_TOKENS tokens while parsing, so a caller can stop
+    a long parse by raising from it; such a parse bypasses the AST cache.
+    """
+    if (options or {}).get('profile'):
+        timings = Timings()
+        result, functions = profile_call(_profiled_conversion, source_code, plc_type, options, timings)
+        result['profile'] = {**timings.to_dict(), 'functions': functions}
+        return result
+
+    timings = Timings()
+    with timings.phase('parse'):
+        if progress is None:
+            unit, parse_errors, parse_warnings = parse_source(source_code, timings)
+        else:
+            unit, parse_errors, parse_warnings = parse_tokens(_reporting(tokenize(source_code), progress), timings)
+    return run_ast_conversion(unit, parse_errors, parse_warnings, plc_type, options, timings, progress)
+
+
+def _reporting(tokens: Iterator, progress: Callable[[int], None]) -> Iterator:
+    for count, token in enumerate(tokens):
+        if not count % PARSE_PROGRESS_TOKENS:
+            progress(0)
+        yield token
+
+
+def _profiled_conversion(source_code: str, plc_type: str, options: dict, timings: Timings) -> dict:
+    with timings.phase('parse'):
+        unit, parse_errors, parse_warnings = parse_tokens(tokenize(source_code), timings)
+    return run_ast_conversion(unit, parse_errors, parse_warnings, plc_type, options, timings)
+
+
+def run_ast_conversion(unit: CompilationUnit, parse_errors: List[Diagnostic], parse_warnings: List[Diagnostic],
+                       plc_type: str = "mitsubishi", options: Optional[dict] = None,
+                       timings: Optional[Timings] = None, progress: Optional[Callable[[int], None]] = None) -> dict:
+    """run_conversion for a program that was parsed while it streamed in
+
+    ``timings`` may already hold the parse phase; the remaining phases are
+    added and returned under ``timings``. ``progress``, if given, is called
+    with the number of rungs generated so far after each rung.
+    """
+    timings = timings or Timings()
+    converter = SimpleLadderConverter(rules_for_options(options), timings, fan_out_for_options(options),
+                                      plan_for_options(plc_type, options))
+    with timings.phase('declarations'):
+        pous = converter.declare(unit, parse_errors, parse_warnings)
+    with timings.phase('logic'):
+        rungs = []
+        for rung in converter.iter_pou_rungs(pous):
+            rungs.append(rung)
+            if progress is not None:
+                progress(len(rungs))
+    with timings.phase('device_list'):
+        device_list = converter.device_list()
+        device_map = converter.symbols.device_map()
+    with timings.phase('serialize'):
+        # Rungs leave the worker already serialized; see ladder.rungs_to_json
+        rungs_json = rungs_to_json(rungs)
+    return {
+        'rungs_json': rungs_json,
+        'rung_count': len(rungs),
+        'metadata': {
+            'plc_type': plc_type,
+            'generated_at': datetime.now().isoformat()
+        },
+        'device_map': device_map,
+        'device_list': device_list,
+        'device_usage': converter.devices.usage(),
+        'errors': converter.errors,
+        'warnings': converter.warnings,
+        'timings': timings
+    }
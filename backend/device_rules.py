@@ -0,0 +1,153 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'device_rules.json')
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex alternation of words with shared prefixes factored out"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if '' in node:
+            return f'(?:{"|".join(branches)})?' if branches else ''
+        return branches[0] if len(branches) == 1 else f'(?:{"|".join(branches)})'
+
+    return build(trie)
+
+
+def _device(entry, where: str) -> Tuple[str, str]:
+    if not isinstance(entry, dict) or not isinstance(entry.get('prefix'), str) or not entry['prefix']:
+        raise ValueError(f"{where} needs a 'prefix' such as \"X\"")
+    return entry['prefix'], entry.get('device_type', entry['prefix'])
+
+
+class DeviceRules:
+    """Compiled device classification table
+
+    ``types`` maps a data type to a fixed device, or to null for types
+    classified by name. ``name_rules`` are tried in order: a rule matches
+    when the name starts with one of ``starts_with`` (case-sensitive),
+    contains one of ``contains`` (case-insensitive) or matches a
+    ``pattern`` regex. Keywords of all rules are compiled into one
+    trie-shaped regex, so a name is classified in a single scan whatever the
+    number of keywords.
+    """
+
+    def __init__(self, config: dict):
+        if not isinstance(config, dict):
+            raise ValueError("Device rules must be an object")
+        self.config = config
+
+        self.types = {}
+        for data_type, entry in (config.get('types') or {}).items():
+            self.types[data_type.upper()] = None if entry is None else _device(entry, f"types.{data_type}")
+
+        self.rules = []
+        prefixes, keywords, patterns = [], [], []
+        for index, rule in enumerate(config.get('name_rules') or []):
+            self.rules.append(_device(rule, f"name_rules[{index}]"))
+            for key in ('starts_with', 'contains'):
+                if not isinstance(rule.get(key, []), list):
+                    raise ValueError(f"name_rules[{index}].{key} must be a list")
+            if rule.get('starts_with'):
+                prefixes.append(f'(?P<r{index}>{"|".join(re.escape(prefix) for prefix in rule["starts_with"])})')
+            words = [keyword.lower() for keyword in rule.get('contains', []) if keyword]
+            if words:
+                keywords.append(f'(?P<r{index}>{_trie_pattern(words)})')
+            if rule.get('pattern'):
+                patterns.append(f"(?P<r{index}>{rule['pattern']})")
+
+        self.default = _device(config.get('default') or {'prefix': 'M', 'device_type': '内部リレー'}, "default")
+
+        # Keywords are matched against the lowercased name. A lookahead at
+        # every position finds overlapping matches, so an earlier rule wins
+        # even when a later rule matches further left.
+        try:
+            self._prefixes = re.compile('|'.join(prefixes)) if prefixes else None
+            self._keywords = re.compile(f'(?=(?:{"|".join(keywords)}))') if keywords else None
+            self._patterns = re.compile(f'(?=(?:{"|".join(patterns)}))') if patterns else None
+        except re.error as e:
+            raise ValueError(f"Invalid pattern in device rules: {e}")
+
+    def match(self, var_name: str) -> Optional[Tuple[str, str]]:
+        """(prefix, device_type) of the first name rule that matches, if any"""
+        best = len(self.rules)
+        if self._prefixes is not None:
+            match = self._prefixes.match(var_name)
+            if match is not None:
+                best = int(match.lastgroup[1:])
+        for matcher, text in ((self._keywords, var_name.lower()), (self._patterns, var_name)):
+            if matcher is None or best == 0:
+                continue
+            for match in matcher.finditer(text):
+                best = min(best, int(match.lastgroup[1:]))
+                if best == 0:
+                    break
+        return self.rules[best] if best < len(self.rules) else None
+
+    def classify(self, var_name: str, data_type: str = 'BOOL') -> Optional[Tuple[str, str]]:
+        """Device for a declared variable, or None when its type has no device"""
+        data_type = data_type.upper()
+        if data_type not in self.types:
+            return None
+        fixed = self.types[data_type]
+        if fixed is not None:
+            return fixed
+        return self.match(var_name) or self.default
+
+
+def load_rules_file(path: str) -> dict:
+    """Read a rule table from JSON, or YAML when PyYAML is installed"""
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required for YAML device rule files")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+# Compiled once per process; DEVICE_RULES_PATH points at a site-specific table
+DEFAULT_RULES = DeviceRules(load_rules_file(os.environ.get('DEVICE_RULES_PATH') or _DEFAULT_PATH))
+
+
+@lru_cache(maxsize=32)
+def _compile(config_json: str) -> DeviceRules:
+    return DeviceRules(json.loads(config_json))
+
+
+def rules_for_options(options: Optional[dict]) -> DeviceRules:
+    """Rules for a request: the defaults, with ``options["device_rules"]`` on top
+
+    ``types`` entries are merged per data type; ``name_rules`` and
+    ``default`` replace the site defaults when given. Raises ValueError for
+    a malformed table or a name rule with a ``pattern``.
+    """
+    overrides = (options or {}).get('device_rules')
+    if not overrides:
+        return DEFAULT_RULES
+    if not isinstance(overrides, dict):
+        raise ValueError("options.device_rules must be an object")
+    # A regex runs against every variable name in a worker; only the site
+    # table may use one, so a request cannot stall a worker by backtracking
+    for index, rule in enumerate(overrides.get('name_rules') or []):
+        if isinstance(rule, dict) and 'pattern' in rule:
+            raise ValueError(f"name_rules[{index}].pattern is only allowed in the site rule table; "
+                             "use starts_with or contains")
+    config = dict(DEFAULT_RULES.config)
+    config['types'] = {**(config.get('types') or {}), **(overrides.get('types') or {})}
+    for key in ('name_rules', 'default'):
+        if key in overrides:
+            config[key] = overrides[key]
+    return _compile(json.dumps(config, sort_keys=True))
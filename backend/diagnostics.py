@@ -0,0 +1,118 @@
+"""Structured diagnostics with a severity, a stable code and a source span
+
+The parser and converter collect Diagnostic tuples in their ``errors`` and
+``warnings`` lists. str() of a diagnostic is the message as the API has
+always listed it; payload() adds the structured form under
+``diagnostics`` for editors, with 1-based, end-exclusive positions in the
+original file. Spans of sections that moved since they were parsed (see
+incremental.py) are corrected with Diagnostic.moved().
+
+Severities:
+
+- ``fatal``: the conversion itself failed and produced nothing
+- ``error``: a statement or declaration was dropped
+- ``warning``: converted, but not everything was translated
+"""
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from st_ast import Span
+
+FATAL = 'fatal'
+ERROR = 'error'
+WARNING = 'warning'
+
+# Parser
+EXPECTED = 'ST101'          # A required token is missing, e.g. ';' or THEN
+UNEXPECTED = 'ST102'        # A token that cannot appear here
+UNEXPECTED_END = 'ST103'    # Input ended inside a statement
+MISSING_END = 'ST104'       # A section or POU is not closed
+# Converter
+CONVERSION_FAILED = 'ST201'  # A parsed statement could not be translated
+UNREACHABLE = 'ST202'        # Statements under a condition that is never true
+UNSUPPORTED = 'ST203'        # A construct the converter skips, e.g. loops
+DEVICE_SPACE = 'ST204'       # No free address left on the model for a variable
+# Service
+INTERNAL = 'ST901'           # The conversion raised or its worker died
+ABORTED = 'ST902'            # A stream was cut short: time limit, or the client stopped reading
+
+# The text listed in ``errors`` / ``warnings``, per code
+_TEXT = {
+    EXPECTED: "Error parsing line {line}: '{subject}' - {message}",
+    UNEXPECTED: "Error parsing line {line}: '{subject}' - {message}",
+    UNEXPECTED_END: "Error parsing line {line}: '{subject}' - {message}",
+    MISSING_END: "{message} at line {line}",
+    CONVERSION_FAILED: "Error converting line {line}: {message}",
+    UNREACHABLE: "Statements at line {line} can never execute and were skipped",
+    UNSUPPORTED: "{subject} loop at line {line} is not supported and was skipped",
+    DEVICE_SPACE: "Cannot allocate {subject}: {message}",
+    INTERNAL: "Critical error: {message}",
+    ABORTED: "Conversion aborted: {message}"
+}
+
+
+class Diagnostic(NamedTuple):
+    severity: str
+    code: str
+    message: str
+    span: Optional[Span] = None
+    subject: str = ''  # The offending token or construct, where the text names it
+
+    def __str__(self) -> str:
+        line = self.span.line if self.span is not None else '?'
+        return _TEXT[self.code].format(line=line, subject=self.subject, message=self.message)
+
+    def to_dict(self) -> dict:
+        span = self.span
+        return {
+            'severity': self.severity,
+            'code': self.code,
+            'message': self.message,
+            'line': span.line if span else None,
+            'column': span.col if span else None,
+            'end_line': span.end_line if span else None,
+            'end_column': span.end_col if span else None
+        }
+
+    def format(self, path: str) -> str:
+        """``path:line:column: severity: message [code]``, the form editors and CI logs pick up"""
+        location = f'{path}:{self.span.line}:{self.span.col}' if self.span is not None else path
+        return f'{location}: {self.severity}: {self.message} [{self.code}]'
+
+    def moved(self, old: Tuple[int, int], new: Tuple[int, int]) -> 'Diagnostic':
+        """This diagnostic for a section that moved from ``old`` to ``new`` (line, column of its start)"""
+        span = self.span
+        if span is None or old == new:
+            return self
+        line, col = _move(span.line, span.col, old, new)
+        end_line, end_col = _move(span.end_line, span.end_col, old, new)
+        return self._replace(span=Span(line, col, end_line, end_col))
+
+
+def _move(line: int, col: int, old: Tuple[int, int], new: Tuple[int, int]) -> Tuple[int, int]:
+    # Only the section's first line shares its columns with the text before it
+    if line == old[0]:
+        col += new[1] - old[1]
+    return line + new[0] - old[0], col
+
+
+def fatal(message: str) -> Diagnostic:
+    return Diagnostic(FATAL, INTERNAL, message)
+
+
+def aborted(message: str) -> Diagnostic:
+    return Diagnostic(FATAL, ABORTED, message)
+
+
+def is_failure(rung_count: int, errors: Iterable[Diagnostic]) -> bool:
+    """A conversion failed when it produced no rungs and has a fatal diagnostic"""
+    return rung_count == 0 and any(error.severity == FATAL for error in errors)
+
+
+def payload(errors: List[Diagnostic], warnings: List[Diagnostic]) -> dict:
+    """``errors`` and ``warnings`` as text plus ``diagnostics``, in source order, for a response"""
+    located = sorted(errors + warnings, key=lambda d: d.span or (float('inf'),))
+    return {
+        'errors': [str(error) for error in errors],
+        'warnings': [str(warning) for warning in warnings],
+        'diagnostics': [diagnostic.to_dict() for diagnostic in located]
+    }
@@ -0,0 +1,248 @@
+import asyncio
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# How long past its time limit a job that ignores the in-worker alarm (stuck
+# in C code) may run before its worker is killed
+KILL_GRACE = 5.0
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a job cannot be accepted or finished right now"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class JobTimedOut(ExecutorSaturated):
+    """Raised by ``run`` when a job outlives the time limit"""
+
+
+class ConversionTimeout(BaseException):
+    """Raised inside a worker when its job outlives the time limit
+
+    A BaseException so the ``except Exception`` in run_conversion does not
+    turn it into an ordinary diagnostic.
+    """
+
+
+# Set in each worker by _init_worker; jobs report (job_id, pid, started_at) on it
+_starts = None
+
+
+def _init_worker(starts):
+    global _starts
+    _starts = starts
+
+
+def _on_alarm(signum, frame):
+    raise ConversionTimeout()
+
+
+def _timed_call(job_id: int, fn: Callable, args: tuple, timeout: float) -> Tuple[float, float, Any]:
+    """Run fn in the worker and report when it started and how long it took
+
+    The time limit runs from here, when a worker picks the job up, so time
+    spent queued does not count, and it aborts only this job: the worker
+    stays alive for the next one.
+    """
+    started_at = time.time()
+    if _starts is not None:
+        _starts.put((job_id, os.getpid(), started_at))
+    start = time.perf_counter()
+    alarm = timeout > 0 and hasattr(signal, 'setitimer')
+    if alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = fn(*args)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return started_at, time.perf_counter() - start, result
+
+
+class ConversionExecutor:
+    """Process pool that keeps CPU-bound conversions off the event loop
+
+    Jobs beyond ``max_workers + max_queue`` are rejected with 429 instead of
+    piling up. A job running longer than ``timeout`` seconds after a worker
+    picked it up is aborted inside that worker; one that does not stop within
+    KILL_GRACE after that has its worker killed. Killing a worker breaks the
+    whole pool, so the other jobs that were running on it are resubmitted
+    once to the fresh pool instead of failing.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: int = 32, timeout: float = 30.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._starts = None
+        # Jobs awaiting a result, with (pid, started_at) once a worker picks them up
+        self._started: Dict[int, Optional[Tuple[int, float]]] = {}
+        self._job_ids = itertools.count()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._avg_run_time = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ConversionExecutor":
+        return cls(
+            max_workers=int(os.environ.get('CONVERTER_WORKERS', '0')) or None,
+            max_queue=int(os.environ.get('CONVERTER_MAX_QUEUE', '32')),
+            timeout=float(os.environ.get('CONVERTER_TIMEOUT', '30'))
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            if self._starts is None:
+                self._starts = multiprocessing.Queue()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             initializer=_init_worker, initargs=(self._starts,))
+        return self._pool
+
+    def _retry_after(self) -> int:
+        """Estimate how long until a worker slot frees up"""
+        waves = self._pending / self.max_workers
+        return max(1, math.ceil(waves * max(self._avg_run_time, 0.1)))
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool, unless it was already replaced by another job"""
+        if self._pool is not pool:
+            return
+        self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _started_job(self, job_id: int) -> Optional[Tuple[int, float]]:
+        """(pid, started_at) of a job a worker has picked up, else None"""
+        try:
+            while True:
+                started_id, pid, started_at = self._starts.get_nowait()
+                if started_id in self._started:
+                    self._started[started_id] = (pid, started_at)
+        except queue.Empty:
+            pass
+        return self._started.get(job_id)
+
+    def _kill_worker(self, pool: ProcessPoolExecutor, pid: int):
+        # ProcessPoolExecutor has no public way to stop a running job
+        process = getattr(pool, '_processes', {}).get(pid)
+        if process is not None:
+            process.kill()
+
+    async def _submit(self, fn: Callable, args: tuple) -> Tuple[float, float, Any]:
+        """Run one attempt of a job, killing its worker if it hangs past the limit"""
+        job_id = next(self._job_ids)
+        pool = self._get_pool()
+        self._started[job_id] = None
+        future = asyncio.get_running_loop().run_in_executor(pool, _timed_call, job_id, fn, args, self.timeout)
+        killed = False
+        try:
+            while True:
+                try:
+                    # Waiting in the queue is not timed; only the run from the worker's start is
+                    return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout + KILL_GRACE)
+                except asyncio.TimeoutError:
+                    started = self._started_job(job_id)
+                    if started is not None and time.time() - started[1] > self.timeout + KILL_GRACE:
+                        killed = True
+                        self._kill_worker(pool, started[0])
+                except BrokenProcessPool:
+                    self._recycle_pool(pool)
+                    if killed:
+                        raise ConversionTimeout()
+                    raise
+        except asyncio.CancelledError:
+            # Nobody waits for the result: drop the job if it has not started
+            future.cancel()
+            raise
+        finally:
+            self._started.pop(job_id, None)
+
+    async def run(self, fn: Callable, *args) -> Tuple[Any, float, float]:
+        """Run fn(*args) in a worker process
+
+        Returns ``(result, queue_time, run_time)`` where queue_time is how long
+        the job waited for a free worker.
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise ExecutorSaturated(
+                "Conversion queue is full, please retry later",
+                status_code=429,
+                retry_after=self._retry_after()
+            )
+
+        self._pending += 1
+        submitted_at = time.time()
+        try:
+            try:
+                started_at, run_time, result = await self._submit(fn, args)
+            except BrokenProcessPool:
+                # Usually another job's worker died and took the pool with it
+                started_at, run_time, result = await self._submit(fn, args)
+        except ConversionTimeout:
+            self._timed_out += 1
+            raise JobTimedOut(
+                f"Conversion exceeded the {self.timeout:g}s time limit",
+                status_code=503,
+                retry_after=self._retry_after()
+            )
+        except BrokenProcessPool:
+            raise ExecutorSaturated(
+                "Conversion worker crashed, please retry",
+                status_code=503,
+                retry_after=1
+            )
+        finally:
+            self._pending -= 1
+
+        self._completed += 1
+        # Exponential moving average feeds the Retry-After estimate
+        self._avg_run_time = run_time if self._completed == 1 else 0.8 * self._avg_run_time + 0.2 * run_time
+        queue_time = max(0.0, started_at - submitted_at)
+        return result, queue_time, run_time
+
+    def channel(self, maxsize: int) -> tuple:
+        """A bounded queue and a cancel flag shared between the caller and a job
+
+        Both are manager proxies, so they can be passed as arguments to
+        ``run`` for a job that hands results back while it is running.
+        """
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        return self._manager.Queue(maxsize), self._manager.Event()
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'timeout': self.timeout,
+            'pending': self._pending,
+            'completed': self._completed,
+            'rejected': self._rejected,
+            'timed_out': self._timed_out,
+            'avg_run_time': round(self._avg_run_time, 6)
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
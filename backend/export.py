@@ -0,0 +1,227 @@
+"""Export generated ladders for GX Works
+
+Three formats, each written as a generator of text chunks, one rung at a
+time, so a program of any size exports in constant memory:
+
+- ``il``: Mitsubishi instruction list, one ``LD X0`` style line per step
+- ``csv``: the same instructions as a program CSV with step numbers, the
+  coil description as each rung's line statement
+- ``comments``: device comment CSV (device, comment) for GX Works' comment import
+
+Series contacts become LD/LDI then AND/ANI, a single-contact branch OR/ORI,
+a multi-contact branch its own LD...ORB block, and a parallel block after
+other contacts an ANB. Rungs without a condition start from the model's
+always-on relay (SM400, M8000 on FX3U). read_instructions() reverses the
+instruction list for round-trip checks.
+
+Run from the backend directory:
+
+    python export.py ../sample_warehouse.st -o warehouse.il --comments warehouse_comments.csv
+    python export.py project.st --format csv --plc-type fx5u -o project.csv
+"""
+import argparse
+import sys
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from allocator import ALWAYS_ON, plan_for_options
+from converter import SimpleLadderConverter
+from ladder import Rung
+from st_parser import parse_source
+
+EXPORT_FORMATS = ('il', 'csv', 'comments')
+
+# GX Works truncates device comments beyond this many characters
+COMMENT_MAX = 32
+
+_NEWLINE = '\r\n'
+
+
+def rung_instructions(rung: Rung, always_on: str = ALWAYS_ON) -> Iterator[Tuple[str, str]]:
+    """(instruction, device) pairs of one rung; ANB and ORB have no device"""
+    yield from _series(rung.contacts, always_on)
+    yield 'OUT', rung.coil_address
+    for i in range(0, len(rung.coils), 2):
+        yield 'OUT', rung.coils[i]
+
+
+def _series(contacts: tuple, always_on: str) -> Iterator[Tuple[str, str]]:
+    if not contacts:
+        yield 'LD', always_on
+    for i in range(0, len(contacts), 3):
+        address, branches, normally_open = contacts[i:i + 3]
+        if address is not None:
+            if i:
+                yield ('AND' if normally_open else 'ANI'), address
+            else:
+                yield ('LD' if normally_open else 'LDI'), address
+            continue
+        for index, branch in enumerate(branches):
+            if index and len(branch) == 3 and branch[0] is not None:
+                yield ('OR' if branch[2] else 'ORI'), branch[0]
+                continue
+            yield from _series(branch, always_on)
+            if index:
+                yield 'ORB', ''
+        if i:
+            yield 'ANB', ''
+
+
+def instruction_list(rungs: Iterable[Rung], always_on: str = ALWAYS_ON) -> Iterator[str]:
+    """Instruction list text, one chunk per rung, closed by END"""
+    for rung in rungs:
+        yield ''.join(f'{op} {device}{_NEWLINE}' if device else f'{op}{_NEWLINE}'
+                      for op, device in rung_instructions(rung, always_on))
+    yield f'END{_NEWLINE}'
+
+
+def program_csv(rungs: Iterable[Rung], always_on: str = ALWAYS_ON) -> Iterator[str]:
+    """Instruction list as CSV rows: step, line statement, instruction, device"""
+    yield _csv_row(('Step No.', 'Line Statement', 'Instruction', 'I/O(Device)'))
+    step = 0
+    for rung in rungs:
+        rows = []
+        statement = rung.coil_description
+        for op, device in rung_instructions(rung, always_on):
+            rows.append(_csv_row((str(step), statement, op, device)))
+            statement = ''
+            step += 1
+        yield ''.join(rows)
+    yield _csv_row((str(step), '', 'END', ''))
+
+
+def device_comments(devices: Iterable[Tuple[str, str]], title: str = 'COMMENT') -> Iterator[str]:
+    """Device comment CSV from (address, comment) pairs, first comment per address"""
+    yield _csv_row((title,))
+    yield _csv_row(('Device Name', 'Comment'))
+    seen = set()
+    for address, comment in devices:
+        if address not in seen:
+            seen.add(address)
+            yield _csv_row((address, comment[:COMMENT_MAX]))
+
+
+def _csv_row(values: tuple) -> str:
+    return ','.join('"' + value.replace('"', '""') + '"' for value in values) + _NEWLINE
+
+
+def converter_comments(converter: SimpleLadderConverter) -> Iterator[Tuple[str, str]]:
+    """(address, variable name) for every symbol of a finished conversion"""
+    for key, address in converter.symbols.addresses().items():
+        yield address, key
+
+
+def parse_instruction_list(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """(instruction, device) pairs from instruction list text"""
+    for line in lines:
+        op, _, device = line.strip().partition(' ')
+        if op and not op.startswith(';'):
+            yield op.upper(), device.strip()
+
+
+def read_instructions(instructions: Iterable[Tuple[str, str]], comments: Optional[Dict[str, str]] = None,
+                      always_on: str = ALWAYS_ON) -> Iterator[Rung]:
+    """Rungs of an instruction list, the inverse of rung_instructions()
+
+    Descriptions come from ``comments`` (address -> comment), as an
+    instruction list carries none. Raises ValueError for instructions
+    outside LD/LDI/AND/ANI/OR/ORI/ANB/ORB/OUT/END.
+    """
+    comments = comments or {}
+    stack = []
+    coils = []
+    for op, device in instructions:
+        if op == 'OUT':
+            coils.append(device)
+            continue
+        if coils:
+            yield _read_rung(stack, coils, comments, always_on)
+            stack, coils = [], []
+        if op == 'END':
+            return
+        contact = (device, comments.get(device, ''), op in ('LD', 'AND', 'OR'))
+        if op in ('LD', 'LDI'):
+            stack.append(contact)
+        elif op in ('AND', 'ANI') and stack:
+            stack[-1] += contact
+        elif op in ('OR', 'ORI') and stack:
+            stack[-1] = _parallel(stack[-1], contact)
+        elif op in ('ORB', 'ANB') and len(stack) > 1:
+            block = stack.pop()
+            stack[-1] = _parallel(stack[-1], block) if op == 'ORB' else stack[-1] + block
+        else:
+            raise ValueError(f"Unsupported or misplaced instruction: {op} {device}".rstrip())
+    if coils:
+        yield _read_rung(stack, coils, comments, always_on)
+
+
+def _parallel(series: tuple, branch: tuple) -> tuple:
+    # Branches after the first join the block the series already is
+    if len(series) == 3 and series[0] is None:
+        return (None, series[1] + (branch,), None)
+    return (None, (series, branch), None)
+
+
+def _read_rung(stack: list, coils: list, comments: dict, always_on: str) -> Rung:
+    if len(stack) != 1:
+        raise ValueError(f"Rung driving {coils[0]} leaves {len(stack)} blocks open")
+    contacts = stack[0]
+    if contacts == (always_on, comments.get(always_on, ''), True):
+        contacts = ()
+    extra = ()
+    for address in coils[1:]:
+        extra += (address, comments.get(address, ''))
+    return Rung(contacts, coils[0], comments.get(coils[0], ''), extra)
+
+
+def export_source(converter: SimpleLadderConverter, source_code: str, format: str = 'il') -> Iterator[str]:
+    """Convert and export in one pass; rungs are written as they are generated
+
+    The converter's errors and warnings are complete once the generator is
+    exhausted.
+    """
+    unit, parse_errors, parse_warnings = parse_source(source_code)
+    rungs = converter.iter_rungs(unit, parse_errors, parse_warnings)
+    always_on = converter.allocation.model.always_on
+    if format == 'il':
+        yield from instruction_list(rungs, always_on)
+    elif format == 'csv':
+        yield from program_csv(rungs, always_on)
+    else:
+        for _ in rungs:
+            pass
+        yield from device_comments(converter_comments(converter))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export ST as a GX Works instruction list and device comments")
+    parser.add_argument('file')
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    parser.add_argument('--format', choices=('il', 'csv'), default='il')
+    parser.add_argument('--comments', help="Also write the device comment CSV to this file")
+    parser.add_argument('--plc-type', default='mitsubishi')
+    parser.add_argument('--encoding', default='cp932', help="Output encoding (default: Shift-JIS, as GX Works reads)")
+    args = parser.parse_args()
+
+    with open(args.file, encoding='utf-8') as f:
+        source_code = f.read()
+
+    converter = SimpleLadderConverter(allocation=plan_for_options(args.plc_type))
+    out = open(args.output, 'w', encoding=args.encoding, errors='replace', newline='') if args.output else sys.stdout
+    try:
+        for chunk in export_source(converter, source_code, args.format):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    if args.comments:
+        with open(args.comments, 'w', encoding=args.encoding, errors='replace', newline='') as f:
+            for chunk in device_comments(converter_comments(converter)):
+                f.write(chunk)
+    for diagnostic in converter.errors + converter.warnings:
+        print(diagnostic.format(args.file), file=sys.stderr)
+    return 1 if converter.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+from allocator import AllocationPlan, plan_for_options
+from converter import SimpleLadderConverter
+from device_rules import DeviceRules
+from diagnostics import payload as diagnostics_payload
+from lexer import tokenize
+from st_parser import STParser
+
+_SECTION_END = {
+    'PROGRAM': 'END_PROGRAM',
+    'FUNCTION_BLOCK': 'END_FUNCTION_BLOCK',
+    'FUNCTION': 'END_FUNCTION',
+    'TYPE': 'END_TYPE'
+}
+
+
+def _section_end(word: Optional[str]) -> Optional[str]:
+    if word in _SECTION_END:
+        return _SECTION_END[word]
+    if word is not None and word.startswith('VAR'):
+        return 'END_VAR'
+    return None
+
+
+def split_sections(source: str) -> List[tuple]:
+    """Split source into top-level sections without parsing them
+
+    Returns ``(kind, name, text, tokens)`` per VAR block, TYPE, POU or run
+    of loose statements (kind ``LOOSE``), in source order.
+    """
+    tokens = list(tokenize(source))
+    line_starts = [0]
+    position = source.find('\n')
+    while position != -1:
+        line_starts.append(position + 1)
+        position = source.find('\n', position + 1)
+
+    def offset(token):
+        return line_starts[token.line - 1] + token.col - 1
+
+    def word(index):
+        token = tokens[index]
+        return token.value.upper() if token.kind == 'KEYWORD' else None
+
+    sections = []
+    count = len(tokens)
+    i = 0
+    while i < count:
+        kind = word(i)
+        end_word = _section_end(kind)
+        j = i
+        if end_word is not None:
+            while j + 1 < count and word(j) != end_word:
+                j += 1
+        else:
+            kind = 'LOOSE'
+            while j + 1 < count and _section_end(word(j + 1)) is None:
+                j += 1
+        # Trailing semicolons belong to the section they close
+        while j + 1 < count and tokens[j + 1].value == ';':
+            j += 1
+
+        name = ''
+        if kind in ('PROGRAM', 'FUNCTION_BLOCK', 'FUNCTION') and i + 1 < count and tokens[i + 1].kind == 'IDENT':
+            name = tokens[i + 1].value
+        text = source[offset(tokens[i]):offset(tokens[j]) + len(tokens[j].value)]
+        sections.append((kind, name, text, tokens[i:j + 1]))
+        i = j + 1
+    return sections
+
+
+class _Section:
+    __slots__ = ('key', 'kind', 'name', 'id', 'origin', 'start', 'var_blocks', 'pou', 'errors', 'warnings',
+                 'declaration_errors', 'declaration_warnings', 'rungs', 'used_names', 'rung_errors', 'rung_warnings')
+
+    def __init__(self, key: str, kind: str, name: str, tokens: list):
+        self.key = key
+        self.kind = kind
+        self.name = name
+        self.id = None
+        # (line, column) where the section began when parsed, and where it begins now
+        self.origin = self.start = (tokens[0].line, tokens[0].col)
+        parser = STParser(tokens)
+        unit = parser.parse()
+        # Spans keep the positions from the version that was parsed; reused
+        # sections are not re-parsed when code above them moves, located()
+        # maps their diagnostics to the current positions
+        self.var_blocks = unit.var_blocks + [block for pou in unit.pous for block in pou.var_blocks]
+        self.pou = unit.pous[0] if unit.pous else None
+        self.errors = parser.errors
+        self.warnings = parser.warnings
+        self.declaration_errors = []
+        self.declaration_warnings = []
+        self.rungs = None
+        self.used_names = set()
+        self.rung_errors = []
+        self.rung_warnings = []
+
+    def located(self, diagnostics: list) -> list:
+        """Diagnostics moved from where the section was parsed to where it is now"""
+        if self.start == self.origin:
+            return diagnostics
+        return [diagnostic.moved(self.origin, self.start) for diagnostic in diagnostics]
+
+
+class VersionConflict(Exception):
+    """An update was made against a version the session has moved past"""
+
+    def __init__(self, base_version: int, version: int):
+        super().__init__(f"Edits are against version {base_version} but the session is at version {version}")
+        self.version = version
+
+
+class IncrementalSession:
+    """Conversion state kept between edits of one program
+
+    Each update re-parses only sections whose text changed and re-converts
+    only POUs that changed or use a variable whose declaration changed.
+    Variables keep their device addresses while their declaration is
+    unchanged; addresses of removed variables are freed for reuse.
+    """
+
+    def __init__(self, plc_type: str = "mitsubishi", rules: Optional[DeviceRules] = None,
+                 allocation: Optional[AllocationPlan] = None):
+        self.plc_type = plc_type
+        self.source = ''
+        self.version = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self.converter = SimpleLadderConverter(rules, allocation=allocation or plan_for_options(plc_type))
+        self._sections = []
+        self._declarations = {}  # symbol key -> (data_type, address)
+        self._instances = set()  # keys of declarations without a device, e.g. FB instances
+
+    def apply_edits(self, edits: List[dict]) -> str:
+        """Apply {offset, length, text} replacements to the current source"""
+        source = self.source
+        for edit in sorted(edits, key=lambda e: e['offset'], reverse=True):
+            start = edit['offset']
+            end = start + edit.get('length', 0)
+            if start < 0 or end > len(source) or end < start:
+                raise ValueError(f"Edit range {start}..{end} is outside the source (length {len(source)})")
+            source = source[:start] + edit.get('text', '') + source[end:]
+        return source
+
+    def update(self, source_code: Optional[str] = None, edits: Optional[List[dict]] = None,
+               base_version: Optional[int] = None) -> dict:
+        """Convert a new full source, or ``edits`` applied to the current one
+
+        Edit offsets only mean something against the version they were made
+        on, so they are applied under the lock, after checking
+        ``base_version`` against the session's version.
+        """
+        with self.lock:
+            self.last_used = time.monotonic()
+            if base_version is not None and base_version != self.version:
+                raise VersionConflict(base_version, self.version)
+            if edits is not None:
+                source_code = self.apply_edits(edits)
+            return self._update(source_code)
+
+    def _update(self, source_code: str) -> dict:
+        converter = self.converter
+        symbols = converter.symbols
+        old_variables = symbols.addresses()
+        old_rungs = {section.id: section.rungs for section in self._sections if section.rungs is not None}
+
+        # Reuse unchanged sections, parse the rest
+        reusable = {}
+        for section in self._sections:
+            reusable.setdefault(section.key, []).append(section)
+        sections = []
+        fresh = set()
+        for kind, name, text, tokens in split_sections(source_code):
+            key = hashlib.blake2b(f'{kind}\0{text}'.encode('utf-8'), digest_size=16).hexdigest()
+            if reusable.get(key):
+                section = reusable[key].pop(0)
+                section.start = (tokens[0].line, tokens[0].col)
+                sections.append(section)
+            else:
+                section = _Section(key, kind, name, tokens)
+                sections.append(section)
+                fresh.add(id(section))
+
+        # Same order as a full conversion: globals, function blocks, programs
+        pou_sections = [s for s in sections if s.pou is not None and s.pou.kind != 'PROGRAM']
+        pou_sections += [s for s in sections if s.pou is not None and s.pou.kind == 'PROGRAM']
+        seen_ids = {}
+        for section in pou_sections:
+            base = f'{section.pou.kind}:{section.pou.name}'
+            seen_ids[base] = seen_ids.get(base, 0) + 1
+            section.id = base if seen_ids[base] == 1 else f'{base}:{seen_ids[base]}'
+
+        var_blocks = [(s, symbols.globals, block) for s in sections if s.pou is None for block in s.var_blocks]
+        var_blocks += [(s, symbols.scope(s.pou.kind, s.pou.name), block) for s in pou_sections for block in s.var_blocks]
+
+        # Release addresses of variables whose declaration changed or vanished
+        declarations = {}
+        instances = set()
+        for _, scope, block in var_blocks:
+            for declaration in block.declarations:
+                for var_name in declaration.names:
+                    key = symbols.key(scope, var_name)
+                    declarations.setdefault(key, (declaration.data_type, declaration.address))
+                    if converter.rules.classify(var_name, declaration.data_type) is None:
+                        instances.add(key)
+        changed_names = {key for key in self._declarations if declarations.get(key) != self._declarations[key]}
+        changed_names.update(key for key in declarations if key not in self._declarations)
+        for key in changed_names:
+            converter._forget(key)
+        symbols.unbind()
+        # Every declaration is bound again, so its diagnostics (e.g. no free
+        # device left) are collected afresh, per section for located()
+        for section in sections:
+            section.declaration_errors, section.declaration_warnings = [], []
+        for section, scope, block in var_blocks:
+            converter.errors, converter.warnings = section.declaration_errors, section.declaration_warnings
+            for declaration in block.declarations:
+                converter._parse_variable_declaration(declaration, scope)
+        self._declarations = declarations
+
+        # Re-convert POUs that changed or depend on a changed variable; a
+        # changed FB instance can re-route any inst.member, so it touches all
+        rescan = bool(changed_names & (instances | self._instances))
+        self._instances = instances
+        for section in pou_sections:
+            if (id(section) not in fresh and section.rungs is not None and not rescan
+                    and not (section.used_names & changed_names)):
+                continue
+            converter.errors, converter.warnings = [], []
+            converter.used_names = set()
+            converter._scope = symbols.scope(section.pou.kind, section.pou.name)
+            section.rungs = converter._convert_statements(section.pou.body, [])
+            section.used_names = converter.used_names
+            section.rung_errors, section.rung_warnings = converter.errors, converter.warnings
+        converter.used_names = None
+        converter._scope = symbols.globals
+
+        # Forget variables nothing refers to any more
+        live = set(declarations)
+        for section in pou_sections:
+            live |= section.used_names
+        for key in [key for key in symbols.keys if key not in live]:
+            converter._forget(key)
+
+        self._sections = sections
+        self.source = source_code
+        self.version += 1
+        return self._delta(old_rungs, old_variables, pou_sections)
+
+    def _delta(self, old_rungs: dict, old_variables: dict, pou_sections: list) -> dict:
+        added, changed, removed = [], [], []
+        current_ids = set()
+        for section in pou_sections:
+            current_ids.add(section.id)
+            previous = old_rungs.get(section.id, [])
+            if previous is section.rungs:
+                continue
+            for index, rung in enumerate(section.rungs):
+                entry = {'id': f'{section.id}#{index}', 'section': section.id, 'index': index, 'rung': rung.to_dict()}
+                if index >= len(previous):
+                    added.append(entry)
+                elif previous[index] != rung:
+                    changed.append(entry)
+            removed.extend(f'{section.id}#{index}' for index in range(len(section.rungs), len(previous)))
+        for section_id, previous in old_rungs.items():
+            if section_id not in current_ids:
+                removed.extend(f'{section_id}#{index}' for index in range(len(previous)))
+
+        variable_map = self.converter.symbols.addresses()
+        old_addresses = set(old_variables.values())
+        new_addresses = {addr: name for name, addr in variable_map.items()}
+
+        errors, warnings = [], []
+        for section in self._sections:
+            errors.extend(section.located(section.errors))
+            warnings.extend(section.located(section.warnings))
+        for section in self._sections:
+            errors.extend(section.located(section.declaration_errors))
+            warnings.extend(section.located(section.declaration_warnings))
+        for section in pou_sections:
+            errors.extend(section.located(section.rung_errors))
+            warnings.extend(section.located(section.rung_warnings))
+
+        return {
+            'version': self.version,
+            'sections': [{'id': section.id, 'rung_count': len(section.rungs)} for section in pou_sections],
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+            'device_updates': {
+                addr: name for addr, name in new_addresses.items() if old_variables.get(name) != addr
+            },
+            'device_removals': sorted(old_addresses - set(new_addresses)),
+            **diagnostics_payload(errors, warnings)
+        }
+
+    def snapshot(self) -> dict:
+        """Full current state, for clients that lost track of the deltas"""
+        with self.lock:
+            self.last_used = time.monotonic()
+            pou_sections = [s for s in self._sections if s.pou is not None and s.rungs is not None]
+            pou_sections.sort(key=lambda s: s.pou.kind == 'PROGRAM')
+            return {
+                'version': self.version,
+                'rungs': [rung.to_dict() for section in pou_sections for rung in section.rungs],
+                'device_map': self.converter.symbols.device_map(),
+                'device_usage': self.converter.devices.usage()
+            }
+
+
+class SessionStore:
+    """In-memory sessions evicted when idle too long or when over capacity"""
+
+    def __init__(self, max_sessions: int = 100, idle_timeout: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+
+    def create(self, plc_type: str = "mitsubishi", rules: Optional[DeviceRules] = None,
+               allocation: Optional[AllocationPlan] = None) -> tuple:
+        self._expire()
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+        session_id = uuid.uuid4().hex
+        session = IncrementalSession(plc_type, rules, allocation)
+        self._sessions[session_id] = session
+        return session_id, session
+
+    def get(self, session_id: str) -> Optional[IncrementalSession]:
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_used < cutoff]:
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
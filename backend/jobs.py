@@ -0,0 +1,268 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import List, Optional
+
+from converter import run_conversion
+from diagnostics import fatal
+from response_formats import conversion_payload
+
+FINISHED = ('done', 'failed', 'cancelled')
+
+# Seconds between progress writes from a running job, which also bounds how
+# long a cancelled job keeps converting
+PROGRESS_INTERVAL = 0.5
+
+# The store file lives in DATA_DIR (by default backend/data), which should
+# be on persistent storage: the temp dir may be wiped on reboot
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+_STORE_FILE = 'st-ladder-jobs.sqlite3'
+_DEFAULT_PATH = os.path.join(_DATA_DIR, _STORE_FILE)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job worker when the job was cancelled while running"""
+
+
+class JobStore:
+    """Job state, progress and results in SQLite
+
+    Shared by the API process and the job worker processes; each opens its
+    own connection. A job goes queued -> running -> done / failed, or to
+    cancelled from either of the first two. Every transition is one
+    conditional UPDATE, so a job cancelled mid-run is never marked done.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, plc_type TEXT, '
+            'options TEXT, source TEXT, created_at REAL, started_at REAL, finished_at REAL, '
+            'rungs INTEGER DEFAULT 0, success INTEGER, error TEXT, result BLOB)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)')
+
+    def submit(self, source_code: str, plc_type: str, options: Optional[dict]) -> str:
+        job_id = uuid.uuid4().hex
+        self._db.execute(
+            "INSERT INTO jobs (id, status, plc_type, options, source, created_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+            (job_id, plc_type, json.dumps(options or {}, sort_keys=True), source_code, time.time())
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Status of a job for the API, without its source or result"""
+        row = self._db.execute(
+            'SELECT status, plc_type, created_at, started_at, finished_at, rungs, success, error '
+            'FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, plc_type, created_at, started_at, finished_at, rungs, success, error = row
+        job = {
+            'job_id': job_id,
+            'status': status,
+            'plc_type': plc_type,
+            'created_at': _isoformat(created_at),
+            'started_at': _isoformat(started_at),
+            'finished_at': _isoformat(finished_at),
+            'progress': {'rungs': rungs},
+            'success': None if success is None else bool(success),
+            'error': error
+        }
+        if status == 'done':
+            job['result_url'] = f'/api/jobs/{job_id}/result'
+        return job
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        row = self._db.execute("SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def claim(self, job_id: str) -> Optional[tuple]:
+        """Mark a queued job running; its (source, plc_type, options), or None if it is not queued"""
+        updated = self._db.execute(
+            "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        ).rowcount
+        if not updated:
+            return None
+        source_code, plc_type, options = self._db.execute(
+            'SELECT source, plc_type, options FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        return source_code, plc_type, json.loads(options) if options else {}
+
+    def progress(self, job_id: str, rungs: int) -> bool:
+        """Record progress; False once the job is no longer running"""
+        return bool(self._db.execute(
+            "UPDATE jobs SET rungs = ? WHERE id = ? AND status = 'running'", (rungs, job_id)
+        ).rowcount)
+
+    def finish(self, job_id: str, success: bool, payload: bytes, rungs: int):
+        self._db.execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, rungs = ?, success = ?, result = ?, source = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (time.time(), rungs, int(success), payload, job_id)
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._db.execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, success = 0, error = ?, source = NULL "
+            "WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), error, job_id)
+        )
+
+    def cancel(self, job_id: str) -> bool:
+        return bool(self._db.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ?, source = NULL "
+            "WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), job_id)
+        ).rowcount)
+
+    def recover(self) -> List[str]:
+        """Requeue jobs a previous process left running; all unfinished jobs, oldest first"""
+        self._db.execute("UPDATE jobs SET status = 'queued', started_at = NULL, rungs = 0 WHERE status = 'running'")
+        rows = self._db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def cleanup(self, ttl: float) -> int:
+        """Delete jobs finished more than ``ttl`` seconds ago"""
+        return self._db.execute('DELETE FROM jobs WHERE finished_at < ?', (time.time() - ttl,)).rowcount
+
+    def stats(self) -> dict:
+        counts = dict(self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {status: counts.get(status, 0) for status in ('queued', 'running') + FINISHED}
+
+    @property
+    def closed(self) -> bool:
+        return self._db is None
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return None if timestamp is None else datetime.fromtimestamp(timestamp).isoformat()
+
+
+def run_job(path: str, job_id: str) -> str:
+    """Convert one stored job in a worker process; returns its final status"""
+    store = JobStore(path)
+    try:
+        claimed = store.claim(job_id)
+        if claimed is None:
+            return 'cancelled'
+        source_code, plc_type, options = claimed
+        start = time.perf_counter()
+        last_write = start
+
+        # Also called with 0 while parsing, see run_conversion
+        def progress(rungs: int):
+            nonlocal last_write
+            now = time.perf_counter()
+            if now - last_write >= PROGRESS_INTERVAL:
+                last_write = now
+                if not store.progress(job_id, rungs):
+                    raise JobCancelled()
+
+        try:
+            result = run_conversion(source_code, plc_type, options, progress)
+            success, payload = conversion_payload(result, time.perf_counter() - start)
+            store.finish(job_id, success, payload, result['rung_count'])
+            return 'done'
+        except JobCancelled:
+            return 'cancelled'
+        except Exception as e:
+            store.fail(job_id, str(fatal(str(e))))
+            return 'failed'
+    finally:
+        store.close()
+
+
+class JobQueue:
+    """Runs stored jobs on a local process pool, in submission order
+
+    The store outlives the process: start() requeues whatever a previous
+    run left unfinished and drops jobs finished more than ``ttl`` seconds
+    ago. One API process should own a store file at a time.
+    """
+
+    def __init__(self, path: str = _DEFAULT_PATH, max_workers: int = 1, ttl: float = 86400.0):
+        self.store = JobStore(path)
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._futures = {}  # job_id -> future, while queued or running here
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        return cls(
+            path=os.environ.get('JOB_STORE_PATH') or os.path.join(os.environ.get('DATA_DIR') or _DATA_DIR, _STORE_FILE),
+            max_workers=int(os.environ.get('JOB_WORKERS', '1')),
+            ttl=float(os.environ.get('JOB_TTL', '86400'))
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned, not forked: a child must not inherit this process's SQLite connection
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def start(self):
+        if self.store.closed:
+            self.store = JobStore(self.store.path)
+        self.store.cleanup(self.ttl)
+        for job_id in self.store.recover():
+            self._dispatch(job_id)
+
+    def submit(self, source_code: str, plc_type: str = "mitsubishi", options: Optional[dict] = None) -> str:
+        self.store.cleanup(self.ttl)
+        job_id = self.store.submit(source_code, plc_type, options)
+        self._dispatch(job_id)
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; a running one stops at its next progress write"""
+        cancelled = self.store.cancel(job_id)
+        future = self._futures.pop(job_id, None) if cancelled else None
+        # A job the pool has already handed to a worker cannot be cancelled
+        # here; its claim fails and it returns at once
+        if future is not None:
+            future.cancel()
+        return cancelled
+
+    def _dispatch(self, job_id: str):
+        future = self._get_pool().submit(run_job, self.store.path, job_id)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._done(job_id, f))
+
+    def _done(self, job_id: str, future):
+        self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # The worker died before it could record an outcome
+            self.store.fail(job_id, str(fatal(f"job worker failed: {error}")))
+            if isinstance(error, BrokenProcessPool):
+                self._pool = None
+
+    def stats(self) -> dict:
+        return {'workers': self.max_workers, 'ttl': self.ttl, **self.store.stats()}
+
+    def shutdown(self):
+        # Unfinished jobs stay in the store and are picked up by the next start()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self.store.close()
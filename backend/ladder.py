@@ -0,0 +1,266 @@
+import json
+from typing import Iterable, List
+
+from layout import layout_for
+
+
+class Rung:
+    """One rung: a contact network driving a coil
+
+    ``contacts`` is a flat tuple ``(address, description, normally_open, ...)``
+    of contacts in series, so a rung is two objects instead of a dict per
+    element. A parallel block takes one slot triple ``(None, branches,
+    None)``, where ``branches`` holds one such flat tuple per branch.
+    ``coils`` is a flat ``(address, description, ...)`` tuple of further
+    coils driven in parallel with the first.
+    Positions are implied by element order and only materialized on output,
+    from the layout.py layout shared by all rungs of the same shape.
+    """
+    __slots__ = ('contacts', 'coil_address', 'coil_description', 'coils')
+
+    def __init__(self, contacts: tuple, coil_address: str, coil_description: str, coils: tuple = ()):
+        self.contacts = contacts
+        self.coil_address = coil_address
+        self.coil_description = coil_description
+        self.coils = coils
+
+    def __eq__(self, other):
+        return (isinstance(other, Rung) and self.contacts == other.contacts
+                and self.coil_address == other.coil_address
+                and self.coil_description == other.coil_description
+                and self.coils == other.coils)
+
+    __hash__ = None
+
+    def __repr__(self):
+        coils = f', {self.coils!r}' if self.coils else ''
+        return f'Rung({self.contacts!r}, {self.coil_address!r}, {self.coil_description!r}{coils})'
+
+    def __getstate__(self):
+        return self.contacts, self.coil_address, self.coil_description, self.coils
+
+    def __setstate__(self, state):
+        self.contacts, self.coil_address, self.coil_description, self.coils = state
+
+    def remap(self, addresses: dict) -> 'Rung':
+        """Copy with device addresses replaced through ``addresses``"""
+        coils = list(self.coils)
+        for i in range(0, len(coils), 2):
+            coils[i] = addresses.get(coils[i], coils[i])
+        return Rung(_remap_contacts(self.contacts, addresses),
+                    addresses.get(self.coil_address, self.coil_address), self.coil_description, tuple(coils))
+
+    def addresses(self) -> set:
+        """Every device address the rung reads or drives"""
+        return _contact_addresses(self.contacts) | {self.coil_address} | set(self.coils[::2])
+
+    def to_dict(self) -> dict:
+        """The element-dict form the API and frontend use
+
+        A parallel block adds a ``branch`` element giving the box its
+        branches occupy, and a rung too long for one row a ``wrap`` element
+        where the line continues on the next band (see layout.layout).
+        """
+        places = layout_for(self.contacts, 1 + len(self.coils) // 2).places
+        elements = []
+        index = _contact_dicts(self.contacts, places, 0, elements)
+        coils = (self.coil_address, self.coil_description) + self.coils
+        for i in range(0, len(coils), 2):
+            elements.append({'type': 'coil', 'address': coils[i], 'description': coils[i + 1], **places[index][1]})
+            index += 1
+        return {'elements': elements}
+
+
+def rung_from_dict(rung: dict) -> Rung:
+    """The Rung whose to_dict() is ``rung``, recovered from element positions"""
+    elements = rung['elements']
+    start = elements[0]['y'] if elements else 0
+    contacts, index = _parse_series(elements, 0, start, None)
+    coils = ()
+    for element in elements[index:]:
+        if element['type'] != 'coil':
+            raise ValueError(f"Unexpected {element['type']} element after the coil")
+        coils += (element['address'], element['description'])
+    if not coils:
+        raise ValueError("Rung has no coil")
+    return Rung(contacts, coils[0], coils[1], coils[2:])
+
+
+def _parse_series(elements: list, index: int, y: int, right) -> tuple:
+    """Contacts of the series on row ``y`` left of ``right`` (None: the main line)"""
+    contacts = ()
+    while index < len(elements):
+        element = elements[index]
+        kind = element['type']
+        if kind == 'wrap' and right is None:
+            y = element['to_y']
+            index += 1
+            continue
+        if kind not in ('contact', 'branch') or element['y'] != y or (right is not None and element['x'] >= right):
+            break
+        index += 1
+        if kind == 'contact':
+            contacts += (element['address'], element['description'], element['isNormallyOpen'])
+            continue
+        left, top = element['x'], element['y']
+        bottom = top + element['height']
+        branches = []
+        # Every branch starts at the block's left edge, one below the other
+        while index < len(elements) and elements[index]['type'] in ('contact', 'branch') \
+                and elements[index]['x'] == left and top <= elements[index]['y'] < bottom:
+            branch, index = _parse_series(elements, index, elements[index]['y'], left + element['width'])
+            branches.append(branch)
+        contacts += (None, tuple(branches), None)
+    return contacts, index
+
+
+def _remap_contacts(contacts: tuple, addresses: dict) -> tuple:
+    contacts = list(contacts)
+    for i in range(0, len(contacts), 3):
+        if contacts[i] is None:
+            contacts[i + 1] = tuple(_remap_contacts(branch, addresses) for branch in contacts[i + 1])
+        else:
+            contacts[i] = addresses.get(contacts[i], contacts[i])
+    return tuple(contacts)
+
+
+def _contact_addresses(contacts: tuple) -> set:
+    addresses = set()
+    for i in range(0, len(contacts), 3):
+        if contacts[i] is None:
+            for branch in contacts[i + 1]:
+                addresses |= _contact_addresses(branch)
+        else:
+            addresses.add(contacts[i])
+    return addresses
+
+
+def _contact_dicts(contacts: tuple, places: tuple, index: int, elements: list) -> int:
+    """Append element dicts for a series; returns the next index into ``places``"""
+    for i in range(0, len(contacts), 3):
+        kind, fields, _ = places[index]
+        index += 1
+        if kind == 'wrap':
+            elements.append({'type': 'wrap', **fields})
+            kind, fields, _ = places[index]
+            index += 1
+        if contacts[i] is None:
+            elements.append({'type': 'branch', **fields})
+            for branch in contacts[i + 1]:
+                index = _contact_dicts(branch, places, index, elements)
+        else:
+            elements.append({
+                'type': 'contact',
+                'address': contacts[i],
+                'description': contacts[i + 1],
+                'isNormallyOpen': contacts[i + 2],
+                **fields
+            })
+    return index
+
+
+def contact_count(contacts: tuple) -> int:
+    """Number of contacts in a network, across all branches"""
+    count = 0
+    for i in range(0, len(contacts), 3):
+        if contacts[i] is None:
+            count += sum(contact_count(branch) for branch in contacts[i + 1])
+        else:
+            count += 1
+    return count
+
+
+def instruction_count(rung: Rung) -> int:
+    """Steps a Mitsubishi instruction list needs for the rung
+
+    One LD/LDI/AND/ANI/OR/ORI per contact, an ORB per branch after the
+    first that is not a single contact, an ANB per block joined in series,
+    and an OUT per coil. A rung without contacts loads the always-on relay.
+    export.rung_instructions() emits exactly these steps.
+    """
+    return _series_steps(rung.contacts) + 1 + len(rung.coils) // 2
+
+
+def _series_steps(contacts: tuple) -> int:
+    if not contacts:
+        return 1  # LD of the always-on relay
+    steps = 0
+    for i in range(0, len(contacts), 3):
+        if contacts[i] is None:
+            for index, branch in enumerate(contacts[i + 1]):
+                steps += _series_steps(branch)
+                if index and not (len(branch) == 3 and branch[0] is not None):
+                    steps += 1  # ORB
+            if i:
+                steps += 1  # ANB
+        else:
+            steps += 1
+    return steps
+
+
+def rungs_to_json(rungs: Iterable[Rung]) -> str:
+    """Serialize rungs as the JSON array of to_dict() without building dicts
+
+    Positions come prerendered with each shape's layout. Within one
+    conversion an address almost always carries the same description, so
+    each contact's JSON is rendered once per (address, polarity) and
+    reused; only coil descriptions are encoded per rung.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    contact_heads = ({}, {})  # [normally_open][address] -> (description, JSON up to "x")
+    coil_heads = {}           # address -> JSON up to the description value
+
+    parts: List[str] = []
+    append = parts.append
+
+    def contacts_json(contacts: tuple, places: tuple, index: int) -> int:
+        for i in range(0, len(contacts), 3):
+            place = places[index]
+            index += 1
+            if place[0] == 'wrap':
+                append(place[2])
+                append(',')
+                place = places[index]
+                index += 1
+            address = contacts[i]
+            if address is None:
+                append(place[2])
+                append(',')
+                for branch in contacts[i + 1]:
+                    index = contacts_json(branch, places, index)
+                continue
+            description = contacts[i + 1]
+            normally_open = contacts[i + 2]
+            heads = contact_heads[normally_open]
+            entry = heads.get(address)
+            if entry is None or entry[0] != description:
+                entry = heads[address] = (description, (
+                    f'{{"type":"contact","address":{encode(address)},"description":{encode(description)},'
+                    f'"isNormallyOpen":{"true" if normally_open else "false"},'
+                ))
+            append(entry[1])
+            append(place[2])
+            append(',')
+        return index
+
+    comma = ''
+    for rung in rungs:
+        append(comma)
+        comma = ','
+        append('{"elements":[')
+        places = layout_for(rung.contacts, 1 + len(rung.coils) // 2).places
+        index = contacts_json(rung.contacts, places, 0)
+        coils = (rung.coil_address, rung.coil_description) + rung.coils
+        for i in range(0, len(coils), 2):
+            if i:
+                append(',')
+            head = coil_heads.get(coils[i])
+            if head is None:
+                head = coil_heads[coils[i]] = f'{{"type":"coil","address":{encode(coils[i])},"description":'
+            append(head)
+            append(encode(coils[i + 1]))
+            append(',')
+            append(places[index][2])
+            index += 1
+        append(']}')
+    return f'[{"".join(parts)}]'
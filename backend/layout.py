@@ -0,0 +1,146 @@
+from functools import lru_cache
+from typing import Tuple, Union
+
+# Canvas grid: contacts left to right, coils after the last one, parallel
+# branches stacked below their first branch
+ELEMENT_X = 40
+ELEMENT_SPACING = 80
+ELEMENT_Y = 30
+BRANCH_SPACING = 60
+
+# Contacts per row before a rung wraps, as on a GX Works ladder (11 contact
+# columns and the coil column)
+MAX_COLUMNS = 11
+
+_LAYOUTS_MAX = 4096
+
+# A series' shape: the contact count when it has no parallel blocks,
+# otherwise a tuple with None per contact and a tuple of branch shapes per block
+Shape = Union[int, tuple]
+
+
+class Layout:
+    """Precomputed element positions for every rung of one shape
+
+    ``places`` lists one ``(kind, fields, json)`` entry per element in the
+    order Rung.to_dict() emits them: ``fields`` holds the position keys of
+    the element dict and ``json`` their rendering, the closing brace
+    included. For ``branch`` and ``wrap`` elements, which carry nothing
+    but their position, ``json`` is the whole element. ``columns`` and
+    ``rows`` give the grid cells the rung occupies.
+    """
+    __slots__ = ('places', 'columns', 'rows')
+
+    def __init__(self, places: tuple, columns: int, rows: int):
+        self.places = places
+        self.columns = columns
+        self.rows = rows
+
+
+def rung_shape(contacts: tuple) -> Shape:
+    if None not in contacts[::3]:
+        return len(contacts) // 3
+    return tuple(
+        None if contacts[i] is not None else tuple(rung_shape(branch) for branch in contacts[i + 1])
+        for i in range(0, len(contacts), 3)
+    )
+
+
+def layout_for(contacts: tuple, coils: int) -> Layout:
+    """Layout of a rung with ``contacts`` driving ``coils`` coils"""
+    return layout(rung_shape(contacts), coils)
+
+
+@lru_cache(maxsize=_LAYOUTS_MAX)
+def layout(shape: Shape, coils: int = 1, max_columns: int = MAX_COLUMNS) -> Layout:
+    """Place a rung on the grid, wrapping the main line at ``max_columns``
+
+    Blocks are never split: one that does not fit on the current row starts
+    the next. Each row band is as tall as its tallest block, and a ``wrap``
+    element at the end of a band points to the row the line continues on.
+    Coils follow the last contact, stacked one row apart.
+    """
+    places = []
+    column = top = 0
+    height = 1
+    columns = 0
+    for item in _items(shape):
+        width, rows = _extent(item)
+        if column and column + width > max_columns:
+            places.append(_wrap(column, top, top + height))
+            columns = max(columns, column)
+            column = 0
+            top += height
+            height = 1
+        _place(item, column, top, places)
+        column += width
+        height = max(height, rows)
+
+    for i in range(coils):
+        places.append(_place_entry('coil', column, top + i))
+    height = max(height, coils)
+    return Layout(tuple(places), max(columns, column) + 1, top + height)
+
+
+def _items(shape: Shape):
+    return (None,) * shape if isinstance(shape, int) else shape
+
+
+@lru_cache(maxsize=_LAYOUTS_MAX)
+def _extent(item) -> Tuple[int, int]:
+    """(columns, rows) of a series item: a contact (None) or a block"""
+    if item is None:
+        return 1, 1
+    extents = [_series_extent(branch) for branch in item]
+    return max(columns for columns, _ in extents), sum(rows for _, rows in extents)
+
+
+def _series_extent(shape: Shape) -> Tuple[int, int]:
+    if isinstance(shape, int):
+        return shape, 1
+    columns = 0
+    rows = 1
+    for item in shape:
+        width, height = _extent(item)
+        columns += width
+        rows = max(rows, height)
+    return columns, rows
+
+
+def _place(item, column: int, row: int, places: list):
+    if item is None:
+        places.append(_place_entry('contact', column, row))
+        return
+    block = len(places)
+    places.append(None)  # Filled in once the branches are placed
+    width = height = 0
+    for branch in item:
+        branch_column = column
+        for element in _items(branch):
+            _place(element, branch_column, row + height, places)
+            branch_column += _extent(element)[0]
+        width = max(width, branch_column - column)
+        height += _series_extent(branch)[1]
+    x, y = _position(column, row)
+    fields = {'x': x, 'y': y, 'width': width * ELEMENT_SPACING, 'height': height * BRANCH_SPACING}
+    places[block] = ('branch', fields, f'{{"type":"branch",{_json(fields)}}}')
+
+
+def _position(column: int, row: int) -> Tuple[int, int]:
+    return ELEMENT_X + column * ELEMENT_SPACING, ELEMENT_Y + row * BRANCH_SPACING
+
+
+def _place_entry(kind: str, column: int, row: int) -> tuple:
+    x, y = _position(column, row)
+    fields = {'x': x, 'y': y}
+    return kind, fields, f'{_json(fields)}}}'
+
+
+def _wrap(column: int, row: int, next_row: int) -> tuple:
+    x, y = _position(column, row)
+    fields = {'x': x, 'y': y, 'to_y': _position(0, next_row)[1]}
+    return 'wrap', fields, f'{{"type":"wrap",{_json(fields)}}}'
+
+
+def _json(fields: dict) -> str:
+    return ','.join(f'"{key}":{value}' for key, value in fields.items())
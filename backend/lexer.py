@@ -0,0 +1,140 @@
+import re
+from typing import Iterator, List, NamedTuple
+
+# Section and statement keywords; ST keywords are case-insensitive
+KEYWORDS = frozenset({
+    'PROGRAM', 'END_PROGRAM', 'FUNCTION_BLOCK', 'END_FUNCTION_BLOCK',
+    'FUNCTION', 'END_FUNCTION', 'TYPE', 'END_TYPE', 'STRUCT', 'END_STRUCT',
+    'VAR', 'VAR_GLOBAL', 'VAR_INPUT', 'VAR_OUTPUT', 'VAR_IN_OUT', 'VAR_TEMP',
+    'VAR_EXTERNAL', 'END_VAR', 'CONSTANT', 'RETAIN', 'AT',
+    'IF', 'THEN', 'ELSIF', 'ELSE', 'END_IF', 'CASE', 'OF', 'END_CASE',
+    'FOR', 'TO', 'BY', 'DO', 'END_FOR', 'WHILE', 'END_WHILE',
+    'REPEAT', 'UNTIL', 'END_REPEAT', 'RETURN', 'EXIT',
+    'AND', 'OR', 'XOR', 'NOT', 'MOD', 'TRUE', 'FALSE'
+})
+
+# One alternation, tried once per position: the whole source is scanned a
+# single time regardless of how many comments or sections it contains.
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>[ \t\r\f\v]+)
+  | (?P<nl>\n)
+  | (?P<block>\(\*[\s\S]*?(?:\*\)|\Z))
+  | (?P<comment>//[^\n]*)
+  | (?P<inline>(?<=;)[^\x00-\x7F][^\n]*)
+  | (?P<text>[^\x00-\x7F]+)
+  | (?P<string>'(?:\$.|[^'$\n])*'|"(?:\$.|[^"$\n])*")
+  | (?P<address>%[IQM][XBWDL]?\d+(?:\.\d+)*)
+  | (?P<literal>[A-Za-z_]\w*\#[\w.:+-]+)
+  | (?P<number>\d[\d_]*(?:\#[0-9A-Fa-f_]+|(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?))
+  | (?P<ident>[A-Za-z_]\w*)
+  | (?P<op>:=|=>|<=|>=|<>|\*\*|\.\.|[-+*/=<>&:;,.()\[\]^])
+  | (?P<error>.)
+''', re.VERBOSE | re.ASCII)
+
+# Groups that never reach the token stream
+_SKIPPED = frozenset({'ws', 'block', 'comment', 'inline', 'text'})
+
+
+class Token(NamedTuple):
+    kind: str    # KEYWORD, IDENT, NUMBER, LITERAL, STRING, ADDRESS, OP, ERROR
+    value: str   # Raw source text
+    line: int    # 1-based line in the original source
+    col: int     # 1-based column in the original source
+
+
+def _scan(text: str, endpos: int, line: int, line_start: int, final: bool):
+    """Yield tokens from text[:endpos]; return (resume_pos, line, line_start)
+
+    When not final, an unterminated block comment stops the scan so the
+    caller can retry once more text has arrived.
+    """
+    for match in _TOKEN_RE.finditer(text, 0, endpos):
+        kind = match.lastgroup
+        start = match.start()
+
+        if kind == 'nl':
+            line += 1
+            line_start = start + 1
+            continue
+
+        if kind in _SKIPPED:
+            if kind == 'block':
+                value = match.group()
+                if not final and not value.endswith('*)'):
+                    return start, line, line_start
+                newlines = value.count('\n')
+                if newlines:
+                    line += newlines
+                    line_start = start + value.rfind('\n') + 1
+            continue
+
+        value = match.group()
+        if kind == 'ident':
+            kind = 'KEYWORD' if value.upper() in KEYWORDS else 'IDENT'
+        else:
+            kind = kind.upper()
+
+        yield Token(kind, value, line, start - line_start + 1)
+
+    return endpos, line, line_start
+
+
+def tokenize(source: str, line: int = 1, column: int = 1) -> Iterator[Token]:
+    """Scan ST source once, yielding tokens with their original positions
+
+    Comments, whitespace and Japanese text outside string literals are
+    dropped. Japanese text directly after a ';' is treated as an inline
+    comment up to the end of the line, the way vendor exports annotate code.
+    ``line`` and ``column`` give the position of the first character when
+    the source was cut out of a larger file.
+    """
+    yield from _scan(source, len(source), line, 1 - column, True)
+
+
+class StreamTokenizer:
+    """tokenize() for text that arrives in chunks
+
+    Only complete lines are scanned, since no token other than a block
+    comment spans a line break, so memory is bounded by the longest line
+    or comment rather than the whole source.
+    """
+
+    def __init__(self):
+        self._pending = ''
+        self._line = 1
+        self._line_start = 0
+        # While the buffer opens with an unterminated block comment: how much
+        # of it is known to hold no '*)', so each chunk is searched only once
+        self._comment_scanned = None
+
+    def feed(self, text: str) -> List[Token]:
+        self._pending += text
+        if self._comment_scanned is not None:
+            close = self._pending.find('*)', max(self._comment_scanned - 1, 2))
+            if close == -1:
+                self._comment_scanned = len(self._pending)
+                return []
+            self._comment_scanned = None
+        endpos = self._pending.rfind('\n') + 1
+        if endpos == 0:
+            return []
+        return self._drain(endpos, final=False)
+
+    def close(self) -> List[Token]:
+        return self._drain(len(self._pending), final=True)
+
+    def _drain(self, endpos: int, final: bool) -> List[Token]:
+        tokens = []
+        scanner = _scan(self._pending, endpos, self._line, self._line_start, final)
+        while True:
+            try:
+                tokens.append(next(scanner))
+            except StopIteration as stop:
+                resume, self._line, line_start = stop.value
+                break
+        # Positions are relative to the buffer, which now starts at resume
+        self._line_start = line_start - resume
+        self._pending = self._pending[resume:]
+        if resume < endpos:
+            self._comment_scanned = endpos - resume
+        return tokens
@@ -1,28 +1,105 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import time
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as FormFile
 from pydantic import BaseModel
 from typing import List, Optional
+from contextlib import asynccontextmanager
 import asyncio
+import codecs
+import json
 import os
-import re
 from datetime import datetime
 
+from allocator import MODELS_CONFIG, plan_for_options
+from batch import decode_source, expand_archive, merge_results, run_share, split_jobs
+from cache import ResultCache, cache_hasher, cache_key, config_fingerprint
+from converter import CONVERTER_VERSION, SimpleLadderConverter, fan_out_for_options, run_conversion
+from device_rules import DEFAULT_RULES, rules_for_options
+from diagnostics import FATAL, fatal, payload as diagnostics_payload
+from executor import ConversionExecutor, ExecutorSaturated
+from incremental import SessionStore, VersionConflict
+from jobs import FINISHED, JobQueue
+from metrics import CONTENT_TYPE, EXECUTOR_PENDING, REGISTRY, MetricsMiddleware, record_conversion
+from parallel import collect, convert_sections, merge_sections, share_sections, split_sections
+from response_formats import JSON_TYPE, ConversionResponse, conversion_payload, encode_response, negotiate, variant
+from streaming import format_ndjson, format_sse, stream_conversion
+from upload import SourceDecoder, UploadTooLarge, read_upload
+from warmup import StartupReport, warm_up
+
 class ConversionRequest(BaseModel):
     source_code: str
     plc_type: str = "mitsubishi"
     options: Optional[dict] = {}
 
-class ConversionResponse(BaseModel):
-    success: bool
-    ladder_data: dict
-    device_map: dict
-    device_list: List[dict]  # New field for formatted device list
-    errors: List[str]
-    warnings: List[str]
-    processing_time: float
-
-app = FastAPI(title="ST to Ladder Converter", version="2.0.0")
+class SourceEdit(BaseModel):
+    offset: int
+    length: int = 0
+    text: str = ""
+
+class SessionUpdateRequest(BaseModel):
+    source_code: Optional[str] = None       # Full new version, or
+    edits: Optional[List[SourceEdit]] = None  # replacements against base_version
+    base_version: Optional[int] = None      # Required with edits; 409 if the session moved on
+
+# Conversions run in worker processes so they never block the event loop
+executor = ConversionExecutor.from_env()
+
+# Serialized responses keyed by the conversion inputs; see cache.cache_key
+result_cache = ResultCache.from_env()
+# The site rule table (DEVICE_RULES_PATH) and model table (PLC_MODELS_PATH)
+# shape the output as much as the converter does, so they are part of the
+# version every key is built from
+CACHE_VERSION = f'{CONVERTER_VERSION}:{config_fingerprint(DEFAULT_RULES.config, MODELS_CONFIG)}'
+
+# Live-preview sessions for incremental re-conversion
+sessions = SessionStore()
+
+# Queued conversions with results in SQLite, for programs too large to wait on
+jobs = JobQueue.from_env()
+
+# Import, warm-up and first-request timings of this process, for /api/health
+startup = StartupReport()
+
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', '1000'))
+# Sources at least this large have their POUs converted in parallel
+PARALLEL_MIN_BYTES = int(os.environ.get('PARALLEL_MIN_BYTES', str(256 * 1024)))
+# Longest a job status request may wait for the job to finish
+JOB_MAX_WAIT = 60.0
+JOB_POLL_INTERVAL = 0.25
+# Convert a built-in sample before serving, so the first request finds warm caches
+STARTUP_WARMUP = os.environ.get('STARTUP_WARMUP', '1') != '0'
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.start()
+    if STARTUP_WARMUP:
+        await _warm_up()
+    yield
+    executor.shutdown()
+    result_cache.close()
+    jobs.shutdown()
+
+app = FastAPI(title="ST to Ladder Converter", version="2.0.0", lifespan=lifespan)
+
+async def _warm_up():
+    """Warm this process, then start the worker pool, which forks from the warm process
+
+    Uvicorn serves nothing until the lifespan startup returns, so the health
+    check cannot pass before this is done. A failure is reported in health
+    and does not stop the app.
+    """
+    try:
+        startup.warmup_time = warm_up()
+        _, _, startup.worker_warmup_time = await executor.run(warm_up)
+    except Exception as e:
+        startup.warmup_error = str(e)
 
 @app.get("/")
 async def root():
@@ -30,7 +107,14 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "executor": executor.stats(), "cache": result_cache.stats(),
+            "jobs": jobs.stats(), "startup": startup.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    EXECUTOR_PENDING.set(executor.stats()['pending'])
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
 
 # CORS configuration
 app.add_middleware(
@@ -47,576 +131,566 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class SimpleLadderConverter:
-    def __init__(self):
-        self.device_counters = {
-            'X': 0,  # Input devices
-            'Y': 0,  # Output devices
-            'M': 0,  # Internal relays
-            'D': 0,  # Data registers
-            'T': 0,  # Timers
-            'C': 0   # Counters
-        }
-        self.variable_map = {}  # Map variable names to device addresses
-        self.device_info = {}   # Map device addresses to device info (name, type, data_type)
-        self.errors = []
-        self.warnings = []
-
-    def convert(self, source_code: str, plc_type: str = "mitsubishi") -> tuple:
-        self.device_counters = {k: 0 for k in self.device_counters}
-        self.variable_map = {}
-        self.device_info = {}
-        self.errors = []
-        self.warnings = []
-
-        ladder_data = {
-            'rungs': [],
-            'metadata': {
-                'plc_type': plc_type,
-                'generated_at': datetime.now().isoformat()
-            }
-        }
-
-        device_map = {
-            'inputs': {},
-            'outputs': {},
-            'internals': {},
-            'timers': {},
-            'counters': {}
-        }
-
-        # Preprocess: remove comments and handle multi-line structures
-        cleaned_code = self._preprocess_code(source_code)
-        lines = cleaned_code.strip().split('\n')
-
-        # First pass: Parse variable declarations
-        for line in lines:
-            if ':' in line and ('BOOL' in line or 'DINT' in line or 'REAL' in line or 'TIME' in line):
-                self._parse_variable_declaration(line)
-
-        # Second pass: Parse logic statements
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line:
-                i += 1
-                continue
-
-            try:
-                # Parse IF statements
-                if line.startswith('IF'):
-                    rungs = self._parse_if_statement(line, lines[i:])
-                    for rung in rungs:
-                        ladder_data['rungs'].append(rung)
-
-                # Parse CASE statements (convert to IF-ELSE)
-                elif line.startswith('CASE'):
-                    rungs = self._parse_case_statement(line, lines[i:])
-                    for rung in rungs:
-                        ladder_data['rungs'].append(rung)
-
-                # Parse simple assignments (only if not part of IF/CASE)
-                elif ':=' in line and not any(keyword in lines[i-1:i+2] for keyword in ['IF', 'CASE', 'THEN', 'ELSE']):
-                    rungs = self._parse_assignment(line)
-                    for rung in rungs:
-                        ladder_data['rungs'].append(rung)
-
-                i += 1
-
-            except Exception as e:
-                self.errors.append(f"Error parsing line {i+1}: '{line}' - {str(e)}")
-                i += 1
-
-        # Generate formatted device list
-        device_list = []
-        for device_addr, info in self.device_info.items():
-            device_list.append({
-                'device_address': device_addr,
-                'variable_name': info['variable_name'],
-                'device_type': info['device_type']
-            })
-
-        return ladder_data, device_map, device_list
-
-    def _parse_variable_declaration(self, line: str):
-        # Enhanced variable parsing to handle complex declarations
-        line = line.strip()
-
-        # Handle different variable types
-        if 'BOOL' in line:
-            # Extract variable name(s) - handle multiple variables per line
-            var_pattern = r'(\w+)\s*:\s*BOOL'
-            matches = re.findall(var_pattern, line)
-
-            for var_name in matches:
-                if var_name not in self.variable_map:
-                    device_type = None
-                    device_addr = None
-
-                    if var_name.startswith('X') or any(keyword in var_name.lower() for keyword in ['input', 'sensor', 'button', 'start', 'stop', 'emergency']):
-                        device_addr = f'X{self.device_counters["X"]}'
-                        device_type = '入力'
-                        self.device_counters["X"] += 1
-                    elif var_name.startswith('Y') or any(keyword in var_name.lower() for keyword in ['motor', 'lamp', 'valve', 'output', 'alarm', 'buzzer']):
-                        device_addr = f'Y{self.device_counters["Y"]}'
-                        device_type = '出力'
-                        self.device_counters["Y"] += 1
-                    else:
-                        device_addr = f'M{self.device_counters["M"]}'
-                        device_type = '内部リレー'
-                        self.device_counters["M"] += 1
-
-                    self.variable_map[var_name] = device_addr
-                    self.device_info[device_addr] = {
-                        'variable_name': var_name,
-                        'device_type': device_type,
-                        'data_type': 'BOOL'
-                    }
-
-        elif 'DINT' in line:
-            # Handle DINT variables (map to data registers)
-            var_pattern = r'(\w+)\s*:\s*DINT'
-            matches = re.findall(var_pattern, line)
-
-            for var_name in matches:
-                if var_name not in self.variable_map:
-                    device_addr = f'D{self.device_counters["D"]}'
-                    self.variable_map[var_name] = device_addr
-                    self.device_info[device_addr] = {
-                        'variable_name': var_name,
-                        'device_type': 'データレジスタ',
-                        'data_type': 'DINT'
-                    }
-                    self.device_counters["D"] += 1
-
-        elif 'REAL' in line:
-            # Handle REAL variables (map to data registers)
-            var_pattern = r'(\w+)\s*:\s*REAL'
-            matches = re.findall(var_pattern, line)
-
-            for var_name in matches:
-                if var_name not in self.variable_map:
-                    device_addr = f'D{self.device_counters["D"]}'
-                    self.variable_map[var_name] = device_addr
-                    self.device_info[device_addr] = {
-                        'variable_name': var_name,
-                        'device_type': 'データレジスタ',
-                        'data_type': 'REAL'
-                    }
-                    self.device_counters["D"] += 1
-
-        elif 'TIME' in line:
-            # Handle TIME variables (map to timers)
-            var_pattern = r'(\w+)\s*:\s*TIME'
-            matches = re.findall(var_pattern, line)
-
-            for var_name in matches:
-                if var_name not in self.variable_map:
-                    device_addr = f'T{self.device_counters["T"]}'
-                    self.variable_map[var_name] = device_addr
-                    self.device_info[device_addr] = {
-                        'variable_name': var_name,
-                        'device_type': 'タイマ',
-                        'data_type': 'TIME'
-                    }
-                    self.device_counters["T"] += 1
-
-    def _parse_if_statement(self, if_line: str, lines: List[str]) -> List[dict]:
-        # Extract condition from IF line
-        condition_match = re.search(r'IF\s+(.+?)\s+THEN', if_line, re.IGNORECASE)
-        if not condition_match:
-            return []
-
-        condition = condition_match.group(1).strip()
-
-        # Find the corresponding END_IF or next statement
-        then_block = []
-        found_if_line = False
-
-        for i, line in enumerate(lines):
-            stripped_line = line.strip()
-
-            if not found_if_line:
-                if stripped_line.startswith('IF'):
-                    # Extract assignments from the same line as IF
-                    if 'THEN' in stripped_line:
-                        after_then = stripped_line.split('THEN', 1)[1].strip()
-                        if after_then and not after_then.startswith('END_IF'):
-                            # Split multiple assignments
-                            assignments = [part.strip() for part in after_then.split(';') if part.strip()]
-                            for assignment in assignments:
-                                if ':=' in assignment:
-                                    then_block.append(assignment.rstrip(';'))
-                    found_if_line = True
-                continue
-
-            # Check for end of IF block
-            if stripped_line.startswith('END_IF') or stripped_line.startswith('END_IF;'):
-                break
-            elif stripped_line.startswith('IF') or stripped_line.startswith('ELSIF') or stripped_line.startswith('ELSE'):
-                break
-            elif stripped_line and not stripped_line.startswith('//'):
-                # Extract assignments from then block
-                if ':=' in stripped_line:
-                    # Split multiple assignments on the same line
-                    assignments = [part.strip() for part in stripped_line.split(';') if part.strip()]
-                    for assignment in assignments:
-                        if ':=' in assignment:
-                            then_block.append(assignment.rstrip(';'))
-
-        if not then_block:
-            return []
-
-        # Parse the condition to extract individual variables
-        condition_vars = self._parse_condition_variables(condition)
-
-        # Create separate rungs for each output
-        rungs = []
-
-        for assignment in then_block:
-            if ':=' in assignment:
-                var_name = assignment.split(':')[0].strip()
-                value = assignment.split(':')[1].strip()
-
-                # Map variable to device address
-                if var_name in self.variable_map:
-                    device_addr = self.variable_map[var_name]
-                else:
-                    if var_name.startswith('Y') or 'Motor' in var_name or 'Lamp' in var_name or 'Valve' in var_name:
-                        device_addr = f'Y{self.device_counters["Y"]}'
-                        self.device_counters["Y"] += 1
-                    else:
-                        device_addr = f'M{self.device_counters["M"]}'
-                        self.device_counters["M"] += 1
-                    self.variable_map[var_name] = device_addr
-
-                # Create a new rung with all condition variables
-                rung_elements = []
-
-                # Add condition contacts
-                for i, cond_var in enumerate(condition_vars):
-                    if cond_var in self.variable_map:
-                        contact_addr = self.variable_map[cond_var]
-                    else:
-                        contact_addr = f'X{self.device_counters["X"]}'
-                        self.variable_map[cond_var] = contact_addr
-                        self.device_counters["X"] += 1
-
-                    rung_elements.append({
-                        'type': 'contact',
-                        'address': contact_addr,
-                        'description': cond_var,
-                        'isNormallyOpen': True,
-                        'x': 40 + i * 80,
-                        'y': 30
-                    })
-
-                # Add output coil
-                rung_elements.append({
-                    'type': 'coil',
-                    'address': device_addr,
-                    'description': f'{var_name} := {value}',
-                    'x': 40 + len(condition_vars) * 80,
-                    'y': 30
-                })
-
-                rungs.append({'elements': rung_elements})
-
-        return rungs
-
-    def _parse_condition_variables(self, condition: str) -> List[str]:
-        """Parse condition string to extract individual variables"""
-        variables = []
-
-        # Split by AND first
-        and_parts = [part.strip() for part in condition.split('AND')]
-
-        for part in and_parts:
-            # Handle OR conditions within AND parts
-            if ' OR ' in part:
-                or_parts = [p.strip() for p in part.split('OR')]
-                for or_part in or_parts:
-                    # Clean up the variable name
-                    var = or_part.replace('(', '').replace(')', '').replace('NOT', '').strip()
-                    if var:
-                        variables.append(var)
-            else:
-                # Clean up the variable name
-                var = part.replace('(', '').replace(')', '').replace('NOT', '').strip()
-                if var:
-                    variables.append(var)
-
-        return variables
-
-    def _preprocess_code(self, source_code: str) -> str:
-        """Remove comments and normalize code"""
-        # Remove block comments first (multi-line)
-        cleaned = re.sub(r'\(\*.*?\*\)', '', source_code, flags=re.DOTALL)
-
-        # Remove line comments
-        cleaned = re.sub(r'//.*$', '', cleaned, flags=re.MULTILINE)
-
-        # Extract VAR_GLOBAL section
-        var_global_match = re.search(r'VAR_GLOBAL(.*?)END_VAR', cleaned, flags=re.DOTALL)
-        var_global_content = ""
-        if var_global_match:
-            var_global_content = var_global_match.group(1)
-
-        # Extract FUNCTION_BLOCK sections (instead of removing them)
-        function_blocks = []
-        fb_pattern = r'FUNCTION_BLOCK\s+(\w+)\s*(.*?)\s*END_FUNCTION_BLOCK'
-        fb_matches = re.findall(fb_pattern, cleaned, flags=re.DOTALL)
-
-        for fb_name, fb_content in fb_matches:
-            function_blocks.append((fb_name, fb_content))
-
-        # Remove FUNCTION_BLOCK sections from main cleaned content
-        cleaned = re.sub(r'FUNCTION_BLOCK.*?END_FUNCTION_BLOCK', '', cleaned, flags=re.DOTALL)
-
-        # Remove TYPE sections
-        cleaned = re.sub(r'TYPE.*?END_TYPE', '', cleaned, flags=re.DOTALL)
-
-        # Extract content from PROGRAM section (main logic)
-        program_match = re.search(r'PROGRAM\s+\w+\s*(.*?)\s*END_PROGRAM', cleaned, flags=re.DOTALL)
-        program_content = ""
-        if program_match:
-            program_content = program_match.group(1)
-
-        # Combine all content: VAR_GLOBAL + FUNCTION_BLOCKs + PROGRAM
-        combined_content = []
-
-        if var_global_content:
-            combined_content.append(var_global_content)
-
-        # Add FUNCTION_BLOCK contents with prefixes
-        for fb_name, fb_content in function_blocks:
-            # Extract VAR sections from FUNCTION_BLOCK
-            var_match = re.search(r'VAR.*?(.*?)END_VAR', fb_content, flags=re.DOTALL)
-            fb_vars = ""
-            if var_match:
-                fb_vars = var_match.group(1)
-
-            # Extract logic (non-VAR) content
-            fb_logic = re.sub(r'VAR.*?END_VAR', '', fb_content, flags=re.DOTALL)
-
-            # Add FB variables with prefix
-            if fb_vars:
-                combined_content.append(f"// FUNCTION_BLOCK {fb_name} variables")
-                combined_content.append(fb_vars)
-
-            # Add FB logic directly (not as comments)
-            if fb_logic.strip():
-                combined_content.append(f"// FUNCTION_BLOCK {fb_name} logic")
-                # Add the actual FB logic lines
-                fb_lines = fb_logic.strip().split('\n')
-                for line in fb_lines:
-                    cleaned_line = line.strip()
-                    if cleaned_line and not cleaned_line.startswith('END_FUNCTION_BLOCK'):
-                        combined_content.append(cleaned_line)
-
-        if program_content:
-            combined_content.append("// PROGRAM logic")
-            combined_content.append(program_content)
-
-        cleaned = '\n'.join(combined_content)
-
-        # Split into lines and clean up
-        lines = cleaned.split('\n')
-        cleaned_lines = []
-
-        for line in lines:
-            # Remove Japanese comments more carefully - preserve ST code
-            # First, remove inline Japanese comments (text after semicolon that contains Japanese)
-            line = re.sub(r';[^\x00-\x7F].*$', '', line)  # Remove Japanese comments after semicolon
-
-            # Remove standard comments
-            line = re.sub(r'//.*$', '', line)  # Remove line comments
-            line = re.sub(r'\(\*.*?\*\)', '', line)  # Remove block comments
-
-            # Then remove any remaining Japanese characters that might be in code
-            line = re.sub(r'[^\x00-\x7F\s\(\)\[\]\{\}:;=\.\+\-\*/%<>&|!\',_\w]', '', line)
-            line = re.sub(r'\s+', ' ', line).strip()
-
-            if line and not line.isspace():
-                cleaned_lines.append(line)
-
-        return '\n'.join(cleaned_lines)
-
-    def _find_structure_end(self, lines: List[str], start_idx: int, structure_type: str) -> Optional[int]:
-        """Find the end line of a structure (TYPE, STRUCT, FUNCTION_BLOCK, PROGRAM)"""
-        end_keywords = {
-            'TYPE': 'END_TYPE',
-            'STRUCT': 'END_STRUCT',
-            'FUNCTION_BLOCK': 'END_FUNCTION_BLOCK',
-            'PROGRAM': 'END_PROGRAM'
-        }
-
-        end_keyword = end_keywords.get(structure_type)
-        if not end_keyword:
-            return None
-
-        # Handle multi-line structure search
-        for i in range(start_idx + 1, len(lines)):
-            line = lines[i].strip()
-            if end_keyword in line:
-                return i
-            # Handle nested structures
-            if any(struct in line for struct in end_keywords.keys()):
-                # Find the end of nested structure
-                nested_end = self._find_structure_end(lines, i, line.split()[0])
-                if nested_end:
-                    i = nested_end
-        return None
-
-    def _parse_case_statement(self, case_line: str, lines: List[str]) -> List[dict]:
-        """Convert CASE statement to multiple IF statements"""
-        # Extract variable from CASE line
-        case_match = re.search(r'CASE\s+(\w+)\s+OF', case_line, re.IGNORECASE)
-        if not case_match:
-            return []
-
-        case_var = case_match.group(1)
-        rungs = []
-
-        # Find CASE blocks and convert to IF statements
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-
-            if line.startswith('END_CASE'):
-                break
-
-            # Look for case values (e.g., "0:", "1:", etc.)
-            case_value_match = re.search(r'(\d+)\s*:', line)
-            if case_value_match:
-                case_value = case_value_match.group(1)
-
-                # Create IF statement equivalent
-                if_condition = f"IF {case_var} = {case_value} THEN"
-
-                # Find statements in this case block
-                case_statements = []
-                j = i + 1
-                while j < len(lines) and not lines[j].strip().startswith(('END_CASE', str(int(case_value) + 1) + ':')):
-                    stmt = lines[j].strip()
-                    if stmt and not stmt.startswith('//'):
-                        case_statements.append(stmt)
-                    j += 1
-
-                # Convert to IF statement format
-                if case_statements:
-                    if_line = if_condition
-                    for stmt in case_statements:
-                        if ':=' in stmt:
-                            if_line += f" {stmt.rstrip(';')};"
-
-                    # Parse as IF statement
-                    temp_lines = [if_line, "END_IF"]
-                    case_rungs = self._parse_if_statement(if_line, temp_lines)
-                    rungs.extend(case_rungs)
-
-                i = j - 1  # Continue from where we left off
-
-            i += 1
-
-        return rungs
-
-    def _parse_assignment(self, line: str) -> List[dict]:
-        """Parse simple assignment statements"""
-        if ':=' not in line:
-            return []
-
-        parts = line.split(':=')
-        if len(parts) != 2:
-            return []
-
-        var_name = parts[0].strip()
-        value = parts[1].strip().rstrip(';')
-
-        # Map variable to device address
-        if var_name in self.variable_map:
-            device_addr = self.variable_map[var_name]
-        else:
-            if var_name.startswith('Y') or 'Motor' in var_name or 'Lamp' in var_name or 'Valve' in var_name:
-                device_addr = f'Y{self.device_counters["Y"]}'
-                self.device_counters["Y"] += 1
-            else:
-                device_addr = f'M{self.device_counters["M"]}'
-                self.device_counters["M"] += 1
-            self.variable_map[var_name] = device_addr
-
-        # Create a simple rung with the assignment
-        rung_elements = [{
-            'type': 'coil',
-            'address': device_addr,
-            'description': f'{var_name} := {value}',
-            'x': 40,
-            'y': 30
-        }]
-
-        return [{'elements': rung_elements}]
-
-@app.post("/api/convert", response_model=ConversionResponse)
-async def convert_code(request: ConversionRequest):
-    start_time = datetime.now()
+app.add_middleware(MetricsMiddleware, on_request=startup.record_request)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in candidates or etag.removeprefix('W/') in candidates
+
+def _encoded_response(payload: bytes, media_type: str, coding: Optional[str], headers: dict) -> Response:
+    headers = {**headers, "Vary": "Accept, Accept-Encoding"}
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return Response(content=payload, media_type=media_type, headers=headers)
+
+async def _convert_cached(key: Optional[str], if_none_match: Optional[str], plc_type: str, endpoint: str, run,
+                          accept: Optional[str] = None, accept_encoding: Optional[str] = None):
+    """Serve a conversion from the ETag/result cache, or await run()
+
+    ``run`` returns an awaitable of ``(result, queue_time, processing_time)``,
+    as executor.run does. A ``key`` of None bypasses the cache, as profiled
+    runs must measure a fresh conversion. The body is JSON or MessagePack
+    per ``accept``, compressed per ``accept_encoding`` (see
+    response_formats); each representation is cached under its own key.
+    """
+    start_time = time.perf_counter()
+    media_type, coding = negotiate(accept, accept_encoding)
+    name = variant(media_type, coding)
+    variant_key = key if key is None or name == 'json' else f'{key}.{name}'
+
+    # Identical inputs produce the same conversion, so the key doubles as the
+    # ETag. It is weak: generated_at and the timings in the body come from
+    # whichever run filled the cache, and differ once an entry is replaced
+    etag = f'W/"{variant_key}"' if key is not None else None
+    if etag is not None and _etag_matches(if_none_match, etag):
+        record_conversion(endpoint, 'cached')
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept, Accept-Encoding"})
+
+    # The cache may read and write SQLite; keep that off the event loop
+    cached = await run_in_threadpool(result_cache.get, variant_key) if key is not None else None
+    if cached is None and variant_key != key:
+        # Derive the representation from the cached JSON rather than converting again
+        cached = await run_in_threadpool(result_cache.get, key)
+        if cached is not None:
+            cached = await asyncio.to_thread(encode_response, cached, media_type, coding)
+            await run_in_threadpool(result_cache.put, variant_key, cached)
+    if cached is not None:
+        record_conversion(endpoint, 'cached')
+        return _encoded_response(cached, media_type, coding, {"ETag": etag, "X-Cache": "HIT"})
 
     try:
-        converter = SimpleLadderConverter()
-        ladder_data, device_map, device_list = converter.convert(request.source_code, request.plc_type)
-
-        # Update device map with variable mappings
-        for var_name, device_addr in converter.variable_map.items():
-            if device_addr.startswith('X'):
-                device_map['inputs'][device_addr] = var_name
-            elif device_addr.startswith('Y'):
-                device_map['outputs'][device_addr] = var_name
-            elif device_addr.startswith('M'):
-                device_map['internals'][device_addr] = var_name
-
-        processing_time = (datetime.now() - start_time).total_seconds()
-
-        # Determine success based on whether we have any rungs or critical errors
-        has_critical_errors = any("critical" in error.lower() for error in converter.errors)
-        success = len(ladder_data['rungs']) > 0 or not has_critical_errors
-
-        return ConversionResponse(
-            success=success,
-            ladder_data=ladder_data,
-            device_map=device_map,
-            device_list=device_list,
-            errors=converter.errors,
-            warnings=converter.warnings,
-            processing_time=processing_time
+        result, queue_time, processing_time = await run()
+        success, payload = conversion_payload(result, processing_time, queue_time)
+        record_conversion(
+            endpoint, 'success' if success else 'failure', result['rung_count'], len(result['device_list']),
+            len(result['errors']), len(result['warnings']), result['timings'], queue_time
         )
 
+        # metadata.generated_at and the timings describe the run that produced
+        # the entry; hits replay those bytes unchanged
+        if key is not None:
+            await run_in_threadpool(result_cache.put, key, payload)
+        if name != 'json':
+            payload = await asyncio.to_thread(encode_response, payload, media_type, coding)
+            if key is not None:
+                await run_in_threadpool(result_cache.put, variant_key, payload)
+        if key is None:
+            return _encoded_response(payload, media_type, coding, {"Cache-Control": "no-store"})
+        return _encoded_response(payload, media_type, coding, {"ETag": etag, "X-Cache": "MISS"})
+
+    except ExecutorSaturated as e:
+        record_conversion(endpoint, 'rejected')
+        raise HTTPException(
+            status_code=e.status_code,
+            detail={"message": str(e), "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = time.perf_counter() - start_time
+        record_conversion(endpoint, 'failure', errors=1)
         return ConversionResponse(
             success=False,
-            ladder_data={'rungs': [], 'metadata': {'plc_type': request.plc_type, 'generated_at': datetime.now().isoformat()}},
+            ladder_data={'rungs': [], 'metadata': {'plc_type': plc_type, 'generated_at': datetime.now().isoformat()}},
             device_map={'inputs': {}, 'outputs': {}, 'internals': {}, 'timers': {}, 'counters': {}},
             device_list=[],
-            errors=[f"Critical error: {str(e)}"],
-            warnings=[],
+            **diagnostics_payload([fatal(str(e))], []),
             processing_time=processing_time
         )
 
-@app.post("/api/upload-convert")
-async def upload_and_convert(file: UploadFile = File(...)):
+async def _gather_jobs(calls):
+    """Await executor jobs together; when one fails, cancel the rest
+
+    A rejected or failed share makes the whole result useless, so the
+    siblings still queued are dropped instead of converting for nothing.
+    """
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+async def _run_conversion(source_code: str, plc_type: str, options: Optional[dict]):
+    """run_conversion in the executor, spreading a large program's POUs over the workers
+
+    The parallel result is identical to a serial run (see parallel.py); a
+    program that cannot be split cleanly, or that asks for condition
+    fan-out (relays are numbered across the whole program), or that runs
+    out of devices on the model, is converted serially.
+    """
+    if (len(source_code) >= PARALLEL_MIN_BYTES and executor.max_workers > 1
+            and not (options or {}).get('profile') and not (options or {}).get('fan_out')):
+        sections = split_sections(source_code)
+        if sections and len(sections) > 1:
+            start = time.perf_counter()
+            shares = share_sections(source_code, sections, executor.max_workers)
+            outcomes = await _gather_jobs(executor.run(convert_sections, share, options) for share in shares)
+            results = collect([part for part, _, _ in outcomes])
+            if results is not None:
+                result = await asyncio.to_thread(merge_sections, results, plc_type, options)
+                if result is not None:
+                    queue_time = max(queue_time for _, queue_time, _ in outcomes)
+                    return result, queue_time, time.perf_counter() - start - queue_time
+    return await executor.run(run_conversion, source_code, plc_type, options)
+
+def _device_rules(options: Optional[dict]):
+    """Compile the request's device rules up front so a bad table is a 400"""
+    try:
+        return rules_for_options(options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid device rules: {str(e)}")
+
+def _fan_out(options: Optional[dict]):
+    try:
+        return fan_out_for_options(options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _device_allocation(plc_type: str, options: Optional[dict]):
+    """Check plc_type and options.device_allocation up front so a bad plan is a 400"""
+    try:
+        return plan_for_options(plc_type, options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid device allocation: {str(e)}")
+
+@app.post("/api/convert", response_model=ConversionResponse)
+async def convert_code(request: ConversionRequest, if_none_match: Optional[str] = Header(None),
+                       accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)):
+    _device_rules(request.options)
+    _fan_out(request.options)
+    _device_allocation(request.plc_type, request.options)
+    key = None
+    if not (request.options or {}).get('profile'):
+        key = cache_key(request.source_code, request.plc_type, request.options, CACHE_VERSION)
+    return await _convert_cached(
+        key, if_none_match, request.plc_type, 'convert',
+        lambda: _run_conversion(request.source_code, request.plc_type, request.options),
+        accept, accept_encoding
+    )
+
+@app.post("/api/convert/stream")
+async def convert_stream(request: ConversionRequest, format: Optional[str] = None,
+                         accept: Optional[str] = Header(None)):
+    """Send each rung as soon as it is generated, then a device-map trailer
+
+    NDJSON by default; Server-Sent Events with ``?format=sse`` or
+    ``Accept: text/event-stream``.
+    """
+    if format is None:
+        format = 'sse' if accept and 'text/event-stream' in accept else 'ndjson'
+    if format not in ('ndjson', 'sse'):
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {format}")
+
+    rules = _device_rules(request.options)
+    allocation = _device_allocation(request.plc_type, request.options)
+    encode = format_sse if format == 'sse' else format_ndjson
+    media_type = 'text/event-stream' if format == 'sse' else 'application/x-ndjson'
+
+    stream = stream_conversion(request.source_code, executor, request.plc_type, rules, allocation)
+    try:
+        first = await stream.__anext__()
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail={"message": str(e), "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    async def body():
+        yield encode(*first)
+        async for event, data in stream:
+            if event == 'trailer':
+                record_conversion(
+                    'stream', 'success' if data['success'] else 'failure', data['rung_count'],
+                    len(data['device_list']), len(data['errors']), len(data['warnings'])
+                )
+            yield encode(event, data)
+
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+_EXPORT_FILES = {
+    'il': ('program.il', 'text/plain'),
+    'csv': ('program.csv', 'text/csv'),
+    'comments': ('comments.csv', 'text/csv')
+}
+
+# Registered charset names for Python codec names that differ
+_CHARSETS = {'cp932': 'Shift_JIS', 'shift_jis': 'Shift_JIS', 'utf-8-sig': 'utf-8'}
+
+@app.post("/api/export")
+async def export_program(request: ConversionRequest, format: str = "il", encoding: str = "cp932"):
+    """Stream the converted program for GX Works, one rung at a time
+
+    ``format`` is ``il`` (instruction list text), ``csv`` (the instruction
+    list with step numbers and line statements) or ``comments`` (device
+    comment CSV). Output is Shift-JIS unless ``encoding`` says otherwise.
+    """
+    if format not in _EXPORT_FILES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    try:
+        codec = codecs.lookup(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Unknown encoding: {encoding}")
+    # str -> bytes codecs only; rot13, base64 and the like are not text encodings
+    if not getattr(codec, '_is_text_encoding', True):
+        raise HTTPException(status_code=400, detail=f"Not a text encoding: {encoding}")
+    from export import export_source  # Loaded on first export; most processes never export
+
+    converter = SimpleLadderConverter(
+        _device_rules(request.options), None, _fan_out(request.options),
+        _device_allocation(request.plc_type, request.options)
+    )
+
+    def body():
+        # A sync generator: Starlette runs it in a worker thread, chunk by chunk.
+        # One incremental encoder for the whole file, so a BOM is written once
+        encoder = codecs.getincrementalencoder(codec.name)(errors='replace')
+        for chunk in export_source(converter, request.source_code, format):
+            yield encoder.encode(chunk)
+        tail = encoder.encode('', final=True)
+        if tail:
+            yield tail
+        failed = any(error.severity == FATAL for error in converter.errors)
+        record_conversion(
+            'export', 'failure' if failed else 'success', devices=len(converter.symbols.keys),
+            errors=len(converter.errors), warnings=len(converter.warnings)
+        )
+
+    filename, media_type = _EXPORT_FILES[format]
+    charset = _CHARSETS.get(codec.name, codec.name.replace('_', '-'))
+    return StreamingResponse(body(), media_type=f'{media_type}; charset={charset}',
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+async def _read_upload(upload: FormFile):
+    while True:
+        data = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not data:
+            break
+        yield data
+
+@app.post(
+    "/api/upload-convert",
+    response_model=ConversionResponse,
+    openapi_extra={"requestBody": {"content": {
+        "multipart/form-data": {"schema": {"type": "object", "properties": {"file": {"type": "string", "format": "binary"}}}},
+        "application/octet-stream": {"schema": {"type": "string", "format": "binary"}}
+    }}}
+)
+async def upload_and_convert(request: Request, encoding: Optional[str] = None, plc_type: str = "mitsubishi",
+                             options: Optional[str] = None, if_none_match: Optional[str] = Header(None),
+                             accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)):
+    """Convert an uploaded file, hashing it while it streams in
+
+    Accepts a multipart ``file`` field or the raw file as the request body.
+    The encoding is detected (UTF-8 or Shift-JIS) unless ``encoding`` is given.
+    ``options`` are the /api/convert options as JSON, in the query or in a
+    multipart ``options`` field. A cached result is served without parsing.
+    """
+    # Reject oversized uploads before reading any of the body
+    declared_length = request.headers.get('content-length')
+    if declared_length and declared_length.isdigit() and int(declared_length) > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit")
+
+    try:
+        decoder = SourceDecoder(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Unknown encoding: {encoding}")
+
     try:
-        content = await file.read()
-        source_code = content.decode('utf-8')
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            form = await request.form(max_files=1)
+            if isinstance(form.get('options'), str):
+                options = form['options']
+            upload = form.get('file')
+            if not isinstance(upload, FormFile):
+                raise HTTPException(status_code=400, detail="Missing 'file' field")
+            chunks = _read_upload(upload)
+        else:
+            chunks = request.stream()
+        options = _upload_options(plc_type, options)
 
-        request = ConversionRequest(source_code=source_code)
-        response = await convert_code(request)
-        return response
+        hasher = cache_hasher(plc_type, options, CACHE_VERSION)
+        source_code = await read_upload(chunks, decoder, UPLOAD_MAX_BYTES, hasher)
 
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnicodeDecodeError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Error decoding file as {decoder.encoding}: {str(e)}"}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=400,
             content={"detail": f"Error processing file: {str(e)}"}
         )
 
+    key = None if options.get('profile') else hasher.hexdigest()
+    return await _convert_cached(
+        key, if_none_match, plc_type, 'upload',
+        lambda: _run_conversion(source_code, plc_type, options),
+        accept, accept_encoding
+    )
+
+def _upload_options(plc_type: str, options: Optional[str]) -> dict:
+    """Options of an upload, checked like /api/convert's so a bad table is a 400"""
+    try:
+        options = json.loads(options) if options else {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid options: {str(e)}")
+    if not isinstance(options, dict):
+        raise HTTPException(status_code=400, detail="Invalid options: expected a JSON object")
+    _device_rules(options)
+    _fan_out(options)
+    _device_allocation(plc_type, options)
+    return options
+
+@app.post(
+    "/api/batch-convert",
+    openapi_extra={"requestBody": {"content": {
+        "multipart/form-data": {"schema": {"type": "object", "properties": {
+            "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+            "options": {"type": "string", "description": "JSON conversion options, e.g. device_rules"}
+        }}},
+        "application/zip": {"schema": {"type": "string", "format": "binary"}}
+    }}}
+)
+async def batch_convert(request: Request, encoding: Optional[str] = None, plc_type: str = "mitsubishi"):
+    """Convert a whole project (several files or a zip) into one device namespace"""
+    declared_length = request.headers.get('content-length')
+    if declared_length and declared_length.isdigit() and int(declared_length) > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {UPLOAD_MAX_BYTES} byte limit")
+
+    start = time.perf_counter()
+    options = None
+    try:
+        uploads = []
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            form = await request.form(max_files=BATCH_MAX_FILES)
+            if isinstance(form.get('options'), str):
+                options = json.loads(form['options'])
+            for upload in form.getlist('files'):
+                if isinstance(upload, FormFile):
+                    uploads.append((upload.filename or 'upload.st', await upload.read()))
+        else:
+            body = await request.body()
+            if len(body) > UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds the {UPLOAD_MAX_BYTES} byte limit")
+            uploads.append(('', body))
+
+        files = [
+            (name, decode_source(data, encoding))
+            for upload_name, upload_data in uploads
+            for name, data in expand_archive(upload_name, upload_data)
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Error processing upload: {str(e)}"}
+        )
+
+    if not files:
+        raise HTTPException(status_code=400, detail="No ST files in upload")
+    _device_rules(options)
+    _device_allocation(plc_type, options)
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds the {BATCH_MAX_FILES} file limit")
+
+    # One job per worker rather than per file keeps large projects within the queue limit
+    shares = split_jobs(files, executor.max_workers)
+    try:
+        outcomes = await _gather_jobs(executor.run(run_share, share, plc_type, options) for share in shares)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail={"message": str(e), "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    indexed = sorted((item for result, _, _ in outcomes for item in result), key=lambda item: item[0])
+    report = merge_results((result for _, result in indexed), plc_type, options)
+    for (_, result), entry in zip(indexed, report['files']):
+        record_conversion(
+            'batch', 'success' if entry['success'] else 'failure', entry['rung_count'], len(result['device_info']),
+            len(result['errors']), len(result['warnings']), result['timings']
+        )
+    report['summary']['workers'] = len(shares)
+    report['summary']['queue_time'] = max(queue_time for _, queue_time, _ in outcomes)
+    report['summary']['wall_time'] = time.perf_counter() - start
+    return report
+
+async def _run_session_update(session, source_code: Optional[str] = None, edits: Optional[list] = None,
+                              base_version: Optional[int] = None) -> dict:
+    start = time.perf_counter()
+    # Sessions hold state in this process; a thread keeps the loop responsive
+    try:
+        delta = await asyncio.to_thread(session.update, source_code, edits, base_version)
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "version": e.version})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    delta['processing_time'] = time.perf_counter() - start
+    return delta
+
+@app.post("/api/sessions")
+async def create_session(request: ConversionRequest):
+    session_id, session = sessions.create(request.plc_type, _device_rules(request.options),
+                                          _device_allocation(request.plc_type, request.options))
+    delta = await _run_session_update(session, request.source_code)
+    return {"session_id": session_id, **delta}
+
+@app.patch("/api/sessions/{session_id}")
+async def update_session(session_id: str, request: SessionUpdateRequest):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+    if request.source_code is not None:
+        delta = await _run_session_update(session, request.source_code, base_version=request.base_version)
+    elif request.edits is not None:
+        if request.base_version is None:
+            raise HTTPException(status_code=400, detail="Edits require the base_version they were made against")
+        edits = [edit.model_dump() for edit in request.edits]
+        delta = await _run_session_update(session, edits=edits, base_version=request.base_version)
+    else:
+        raise HTTPException(status_code=400, detail="Provide either source_code or edits")
+
+    return {"session_id": session_id, **delta}
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"session_id": session_id, **session.snapshot()}
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"session_id": session_id, "deleted": True}
+
+def _job_accepted(job_id: str) -> JSONResponse:
+    return JSONResponse(status_code=202, content=jobs.store.get(job_id), headers={"Location": f"/api/jobs/{job_id}"})
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: ConversionRequest):
+    """Queue a conversion and return its job id at once
+
+    Poll ``GET /api/jobs/{job_id}`` for status and progress, then fetch
+    ``/api/jobs/{job_id}/result``.
+    """
+    _device_rules(request.options)
+    _fan_out(request.options)
+    _device_allocation(request.plc_type, request.options)
+    return _job_accepted(jobs.submit(request.source_code, request.plc_type, request.options))
+
+@app.post(
+    "/api/jobs/upload",
+    status_code=202,
+    openapi_extra={"requestBody": {"content": {
+        "multipart/form-data": {"schema": {"type": "object", "properties": {"file": {"type": "string", "format": "binary"}}}},
+        "application/octet-stream": {"schema": {"type": "string", "format": "binary"}}
+    }}}
+)
+async def submit_upload_job(request: Request, encoding: Optional[str] = None, plc_type: str = "mitsubishi"):
+    """Queue the conversion of an uploaded file, as /api/upload-convert takes it"""
+    declared_length = request.headers.get('content-length')
+    if declared_length and declared_length.isdigit() and int(declared_length) > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit")
+    try:
+        decoder = SourceDecoder(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Unknown encoding: {encoding}")
+    _device_allocation(plc_type, None)
+
+    try:
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            form = await request.form(max_files=1)
+            upload = form.get('file')
+            if not isinstance(upload, FormFile):
+                raise HTTPException(status_code=400, detail="Missing 'file' field")
+            chunks = _read_upload(upload)
+        else:
+            chunks = request.stream()
+        source_code = await read_upload(chunks, decoder, UPLOAD_MAX_BYTES)
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnicodeDecodeError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Error decoding file as {decoder.encoding}: {str(e)}"}
+        )
+    return _job_accepted(jobs.submit(source_code, plc_type))
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Job status and progress; with ``wait`` (seconds, up to 60) hold the request until the job finishes"""
+    deadline = time.monotonic() + min(max(wait, 0.0), JOB_MAX_WAIT)
+    job = jobs.store.get(job_id)
+    while job is not None and job['status'] not in FINISHED and time.monotonic() < deadline:
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/api/jobs/{job_id}/result", response_model=ConversionResponse)
+async def get_job_result(job_id: str, accept: Optional[str] = Header(None),
+                         accept_encoding: Optional[str] = Header(None)):
+    """The finished job's /api/convert response, negotiated like /api/convert"""
+    payload = jobs.store.result(job_id)
+    if payload is None:
+        job = jobs.store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found or expired")
+        raise HTTPException(status_code=409, detail={"message": f"Job is {job['status']}", "error": job['error']})
+    media_type, coding = negotiate(accept, accept_encoding)
+    if media_type != JSON_TYPE or coding is not None:
+        payload = await asyncio.to_thread(encode_response, payload, media_type, coding)
+    return _encoded_response(payload, media_type, coding, {})
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not jobs.cancel(job_id):
+        job = jobs.store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found or expired")
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    return jobs.store.get(job_id)
+
+startup.import_time = time.perf_counter() - _IMPORT_START
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
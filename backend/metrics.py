@@ -0,0 +1,220 @@
+"""Prometheus metrics for the API process
+
+A small registry rendering the Prometheus text format (version 0.0.4), so
+/metrics needs no extra dependency. Conversions run in worker processes;
+their timings come back in the result payload and are recorded here by
+the API process.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._samples(items))
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, items):
+        for key, value in items:
+            yield f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, items):
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _labels(self.labelnames, key, f'le="{_number(bound)}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, key)} {count}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    'st_ladder_http_requests_total', 'HTTP requests by route, method and status',
+    ('route', 'method', 'status')))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'st_ladder_http_request_duration_seconds', 'Time from request start to the last response byte',
+    ('route', 'method')))
+REQUEST_SIZE = REGISTRY.register(Histogram(
+    'st_ladder_http_request_size_bytes', 'Request body size', ('route',), buckets=SIZE_BUCKETS))
+
+CONVERSIONS = REGISTRY.register(Counter(
+    'st_ladder_conversions_total', 'Conversions by endpoint and outcome (success, failure, cached, rejected)',
+    ('endpoint', 'outcome')))
+RUNGS = REGISTRY.register(Counter('st_ladder_rungs_total', 'Rungs generated', ('endpoint',)))
+DEVICES = REGISTRY.register(Counter('st_ladder_devices_total', 'Devices allocated', ('endpoint',)))
+ERRORS = REGISTRY.register(Counter('st_ladder_conversion_errors_total', 'Conversion error messages', ('endpoint',)))
+WARNINGS = REGISTRY.register(Counter('st_ladder_conversion_warnings_total', 'Conversion warning messages', ('endpoint',)))
+
+PHASE_SECONDS = REGISTRY.register(Histogram(
+    'st_ladder_phase_duration_seconds', 'Time per conversion phase', ('phase',)))
+CONSTRUCT_SECONDS = REGISTRY.register(Counter(
+    'st_ladder_construct_seconds_total', 'Self time per ST construct, by stage (parse or convert)',
+    ('stage', 'construct')))
+CONSTRUCT_COUNT = REGISTRY.register(Counter(
+    'st_ladder_constructs_total', 'ST constructs processed, by stage (parse or convert)',
+    ('stage', 'construct')))
+QUEUE_SECONDS = REGISTRY.register(Histogram(
+    'st_ladder_queue_wait_seconds', 'Time a conversion waited for a free worker'))
+EXECUTOR_PENDING = REGISTRY.register(Gauge(
+    'st_ladder_executor_pending', 'Conversions running or queued in the worker pool'))
+
+
+def record_conversion(endpoint: str, outcome: str, rungs: int = 0, devices: int = 0,
+                      errors: int = 0, warnings: int = 0, timings=None, queue_time: Optional[float] = None):
+    """Count one conversion and fold its profiling.Timings into the totals"""
+    CONVERSIONS.inc(endpoint=endpoint, outcome=outcome)
+    RUNGS.inc(rungs, endpoint=endpoint)
+    DEVICES.inc(devices, endpoint=endpoint)
+    ERRORS.inc(errors, endpoint=endpoint)
+    WARNINGS.inc(warnings, endpoint=endpoint)
+    if queue_time is not None:
+        QUEUE_SECONDS.observe(queue_time)
+    if timings is not None:
+        for phase, seconds in timings.phases.items():
+            PHASE_SECONDS.observe(seconds, phase=phase)
+        for name, (count, _, own) in timings.constructs.items():
+            stage, construct = name.split('.', 1)
+            CONSTRUCT_SECONDS.inc(own, stage=stage, construct=construct)
+            CONSTRUCT_COUNT.inc(count, stage=stage, construct=construct)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count, body size and latency
+
+    Requests are labelled with the matched route template
+    (``/api/sessions/{session_id}``), never the raw path, so label
+    cardinality stays bounded. Latency runs until the last body chunk is
+    sent, which covers streaming responses too. ``on_request``, if given,
+    is called with (route, method, seconds) after every request.
+    """
+
+    def __init__(self, app, on_request: Optional[Callable[[str, str, float], None]] = None):
+        self.app = app
+        self.on_request = on_request
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        received = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+            return message
+
+        async def status_send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, status_send)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            method = scope.get('method', '')
+            REQUESTS.inc(route=path, method=method, status=status)
+            latency = time.perf_counter() - start
+            REQUEST_LATENCY.observe(latency, route=path, method=method)
+            if self.on_request is not None:
+                self.on_request(path, method, latency)
+            if method in ('POST', 'PUT', 'PATCH'):
+                REQUEST_SIZE.observe(received, route=path)
@@ -0,0 +1,260 @@
+"""Parallel conversion of the POUs of one large program
+
+The source is cut at PROGRAM / FUNCTION_BLOCK / FUNCTION boundaries
+(``split_sections``), each section is parsed and translated to rungs on
+its own (``convert_sections``, in worker processes), and ``merge_sections``
+re-addresses the rungs exactly as a serial run would have: declarations
+first, in declaration order, then undeclared variables in the order the
+serial converter first meets them. The merged result is identical to
+converter.run_conversion's, byte for byte.
+"""
+import heapq
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from converter import SimpleLadderConverter, run_conversion
+from allocator import DeviceSpaceError, plan_for_options
+from device_rules import rules_for_options
+from ladder import rungs_to_json
+from profiling import Timings
+from st_ast import POU, CompilationUnit
+from lexer import tokenize
+from st_parser import parse_tokens
+
+# Comments and strings are matched with the lexer's own rules so that a
+# keyword inside them never counts as a boundary
+_SECTION_RE = re.compile(r'''
+    \(\*[\s\S]*?(?:\*\)|\Z)
+  | //[^\n]*
+  | (?<=;)[^\x00-\x7F][^\n]*
+  | '(?:\$.|[^'$\n])*'|"(?:\$.|[^"$\n])*"
+  | \b(?P<word>(?:END_)?(?:FUNCTION_BLOCK|FUNCTION|PROGRAM))\b
+''', re.VERBOSE | re.ASCII | re.IGNORECASE)
+
+
+def split_sections(source: str) -> Optional[List[Tuple[bool, int, int]]]:
+    """Cut source into ``(is_pou, start, end)`` ranges covering all of it
+
+    Each POU range runs from its keyword to the end of its END_ keyword;
+    the text between POUs (VAR_GLOBAL, TYPE, loose statements) forms the
+    other ranges. Returns None when POUs are not cleanly delimited, in
+    which case only a serial parse reproduces the parser's recovery.
+    """
+    sections = []
+    position = 0
+    open_kind = None
+    open_start = 0
+    for match in _SECTION_RE.finditer(source):
+        word = match.group('word')
+        if word is None:
+            continue
+        word = word.upper()
+        if open_kind is None:
+            if word.startswith('END_'):
+                return None
+            if source[position:match.start()].strip():
+                sections.append((False, position, match.start()))
+            open_kind, open_start = word, match.start()
+        elif word == f'END_{open_kind}':
+            sections.append((True, open_start, match.end()))
+            position = match.end()
+            open_kind = None
+        else:
+            return None
+
+    if open_kind is not None:
+        return None
+    if source[position:].strip():
+        sections.append((False, position, len(source)))
+    return sections
+
+
+def _convert_pous(converter: SimpleLadderConverter, pous: List[POU]) -> List[dict]:
+    """Rungs per POU plus the undeclared names each one allocated first"""
+    results = []
+    for pou in pous:
+        allocated = len(converter.symbols.keys)
+        errors, warnings = len(converter.errors), len(converter.warnings)
+        rungs = list(converter.iter_pou_rungs([pou]))
+        results.append({
+            'rungs': rungs,
+            'allocations': list(converter.symbols.addresses().items())[allocated:],
+            'errors': converter.errors[errors:],
+            'warnings': converter.warnings[warnings:]
+        })
+    return results
+
+
+def convert_section(is_pou: bool, text: str, line: int = 1, column: int = 1,
+                    options: Optional[dict] = None) -> Optional[dict]:
+    """Parse and convert one section with section-local device addresses
+
+    ``line`` and ``column`` locate the section in the whole source, so
+    messages carry the same line numbers as a serial run.
+
+    Returns None when the section has parse diagnostics: their wording and
+    order can depend on the surrounding text, so the caller falls back to
+    a serial conversion.
+    """
+    timings = Timings()
+    with timings.phase('parse'):
+        unit, parse_errors, parse_warnings = parse_tokens(tokenize(text, line, column), timings)
+    if parse_errors or parse_warnings:
+        return None
+    if is_pou and (len(unit.pous) != 1 or unit.var_blocks):
+        return None
+
+    converter = SimpleLadderConverter(rules_for_options(options), timings)
+    with timings.phase('declarations'):
+        converter.declare(unit)
+    with timings.phase('logic'):
+        converted = _convert_pous(converter, unit.pous)
+
+    # Bodies stay in the worker; the merge only needs the declarations
+    return {
+        'is_pou': is_pou,
+        'var_blocks': unit.var_blocks,
+        'pous': [
+            (POU(pou.kind, pou.name, pou.var_blocks, [], pou.span), result)
+            for pou, result in zip(unit.pous, converted)
+        ],
+        'variable_map': converter.symbols.addresses(),
+        'timings': timings
+    }
+
+
+def convert_sections(share: List[tuple], options: Optional[dict] = None) -> List[Tuple[int, Optional[dict]]]:
+    """convert_section over a share of the sections, as one worker job"""
+    return [(index, convert_section(is_pou, text, line, column, options))
+            for index, is_pou, text, line, column in share]
+
+
+def share_sections(source: str, sections: List[Tuple[bool, int, int]], jobs: int) -> List[List[tuple]]:
+    """Balance sections over at most ``jobs`` shares by size, largest first
+
+    Each share is a list of ``(index, is_pou, text, line, column)``.
+    """
+    positions = []
+    line, line_start, scanned = 1, 0, 0
+    for _, start, _ in sections:
+        line += source.count('\n', scanned, start)
+        line_start = max(line_start, source.rfind('\n', scanned, start) + 1)
+        scanned = start
+        positions.append((line, start - line_start + 1))
+
+    shares = [[] for _ in range(max(1, min(jobs, len(sections))))]
+    loads = [(0, i) for i in range(len(shares))]
+    for index in sorted(range(len(sections)), key=lambda i: sections[i][1] - sections[i][2]):
+        is_pou, start, end = sections[index]
+        load, share = heapq.heappop(loads)
+        shares[share].append((index, is_pou, source[start:end]) + positions[index])
+        heapq.heappush(loads, (load + end - start, share))
+    return [share for share in shares if share]
+
+
+def merge_sections(results: List[dict], plc_type: str = "mitsubishi",
+                   options: Optional[dict] = None) -> Optional[dict]:
+    """Combine section results, in source order, into a run_conversion payload
+
+    Returns None when the model runs out of devices: which rungs a serial
+    run drops then depends on statement order, so the caller converts
+    serially instead.
+    """
+    timings = Timings()
+    var_blocks = []
+    pous = []
+    loose = []
+    for result in results:
+        var_blocks.extend(result['var_blocks'])
+        for pou, converted in result['pous']:
+            if result['is_pou']:
+                pous.append((pou, converted, result['variable_map']))
+            else:
+                # Statements outside any POU form one trailing PROGRAM, as in STParser.parse
+                loose.append((converted, result['variable_map']))
+        timings.add(result['timings'])
+
+    stubs = [pou for pou, _, _ in pous]
+    if loose:
+        stubs.append(POU('PROGRAM', '', [], [], None))
+    by_stub = {id(pou): [(converted, local_map)] for pou, converted, local_map in pous}
+    if loose:
+        by_stub[id(stubs[-1])] = loose
+
+    merger = SimpleLadderConverter(rules_for_options(options), allocation=plan_for_options(plc_type, options))
+    rungs = []
+    with timings.phase('merge'):
+        stubs = merger.declare(CompilationUnit(var_blocks, stubs))
+        if merger.errors:
+            # Declarations the model has no room for
+            return None
+        symbols = merger.symbols
+        for stub in stubs:
+            scope = symbols.scope(stub.kind, stub.name)
+            for converted, local_map in by_stub[id(stub)]:
+                remap = {
+                    local_address: symbols.keys[key].address
+                    for key, local_address in local_map.items() if key in symbols.keys
+                }
+                # Names the section could not resolve on its own are looked up
+                # in the full table, or get the next address in the order the
+                # serial converter would have met them
+                for name, local_address in converted['allocations']:
+                    symbol = symbols.resolve(scope, name)
+                    if symbol is None:
+                        try:
+                            symbol = merger._implicit(name, local_address.rstrip('0123456789'))
+                        except DeviceSpaceError:
+                            return None
+                    remap[local_address] = symbol.address
+                rungs.extend(rung.remap(remap) for rung in converted['rungs'])
+                merger.errors.extend(converted['errors'])
+                merger.warnings.extend(converted['warnings'])
+
+    with timings.phase('device_list'):
+        device_list = merger.device_list()
+        device_map = symbols.device_map()
+    with timings.phase('serialize'):
+        rungs_json = rungs_to_json(rungs)
+    return {
+        'rungs_json': rungs_json,
+        'rung_count': len(rungs),
+        'metadata': {
+            'plc_type': plc_type,
+            'generated_at': datetime.now().isoformat()
+        },
+        'device_map': device_map,
+        'device_list': device_list,
+        'device_usage': merger.devices.usage(),
+        'errors': merger.errors,
+        'warnings': merger.warnings,
+        'timings': timings
+    }
+
+
+def convert_parallel(source_code: str, plc_type: str = "mitsubishi", options: Optional[dict] = None,
+                     max_workers: Optional[int] = None) -> dict:
+    """run_conversion spread over local worker processes, one or more POUs each"""
+    sections = split_sections(source_code)
+    workers = max_workers or os.cpu_count() or 1
+    if not sections or len(sections) < 2 or workers < 2 or (options or {}).get('fan_out'):
+        return run_conversion(source_code, plc_type, options)
+
+    shares = share_sections(source_code, sections, workers)
+    with ProcessPoolExecutor(max_workers=len(shares)) as pool:
+        parts = list(pool.map(convert_sections, shares, [options] * len(shares)))
+    results = collect(parts)
+    merged = merge_sections(results, plc_type, options) if results is not None else None
+    if merged is None:
+        return run_conversion(source_code, plc_type, options)
+    return merged
+
+
+def collect(parts: List[List[Tuple[int, Optional[dict]]]]) -> Optional[List[dict]]:
+    """Section results back in source order, or None if any section needs a serial run"""
+    indexed = sorted((item for part in parts for item in part), key=lambda item: item[0])
+    results = [result for _, result in indexed]
+    return None if any(result is None for result in results) else results
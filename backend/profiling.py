@@ -0,0 +1,106 @@
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from typing import List
+
+
+class Timings:
+    """Monotonic timers for one conversion
+
+    ``phases`` holds wall time per pipeline phase. ``constructs`` holds, per
+    ST construct and stage (``parse.IF``, ``convert.Assignment``, ...), the
+    call count, total time and self time; self time excludes nested
+    statements, so an IF is not charged for the assignments inside it.
+    Plain data only, so it pickles back from the worker processes.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.constructs = {}
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + perf_counter() - start
+
+    def start(self):
+        self._stack.append([perf_counter(), 0.0])
+
+    def stop(self, name: str):
+        """Close the innermost start() and charge it to ``name``"""
+        start, children = self._stack.pop()
+        elapsed = perf_counter() - start
+        if self._stack:
+            self._stack[-1][1] += elapsed
+        entry = self.constructs.get(name)
+        if entry is None:
+            entry = self.constructs[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] += elapsed - children
+
+    def add(self, other: 'Timings'):
+        """Fold another conversion's timers into these, e.g. from parallel workers"""
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        for name, (count, total, own) in other.constructs.items():
+            entry = self.constructs.get(name)
+            if entry is None:
+                entry = self.constructs[name] = [0, 0.0, 0.0]
+            entry[0] += count
+            entry[1] += total
+            entry[2] += own
+
+    def __getstate__(self):
+        return self.phases, self.constructs
+
+    def __setstate__(self, state):
+        self.phases, self.constructs = state
+        self._stack = []
+
+    def to_dict(self) -> dict:
+        return {
+            'phases': dict(self.phases),
+            'constructs': {
+                name: {'count': count, 'total_time': total, 'self_time': own}
+                for name, (count, total, own) in sorted(self.constructs.items(), key=lambda item: -item[1][2])
+            }
+        }
+
+
+def _function_label(key: tuple) -> str:
+    filename, line, function = key
+    if filename == '~':
+        return function  # built-in
+    return f'{os.path.basename(filename)}:{line}({function})'
+
+
+def profile_call(fn, *args, limit: int = 40):
+    """Run fn(*args) under cProfile
+
+    Returns ``(result, functions)``: the ``limit`` most expensive functions
+    by cumulative time, with the same columns as pstats print_stats().
+    """
+    # Imported here: pstats pulls in dataclasses and more, and few requests profile
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args)
+    stats = pstats.Stats(profiler).stats
+
+    functions: List[dict] = []
+    for key, (primitive_calls, calls, total_time, cumulative_time, _) in stats.items():
+        functions.append({
+            'function': _function_label(key),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'total_time': total_time,
+            'cumulative_time': cumulative_time
+        })
+    functions.sort(key=lambda entry: -entry['cumulative_time'])
+    return result, functions[:limit]
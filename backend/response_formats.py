@@ -0,0 +1,204 @@
+import gzip
+import json
+from typing import List, Optional, Tuple
+
+import msgpack
+from pydantic import BaseModel
+
+from diagnostics import is_failure, payload as diagnostics_payload
+
+try:
+    import brotli
+except ImportError:  # Optional: br is only offered when the package is installed
+    brotli = None
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPE = 'application/msgpack'
+_MSGPACK_ALIASES = (MSGPACK_TYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Element type codes of the compact form, and the keys each element's array holds after the code
+ELEMENT_TYPES = ('contact', 'coil', 'branch', 'wrap')
+_ELEMENT_KEYS = {
+    'contact': ('address', 'description', 'isNormallyOpen', 'x', 'y'),
+    'coil': ('address', 'description', 'x', 'y'),
+    'branch': ('x', 'y', 'width', 'height'),
+    'wrap': ('x', 'y', 'to_y')
+}
+_STRING_KEYS = ('address', 'description')
+_DEVICE_KEYS = ('device_address', 'variable_name', 'device_type')
+
+
+class ConversionResponse(BaseModel):
+    success: bool
+    ladder_data: dict
+    device_map: dict
+    device_list: List[dict]  # New field for formatted device list
+    errors: List[str]
+    warnings: List[str]
+    diagnostics: List[dict] = []  # Severity, code, message and source span of each error and warning
+    processing_time: float
+    queue_time: float = 0.0  # Time spent waiting for a free conversion worker
+    profile: Optional[dict] = None  # Phase, construct and cProfile breakdown with options={"profile": true}
+    device_usage: Optional[dict] = None  # Per device family: used, free and fragmentation on the plc_type model
+
+
+def conversion_payload(result: dict, processing_time: float, queue_time: float = 0.0) -> Tuple[bool, bytes]:
+    """(success, ConversionResponse JSON) for a run_conversion result"""
+    success = not is_failure(result['rung_count'], result['errors'])
+
+    # Everything but the rungs goes through the model; the rungs arrive
+    # pre-serialized and are spliced in instead of being re-validated
+    response = ConversionResponse(
+        success=success,
+        ladder_data={},
+        device_map=result['device_map'],
+        device_list=result['device_list'],
+        **diagnostics_payload(result['errors'], result['warnings']),
+        processing_time=processing_time,
+        queue_time=queue_time,
+        profile=result.get('profile'),
+        device_usage=result.get('device_usage')
+    )
+    excluded = {'success', 'ladder_data'} if response.profile is not None else {'success', 'ladder_data', 'profile'}
+    rest = response.model_dump_json(exclude=excluded)
+    ladder_json = f'{{"rungs":{result["rungs_json"]},"metadata":{json.dumps(result["metadata"], ensure_ascii=False)}}}'
+    payload = f'{{"success":{"true" if success else "false"},"ladder_data":{ladder_json},{rest[1:]}'
+    return success, payload.encode('utf-8')
+
+
+def _quality(accept: Optional[str]) -> dict:
+    """token -> q from an Accept or Accept-Encoding header"""
+    qualities = {}
+    for part in (accept or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[token] = max(q, qualities.get(token, 0.0))
+    return qualities
+
+
+def negotiate(accept: Optional[str], accept_encoding: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(media type, content coding or None) for a conversion response
+
+    MessagePack only when the client prefers it to JSON; JSON otherwise,
+    including for Accept values naming neither. br is preferred to gzip at
+    equal quality.
+    """
+    media = _quality(accept)
+    msgpack_q = max(media.get(alias, 0.0) for alias in _MSGPACK_ALIASES)
+    json_q = max(media.get(JSON_TYPE, 0.0), media.get('application/*', 0.0), media.get('*/*', 0.0))
+    media_type = MSGPACK_TYPE if msgpack_q > 0 and msgpack_q >= json_q else JSON_TYPE
+
+    codings = _quality(accept_encoding)
+    coding, best = None, 0.0
+    for candidate in ('br', 'gzip'):
+        if candidate == 'br' and brotli is None:
+            continue
+        q = codings.get(candidate, codings.get('*', 0.0))
+        if q > best:
+            coding, best = candidate, q
+    return media_type, coding
+
+
+def variant(media_type: str, coding: Optional[str]) -> str:
+    """Short name of a representation, for cache keys and ETags"""
+    name = 'msgpack' if media_type == MSGPACK_TYPE else 'json'
+    return f'{name}+{coding}' if coding else name
+
+
+def encode_response(payload: bytes, media_type: str, coding: Optional[str]) -> bytes:
+    """The JSON response ``payload`` in the negotiated representation"""
+    body = payload
+    if media_type == MSGPACK_TYPE:
+        body = msgpack.packb(compact_payload(json.loads(payload)), use_bin_type=True)
+    if coding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if coding == 'gzip':
+        # mtime=0 keeps the bytes, and so the ETag, stable across runs
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+class StringTable:
+    """Distinct strings in first-use order; each is sent once and referenced by index"""
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def __call__(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def compact_payload(data: dict) -> dict:
+    """A conversion response with repeated keys and device strings factored out
+
+    Each element becomes an array: its ``ELEMENT_TYPES`` code, then the
+    values of ``_ELEMENT_KEYS`` in order, addresses and descriptions as
+    indexes into ``strings``. device_map families become
+    ``[[address, name], ...]`` and device_list entries ``[address, name,
+    device_type]``, all as indexes. The other fields are unchanged.
+    expand_payload() reverses this.
+    """
+    table = StringTable()
+    codes = {name: code for code, name in enumerate(ELEMENT_TYPES)}
+    ladder = data['ladder_data']
+    rungs = []
+    for rung in ladder.get('rungs', []):
+        elements = []
+        for element in rung['elements']:
+            kind = element['type']
+            elements.append([codes[kind]] + [
+                table(element[key]) if key in _STRING_KEYS else element[key] for key in _ELEMENT_KEYS[kind]
+            ])
+        rungs.append(elements)
+
+    compact = dict(data)
+    compact['ladder_data'] = {**ladder, 'rungs': rungs}
+    compact['device_map'] = {
+        family: [[table(address), table(name)] for address, name in devices.items()]
+        for family, devices in data['device_map'].items()
+    }
+    compact['device_list'] = [[table(device[key]) for key in _DEVICE_KEYS] for device in data['device_list']]
+    compact['strings'] = table.strings
+    return compact
+
+
+def expand_payload(compact: dict) -> dict:
+    """The JSON response form of a compact_payload() result"""
+    strings = compact['strings']
+    rungs = []
+    for elements in compact['ladder_data']['rungs']:
+        expanded = []
+        for values in elements:
+            kind = ELEMENT_TYPES[values[0]]
+            element = {'type': kind}
+            for key, value in zip(_ELEMENT_KEYS[kind], values[1:]):
+                element[key] = strings[value] if key in _STRING_KEYS else value
+            expanded.append(element)
+        rungs.append({'elements': expanded})
+
+    data = {key: value for key, value in compact.items() if key != 'strings'}
+    data['ladder_data'] = {**compact['ladder_data'], 'rungs': rungs}
+    data['device_map'] = {
+        family: {strings[address]: strings[name] for address, name in devices}
+        for family, devices in compact['device_map'].items()
+    }
+    data['device_list'] = [dict(zip(_DEVICE_KEYS, (strings[i] for i in device))) for device in compact['device_list']]
+    return data
@@ -0,0 +1,363 @@
+"""Scan-cycle simulation of generated ladders, checked against the ST source
+
+The ladder and a reference interpreter of the ST AST run side by side on
+the same inputs. State is one row per device (or ST name) of bit-packed
+uint64 words, so one NumPy operation evaluates 64 input vectors per word
+and a whole batch per rung. Rungs use OUT semantics: every scan each coil
+takes its network's value, later rungs seeing earlier results.
+
+Only BOOL logic is modelled. Comparisons and other non-BOOL expressions
+are free inputs on both sides, as they are contacts of their own in the
+ladder. ``sel = <n>`` atoms sharing a selector are drawn together so at
+most one holds, as the condition compiler assumes. Timers, counters and
+FB calls are not simulated: call coils are left out of the comparison
+and FB outputs such as ``T1.Q`` are inputs.
+
+Run from the backend directory; exits 1 when the ladder and the ST differ:
+
+    python simulator.py ../sample_warehouse.st --vectors 65536 --scans 4
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from converter import SimpleLadderConverter, case_branches
+from device_rules import DeviceRules
+from ladder import Rung, rung_from_dict
+from st_ast import (
+    Assignment, BinaryOp, CallStatement, CaseStatement, IfStatement, Literal, Name, UnaryOp, format_expr
+)
+from st_parser import parse_source
+
+WORD_BITS = 64
+_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+_SELECTOR_TEST = re.compile(r'^(.+) = (-?\d+)$')
+
+
+class Rows:
+    """Row index per state name: device addresses, or ST names without one"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def __call__(self, name: str) -> int:
+        row = self.index.get(name)
+        if row is None:
+            row = self.index[name] = len(self.index)
+        return row
+
+    def __len__(self):
+        return len(self.index)
+
+
+class LadderSimulator:
+    """Rungs compiled to bitwise NumPy operations over the state rows"""
+
+    def __init__(self, rungs: List[Rung], rows: Rows):
+        self.rows = rows
+        self.reads = set()
+        self.writes = set()
+        self._rungs = []
+        for rung in rungs:
+            network = self._series(rung.contacts)
+            coils = (rung.coil_address,) + rung.coils[::2]
+            targets = [rows(address) for address in coils]
+            self.writes.update(targets)
+            self._rungs.append((network, targets))
+
+    @classmethod
+    def from_ladder_data(cls, ladder_data: dict, rows: Rows) -> 'LadderSimulator':
+        return cls([rung_from_dict(rung) for rung in ladder_data['rungs']], rows)
+
+    def _series(self, contacts: tuple):
+        terms = []
+        for i in range(0, len(contacts), 3):
+            if contacts[i] is None:
+                branches = [self._series(branch) for branch in contacts[i + 1]]
+                terms.append(lambda state, branches=branches: _any(branch(state) for branch in branches))
+            else:
+                row = self.rows(contacts[i])
+                self.reads.add(row)
+                terms.append((lambda state, row=row: state[row]) if contacts[i + 2]
+                             else (lambda state, row=row: ~state[row]))
+        if not terms:
+            return lambda state: np.full(state.shape[1], _ONES)
+        if len(terms) == 1:
+            return terms[0]
+        return lambda state: _all(term(state) for term in terms)
+
+    def scan(self, state: np.ndarray):
+        for network, targets in self._rungs:
+            value = network(state)
+            for target in targets:
+                state[target] = value
+
+
+class STInterpreter:
+    """Reference execution of the ST statements, 64 input vectors per word
+
+    Names resolve through the converter's symbol table, POU by POU, so they
+    land on the rows of the devices the ladder uses. Statements compile to
+    closures once; assignments are masked by the conditions of the branch
+    they sit in, and CASE runs as the IF/ELSIF chain the converter lowers
+    it to.
+    """
+
+    def __init__(self, pous: list, symbols, rows: Rows):
+        self.symbols = symbols
+        self.rows = rows
+        self.reads = set()
+        self.writes = set()
+        self.compared = {}    # row -> ST name of every BOOL assignment target
+        self.skipped = set()  # Targets of calls and non-BOOL assignments
+        self.unsupported = []
+        self._pous = [
+            self._statements(symbols.scope(pou.kind, pou.name), pou.body) for pou in pous
+        ]
+        for row in self.skipped:
+            self.compared.pop(row, None)
+
+    def _row(self, scope, name: str) -> int:
+        symbol = self.symbols.resolve(scope, name)
+        return self.rows(symbol.address if symbol is not None else name)
+
+    def _statements(self, scope, statements: list):
+        steps = [step for step in (self._statement(scope, statement) for statement in statements) if step]
+
+        def execute(state, mask):
+            for step in steps:
+                step(state, mask)
+        return execute
+
+    def _statement(self, scope, statement):
+        if isinstance(statement, Assignment):
+            name = statement.target.name
+            row = self._row(scope, name)
+            self.writes.add(row)
+            symbol = self.symbols.resolve(scope, name)
+            if (symbol is not None and symbol.data_type not in (None, 'BOOL')) or not _boolean(statement.value):
+                # Numeric data is not modelled; the target is neither input nor compared
+                self.skipped.add(row)
+                return None
+            self.compared.setdefault(row, name)
+            value = self._expression(scope, statement.value)
+
+            def assign(state, mask):
+                state[row] = (state[row] & ~mask) | (value(state) & mask)
+            return assign
+
+        if isinstance(statement, CallStatement):
+            self.skipped.add(self._row(scope, statement.call.name))
+            return None
+
+        if isinstance(statement, (IfStatement, CaseStatement)):
+            branches = statement.branches if isinstance(statement, IfStatement) else case_branches(statement)
+            compiled = [(self._expression(scope, condition), self._statements(scope, body))
+                        for condition, body in branches]
+            otherwise = self._statements(scope, statement.else_body) if statement.else_body else None
+
+            def branch(state, mask):
+                remaining = mask
+                for condition, body in compiled:
+                    taken = remaining & condition(state)
+                    remaining = remaining & ~taken
+                    body(state, taken)
+                if otherwise is not None:
+                    otherwise(state, remaining)
+            return branch
+
+        self.unsupported.append(type(statement).__name__)
+        return None
+
+    def _expression(self, scope, expr):
+        if isinstance(expr, UnaryOp) and expr.op == 'NOT':
+            operand = self._expression(scope, expr.operand)
+            return lambda state: ~operand(state)
+        if isinstance(expr, Literal) and expr.text in ('TRUE', 'FALSE'):
+            word = _ONES if expr.text == 'TRUE' else np.uint64(0)
+            return lambda state: np.full(state.shape[1], word)
+        if isinstance(expr, BinaryOp):
+            if expr.op in ('AND', 'OR', 'XOR'):
+                left = self._expression(scope, expr.left)
+                right = self._expression(scope, expr.right)
+                if expr.op == 'AND':
+                    return lambda state: left(state) & right(state)
+                if expr.op == 'OR':
+                    return lambda state: left(state) | right(state)
+                return lambda state: left(state) ^ right(state)
+            if expr.op in ('=', '<>'):
+                for operand, other in ((expr.left, expr.right), (expr.right, expr.left)):
+                    if isinstance(other, Literal) and other.text in ('TRUE', 'FALSE'):
+                        value = self._expression(scope, operand)
+                        if (other.text == 'TRUE') == (expr.op == '='):
+                            return value
+                        return lambda state: ~value(state)
+        # A variable, or an expression the ladder reads as a contact of its own
+        row = self._row(scope, expr.name if isinstance(expr, Name) else format_expr(expr))
+        self.reads.add(row)
+        return lambda state: state[row]
+
+    def scan(self, state: np.ndarray):
+        ones = np.full(state.shape[1], _ONES)
+        for execute in self._pous:
+            execute(state, ones)
+
+
+def _boolean(expr) -> bool:
+    if isinstance(expr, UnaryOp):
+        return expr.op == 'NOT' and _boolean(expr.operand)
+    if isinstance(expr, BinaryOp):
+        return expr.op in ('AND', 'OR', 'XOR') and _boolean(expr.left) and _boolean(expr.right)
+    return isinstance(expr, Name) or (isinstance(expr, Literal) and expr.text in ('TRUE', 'FALSE'))
+
+
+def _all(values) -> np.ndarray:
+    values = iter(values)
+    result = next(values)
+    for value in values:
+        result = result & value
+    return result
+
+
+def _any(values) -> np.ndarray:
+    values = iter(values)
+    result = next(values)
+    for value in values:
+        result = result | value
+    return result
+
+
+class InputGenerator:
+    """Random input words, with ``sel = n`` tests of one selector mutually exclusive"""
+
+    def __init__(self, names: Dict[int, str], seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.free = []
+        groups: Dict[str, list] = {}
+        for row, name in names.items():
+            match = _SELECTOR_TEST.match(name)
+            if match:
+                groups.setdefault(match.group(1), []).append(row)
+            else:
+                self.free.append(row)
+        self.groups = list(groups.values())
+
+    def fill(self, state: np.ndarray):
+        words = state.shape[1]
+        if self.free:
+            state[self.free] = self.rng.integers(0, _ONES, size=(len(self.free), words), dtype=np.uint64,
+                                                 endpoint=True)
+        for rows in self.groups:
+            # One choice per vector: one of the tested values, or none of them
+            choice = self.rng.integers(0, len(rows) + 1, size=words * WORD_BITS)
+            for value, row in enumerate(rows):
+                state[row] = np.packbits(choice == value, bitorder='little').view(np.uint64)
+
+
+def _bit(words: np.ndarray, vector: int) -> bool:
+    return bool((int(words[vector // WORD_BITS]) >> (vector % WORD_BITS)) & 1)
+
+
+def differential_test(source_code: str, vectors: int = 65536, scans: int = 4, seed: int = 0,
+                      rules: Optional[DeviceRules] = None, fan_out: Optional[str] = None,
+                      stop_at_mismatch: bool = True) -> dict:
+    """Run the ladder and the ST on random inputs; report the first difference
+
+    Every scan draws fresh inputs for all ``vectors`` at once, which are
+    rounded up to whole 64-bit words. The report's
+    ``mismatch`` is None when every compared output agreed after every
+    scan, otherwise the first (scan, vector) that differed, with the input
+    history that leads to it. With ``stop_at_mismatch`` False every scan
+    runs regardless, as benchmarks need.
+    """
+    unit, parse_errors, _ = parse_source(source_code)
+    converter = SimpleLadderConverter(rules, fan_out=fan_out)
+    pous = converter.declare(unit, parse_errors)
+    rungs = list(converter.iter_pou_rungs(pous))
+
+    rows = Rows()
+    ladder = LadderSimulator(rungs, rows)
+    reference = STInterpreter(pous, converter.symbols, rows)
+    words = max(1, -(-vectors // WORD_BITS))
+
+    names = {row: name for name, row in rows.index.items()}
+    for symbol in converter.symbols.keys.values():
+        if symbol.address in rows.index:
+            names[rows.index[symbol.address]] = symbol.key
+    input_rows = sorted((ladder.reads | reference.reads) - ladder.writes - reference.writes)
+    compared = sorted(row for row in reference.compared if row in ladder.writes)
+    generator = InputGenerator({row: names[row] for row in input_rows}, seed)
+
+    ladder_state = np.zeros((len(rows), words), dtype=np.uint64)
+    st_state = np.zeros_like(ladder_state)
+    history = []
+    mismatch = None
+    start = time.perf_counter()
+    for scan in range(scans):
+        generator.fill(ladder_state)
+        st_state[input_rows] = ladder_state[input_rows]
+        history.append(ladder_state[input_rows].copy())
+        ladder.scan(ladder_state)
+        reference.scan(st_state)
+        differing = np.bitwise_or.reduce(ladder_state[compared] ^ st_state[compared], axis=0) if compared else None
+        if mismatch is None and differing is not None and differing.any():
+            word = int(np.flatnonzero(differing)[0])
+            bits = int(differing[word])
+            vector = word * WORD_BITS + (bits & -bits).bit_length() - 1
+            mismatch = {
+                'scan': scan,
+                'vector': vector,
+                'inputs': [
+                    {names[row]: _bit(inputs[i], vector) for i, row in enumerate(input_rows)}
+                    for inputs in history
+                ],
+                'outputs': {
+                    names[row]: {'ladder': _bit(ladder_state[row], vector), 'st': _bit(st_state[row], vector)}
+                    for row in compared
+                    if _bit(ladder_state[row], vector) != _bit(st_state[row], vector)
+                }
+            }
+            if stop_at_mismatch:
+                break
+    elapsed = time.perf_counter() - start
+    scanned = len(history) * words * WORD_BITS
+
+    return {
+        'equivalent': mismatch is None,
+        'vectors': words * WORD_BITS,
+        'scans': len(history),
+        'rungs': len(rungs),
+        'inputs': [names[row] for row in input_rows],
+        'compared': [names[row] for row in compared],
+        'not_compared': sorted(names[row] for row in reference.skipped),
+        'unsupported': sorted(set(reference.unsupported)),
+        'mismatch': mismatch,
+        'scan_evaluations_per_second': scanned / elapsed if elapsed else 0.0,
+        'rung_evaluations_per_second': scanned * len(rungs) / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a converted ladder against its ST source by simulation")
+    parser.add_argument('file')
+    parser.add_argument('--vectors', type=int, default=65536, help="Input vectors simulated in parallel")
+    parser.add_argument('--scans', type=int, default=4, help="Scan cycles, each with fresh inputs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fan-out', choices=('relay', 'coils'))
+    args = parser.parse_args()
+
+    with open(args.file, encoding='utf-8') as f:
+        source_code = f.read()
+    report = differential_test(source_code, args.vectors, args.scans, args.seed, fan_out=args.fan_out)
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    return 0 if report['equivalent'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
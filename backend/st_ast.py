@@ -0,0 +1,241 @@
+from typing import List, NamedTuple, Optional
+
+
+class Span(NamedTuple):
+    """Source range in the original file, 1-based and end-exclusive"""
+    line: int
+    col: int
+    end_line: int
+    end_col: int
+
+
+class Node:
+    __slots__ = ('span',)
+
+    def __init__(self, span: Optional[Span] = None):
+        self.span = span
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields())
+        return f'{type(self).__name__}({fields})'
+
+    def __eq__(self, other):
+        # Structural equality ignores spans so identical code in different places compares equal
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self._fields()
+        )
+
+    __hash__ = None
+
+    @classmethod
+    def _fields(cls):
+        return [name for klass in reversed(cls.__mro__) for name in getattr(klass, '__slots__', ()) if name != 'span']
+
+
+# Expressions
+
+class Name(Node):
+    """Variable reference, possibly dotted (``T1.Q``) or indexed (``a[1]``)"""
+    __slots__ = ('name',)
+
+    def __init__(self, name: str, span: Optional[Span] = None):
+        super().__init__(span)
+        self.name = name
+
+
+class Literal(Node):
+    """Numeric, boolean, string or typed literal kept as written"""
+    __slots__ = ('text',)
+
+    def __init__(self, text: str, span: Optional[Span] = None):
+        super().__init__(span)
+        self.text = text
+
+
+class UnaryOp(Node):
+    __slots__ = ('op', 'operand')
+
+    def __init__(self, op: str, operand: Node, span: Optional[Span] = None):
+        super().__init__(span)
+        self.op = op
+        self.operand = operand
+
+
+class BinaryOp(Node):
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op: str, left: Node, right: Node, span: Optional[Span] = None):
+        super().__init__(span)
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Call(Node):
+    """Function or FB invocation; args are (param_name or None, expression)"""
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name: str, args: List[tuple], span: Optional[Span] = None):
+        super().__init__(span)
+        self.name = name
+        self.args = args
+
+
+# Statements
+
+class Assignment(Node):
+    __slots__ = ('target', 'value')
+
+    def __init__(self, target: Name, value: Node, span: Optional[Span] = None):
+        super().__init__(span)
+        self.target = target
+        self.value = value
+
+
+class CallStatement(Node):
+    __slots__ = ('call',)
+
+    def __init__(self, call: Call, span: Optional[Span] = None):
+        super().__init__(span)
+        self.call = call
+
+
+class IfStatement(Node):
+    """IF/ELSIF chain; branches are (condition, body) in source order"""
+    __slots__ = ('branches', 'else_body')
+
+    def __init__(self, branches: List[tuple], else_body: Optional[list], span: Optional[Span] = None):
+        super().__init__(span)
+        self.branches = branches
+        self.else_body = else_body
+
+
+class CaseRange(Node):
+    __slots__ = ('low', 'high')
+
+    def __init__(self, low: Node, high: Node, span: Optional[Span] = None):
+        super().__init__(span)
+        self.low = low
+        self.high = high
+
+
+class CaseBranch(Node):
+    """One CASE arm; labels are Literal/Name values or CaseRange"""
+    __slots__ = ('labels', 'body')
+
+    def __init__(self, labels: list, body: list, span: Optional[Span] = None):
+        super().__init__(span)
+        self.labels = labels
+        self.body = body
+
+
+class CaseStatement(Node):
+    __slots__ = ('selector', 'branches', 'else_body')
+
+    def __init__(self, selector: Node, branches: List[CaseBranch], else_body: Optional[list],
+                 span: Optional[Span] = None):
+        super().__init__(span)
+        self.selector = selector
+        self.branches = branches
+        self.else_body = else_body
+
+
+class LoopStatement(Node):
+    """FOR/WHILE/REPEAT, parsed so nesting stays intact but not translated"""
+    __slots__ = ('kind', 'body')
+
+    def __init__(self, kind: str, body: list, span: Optional[Span] = None):
+        super().__init__(span)
+        self.kind = kind
+        self.body = body
+
+
+class ControlStatement(Node):
+    """RETURN or EXIT"""
+    __slots__ = ('kind',)
+
+    def __init__(self, kind: str, span: Optional[Span] = None):
+        super().__init__(span)
+        self.kind = kind
+
+
+# Declarations and program units
+
+class VarDeclaration(Node):
+    __slots__ = ('names', 'data_type', 'address', 'initial')
+
+    def __init__(self, names: List[str], data_type: str, address: Optional[str] = None,
+                 initial: Optional[Node] = None, span: Optional[Span] = None):
+        super().__init__(span)
+        self.names = names
+        self.data_type = data_type
+        self.address = address
+        self.initial = initial
+
+
+class VarBlock(Node):
+    """VAR, VAR_GLOBAL, VAR_INPUT, ... section"""
+    __slots__ = ('kind', 'declarations')
+
+    def __init__(self, kind: str, declarations: List[VarDeclaration], span: Optional[Span] = None):
+        super().__init__(span)
+        self.kind = kind
+        self.declarations = declarations
+
+
+class POU(Node):
+    """Program organization unit; kind is PROGRAM, FUNCTION_BLOCK or FUNCTION"""
+    __slots__ = ('kind', 'name', 'var_blocks', 'body')
+
+    def __init__(self, kind: str, name: str, var_blocks: List[VarBlock], body: list,
+                 span: Optional[Span] = None):
+        super().__init__(span)
+        self.kind = kind
+        self.name = name
+        self.var_blocks = var_blocks
+        self.body = body
+
+
+class CompilationUnit(Node):
+    """Whole source file
+
+    Global VAR blocks and POUs keep their source order. Statements outside
+    any POU are collected into an unnamed PROGRAM so bare snippets convert.
+    """
+    __slots__ = ('var_blocks', 'pous')
+
+    def __init__(self, var_blocks: List[VarBlock], pous: List[POU], span: Optional[Span] = None):
+        super().__init__(span)
+        self.var_blocks = var_blocks
+        self.pous = pous
+
+
+BINARY_PRECEDENCE = {
+    'OR': 1, 'XOR': 2, 'AND': 3, '&': 3, '=': 4, '<>': 4,
+    '<': 5, '>': 5, '<=': 5, '>=': 5, '+': 6, '-': 6,
+    '*': 7, '/': 7, 'MOD': 7, '**': 8
+}
+
+
+def format_expr(node: Node, parent_precedence: int = 0) -> str:
+    """Render an expression back to normalized ST text"""
+    if isinstance(node, Name):
+        return node.name
+    if isinstance(node, Literal):
+        return node.text
+    if isinstance(node, UnaryOp):
+        operand = format_expr(node.operand, 9)
+        return f'NOT {operand}' if node.op == 'NOT' else f'{node.op}{operand}'
+    if isinstance(node, BinaryOp):
+        precedence = BINARY_PRECEDENCE.get(node.op, 0)
+        text = f'{format_expr(node.left, precedence)} {node.op} {format_expr(node.right, precedence + 1)}'
+        return f'({text})' if precedence < parent_precedence else text
+    if isinstance(node, Call):
+        args = ', '.join(
+            f'{name} := {format_expr(value)}' if name else format_expr(value)
+            for name, value in node.args
+        )
+        return f'{node.name}({args})'
+    if isinstance(node, CaseRange):
+        return f'{format_expr(node.low)}..{format_expr(node.high)}'
+    return '?'
@@ -0,0 +1,598 @@
+import hashlib
+from collections import OrderedDict, deque
+from typing import Iterable, List, Optional, Tuple
+
+from diagnostics import EXPECTED, ERROR, MISSING_END, UNEXPECTED, UNEXPECTED_END, WARNING, Diagnostic
+from lexer import Token, tokenize
+from profiling import Timings
+from st_ast import (
+    Assignment, BinaryOp, Call, CallStatement, CaseBranch, CaseRange, CaseStatement,
+    CompilationUnit, ControlStatement, IfStatement, Literal, LoopStatement, Name, POU,
+    Span, UnaryOp, VarBlock, VarDeclaration, format_expr, BINARY_PRECEDENCE
+)
+
+_POU_END = {'PROGRAM': 'END_PROGRAM', 'FUNCTION_BLOCK': 'END_FUNCTION_BLOCK', 'FUNCTION': 'END_FUNCTION'}
+
+# Keywords that close a statement list; error recovery never skips past them
+_BLOCK_END = frozenset({
+    'END_IF', 'ELSIF', 'ELSE', 'END_CASE', 'END_FOR', 'END_WHILE', 'UNTIL', 'END_REPEAT',
+    'END_PROGRAM', 'END_FUNCTION_BLOCK', 'END_FUNCTION', 'PROGRAM', 'FUNCTION_BLOCK',
+    'FUNCTION', 'TYPE', 'VAR_GLOBAL'
+})
+
+_LITERAL_KINDS = frozenset({'NUMBER', 'LITERAL', 'STRING'})
+
+
+class STParser:
+    """Recursive-descent parser producing a typed AST in one pass over the tokens
+
+    Tokens are pulled from any iterable through a small lookahead buffer, so
+    the token stream is never materialized as a whole.
+
+    A construct that cannot be parsed records why with _fail() and returns
+    None, and every caller hands the None straight up to the enclosing
+    statement or declaration list. That list reports the failure and skips
+    to the next statement, so a file with thousands of errors costs no more
+    than a clean one: no exception is raised and unwound per error.
+    """
+
+    def __init__(self, tokens: Iterable[Token], timings: Optional[Timings] = None):
+        self._tokens = iter(tokens)
+        self.timings = timings  # Per-construct parse times, see profiling.Timings
+        self._lookahead = deque()
+        self.last = None
+        self.errors: List[Diagnostic] = []
+        self.warnings: List[Diagnostic] = []
+        self._failure = None  # (code, message, token) of the construct that just failed
+
+    # Token helpers
+
+    def _peek(self, offset: int = 0) -> Optional[Token]:
+        lookahead = self._lookahead
+        while len(lookahead) <= offset:
+            token = next(self._tokens, None)
+            if token is None:
+                return None
+            lookahead.append(token)
+        return lookahead[offset]
+
+    def _word(self, offset: int = 0) -> Optional[str]:
+        token = self._peek(offset)
+        return token.value.upper() if token is not None and token.kind == 'KEYWORD' else None
+
+    def _is_op(self, value: str, offset: int = 0) -> bool:
+        token = self._peek(offset)
+        return token is not None and token.kind == 'OP' and token.value == value
+
+    def _advance(self) -> Token:
+        if not self._lookahead:
+            self._peek()
+        token = self._lookahead.popleft()
+        self.last = token
+        return token
+
+    def _expect_op(self, value: str) -> Optional[Token]:
+        if not self._is_op(value):
+            return self._fail(EXPECTED, f"Expected '{value}'", self._peek())
+        return self._advance()
+
+    def _expect_keyword(self, word: str) -> Optional[Token]:
+        if self._word() != word:
+            return self._fail(EXPECTED, f"Expected {word}", self._peek())
+        return self._advance()
+
+    def _span(self, start: Token) -> Span:
+        end = self.last or start
+        return Span(start.line, start.col, end.line, end.col + len(end.value))
+
+    # Diagnostics
+
+    def _fail(self, code: str, message: str, token: Optional[Token]) -> None:
+        """Record why the current construct failed; returns None for the caller to return"""
+        self._failure = (code, message, token)
+        return None
+
+    def _report_failure(self, start: Token):
+        """Report the recorded failure, at ``start`` when it happened at the end of input"""
+        code, message, token = self._failure
+        self._failure = None
+        self._error(code, message, token or start)
+
+    def _error(self, code: str, message: str, token: Optional[Token]):
+        span = _token_span(token) if token is not None else None
+        self.errors.append(Diagnostic(ERROR, code, message, span, token.value if token is not None else ''))
+
+    def _warn(self, message: str, start: Token):
+        self.warnings.append(Diagnostic(WARNING, MISSING_END, message, _token_span(start)))
+
+    def _synchronize(self):
+        """Skip to the end of the broken statement"""
+        while self._peek() is not None:
+            if self._is_op(';'):
+                self._advance()
+                return
+            if self._word() in _BLOCK_END:
+                return
+            self._advance()
+
+    # Program structure
+
+    def parse(self) -> CompilationUnit:
+        var_blocks = []
+        pous = []
+        loose = []
+
+        while self._peek() is not None:
+            word = self._word()
+            if word in _POU_END:
+                pous.append(self._parse_pou())
+            elif word == 'TYPE':
+                self._skip_section('END_TYPE')
+            elif word is not None and word.startswith('VAR'):
+                var_blocks.append(self._parse_var_block())
+            elif self._is_op(';'):
+                self._advance()
+            elif word in _BLOCK_END:
+                token = self._advance()
+                self._error(UNEXPECTED, f"Unexpected {word}", token)
+            else:
+                start = self._peek()
+                statement = self._parse_statement()
+                if statement is None:
+                    self._report_failure(start)
+                    self._synchronize()
+                else:
+                    loose.append(statement)
+
+        if loose:
+            first = loose[0].span
+            pous.append(POU('PROGRAM', '', [], loose, first))
+
+        return CompilationUnit(var_blocks, pous)
+
+    def _skip_section(self, end_word: str):
+        start = self._advance()
+        while self._peek() is not None and self._word() != end_word:
+            self._advance()
+        if self._peek() is None:
+            self._warn(f"Missing {end_word} for {start.value.upper()}", start)
+        else:
+            self._advance()
+            self._skip_semicolons()
+
+    def _skip_semicolons(self):
+        while self._is_op(';'):
+            self._advance()
+
+    def _parse_pou(self) -> POU:
+        start = self._advance()
+        kind = start.value.upper()
+        name = ''
+        if self._peek() is not None and self._peek().kind == 'IDENT':
+            name = self._advance().value
+        if kind == 'FUNCTION' and self._is_op(':'):
+            self._advance()
+            self._parse_type_text()
+
+        var_blocks = []
+        while (self._word() or '').startswith('VAR'):
+            var_blocks.append(self._parse_var_block())
+
+        body = self._parse_statements(frozenset({_POU_END[kind]}))
+
+        if self._word() == _POU_END[kind]:
+            self._advance()
+            self._skip_semicolons()
+        else:
+            self._warn(f"Missing {_POU_END[kind]} for {kind} {name}".rstrip(), start)
+        return POU(kind, name, var_blocks, body, self._span(start))
+
+    def _parse_var_block(self) -> VarBlock:
+        start = self._advance()
+        kind = start.value.upper()
+        while self._word() in ('CONSTANT', 'RETAIN'):
+            self._advance()
+
+        declarations = []
+        while self._peek() is not None and self._word() != 'END_VAR':
+            decl_start = self._peek()
+            declaration = self._parse_var_declaration()
+            if declaration is None:
+                self._report_failure(decl_start)
+                self._synchronize_declaration()
+            else:
+                declarations.append(declaration)
+
+        if self._peek() is None:
+            self._warn(f"Missing END_VAR for {kind}", start)
+        else:
+            self._advance()
+            self._skip_semicolons()
+        return VarBlock(kind, declarations, self._span(start))
+
+    def _synchronize_declaration(self):
+        while self._peek() is not None and self._word() != 'END_VAR':
+            if self._advance().value == ';':
+                return
+
+    def _parse_var_declaration(self) -> Optional[VarDeclaration]:
+        start = self._peek()
+        names = []
+        while True:
+            token = self._expect_ident()
+            if token is None:
+                return None
+            names.append(token.value)
+            if not self._is_op(','):
+                break
+            self._advance()
+
+        address = None
+        if self._word() == 'AT':
+            self._advance()
+            token = self._peek()
+            if token is None or token.kind != 'ADDRESS':
+                return self._fail(EXPECTED, "Expected direct address after AT", token)
+            address = self._advance().value
+
+        if self._expect_op(':') is None:
+            return None
+        data_type = self._parse_type_text()
+        if data_type is None:
+            return None
+
+        initial = None
+        if self._is_op(':='):
+            self._advance()
+            if self._is_op('[') or self._is_op('('):
+                # Array and structure initializers are not needed for device mapping
+                self._skip_balanced()
+            else:
+                initial = self._parse_expression()
+                if initial is None:
+                    return None
+
+        if self._expect_op(';') is None:
+            return None
+        return VarDeclaration(names, data_type, address, initial, self._span(start))
+
+    def _expect_ident(self) -> Optional[Token]:
+        token = self._peek()
+        if token is None or token.kind != 'IDENT':
+            return self._fail(EXPECTED, "Expected identifier", token)
+        return self._advance()
+
+    def _parse_type_text(self) -> Optional[str]:
+        """Collect a type spec such as ``INT``, ``STRING(20)`` or ``ARRAY[1..5] OF BOOL``"""
+        parts = []
+        depth = 0
+        while self._peek() is not None:
+            token = self._peek()
+            if depth == 0 and token.kind == 'OP' and token.value in (';', ':='):
+                break
+            if token.kind == 'KEYWORD' and token.value.upper() == 'END_VAR':
+                break
+            if token.value in ('(', '['):
+                depth += 1
+            elif token.value in (')', ']'):
+                depth -= 1
+            if parts and token.kind in ('IDENT', 'KEYWORD') and parts[-1][-1:].isalnum():
+                parts.append(' ')
+            parts.append(token.value.upper() if token.kind == 'KEYWORD' else token.value)
+            self._advance()
+        if not parts:
+            return self._fail(EXPECTED, "Expected type name", self._peek())
+        return ''.join(parts)
+
+    def _skip_balanced(self):
+        depth = 0
+        while self._peek() is not None:
+            value = self._peek().value
+            if value in ('(', '['):
+                depth += 1
+            elif value in (')', ']'):
+                depth -= 1
+                if depth == 0:
+                    self._advance()
+                    return
+            self._advance()
+
+    # Statements
+
+    def _parse_statements(self, stops: frozenset, case_labels: bool = False) -> list:
+        statements = []
+        while self._peek() is not None:
+            word = self._word()
+            if word in stops or word in _BLOCK_END:
+                break
+            if self._is_op(';'):
+                self._advance()
+                continue
+            if case_labels and self._at_case_label():
+                break
+
+            start = self._peek()
+            statement = self._parse_statement()
+            if statement is None:
+                self._report_failure(start)
+                self._synchronize()
+            else:
+                statements.append(statement)
+        return statements
+
+    def _at_case_label(self) -> bool:
+        offset = 1 if self._is_op('-') else 0
+        token = self._peek(offset)
+        if token is None or token.kind not in ('NUMBER', 'LITERAL', 'IDENT'):
+            return False
+        following = self._peek(offset + 1)
+        return following is not None and following.kind == 'OP' and following.value in (':', ',', '..')
+
+    def _parse_statement(self):
+        timings = self.timings
+        if timings is None:
+            return self._parse_construct()
+        timings.start()
+        statement = self._parse_construct()
+        timings.stop(f'parse.{type(statement).__name__}' if statement is not None else 'parse.error')
+        return statement
+
+    def _parse_construct(self):
+        word = self._word()
+        if word == 'IF':
+            return self._parse_if()
+        if word == 'CASE':
+            return self._parse_case()
+        if word in ('FOR', 'WHILE', 'REPEAT'):
+            return self._parse_loop(word)
+        if word in ('RETURN', 'EXIT'):
+            start = self._advance()
+            return ControlStatement(word, self._span(start))
+
+        start = self._peek()
+        if start.kind not in ('IDENT', 'ADDRESS'):
+            return self._fail(UNEXPECTED, "Unexpected token at start of statement", start)
+
+        target = self._parse_name()
+        if target is None:
+            return None
+        if self._is_op(':='):
+            self._advance()
+            value = self._parse_expression()
+            if value is None:
+                return None
+            statement = Assignment(target, value, self._span(start))
+        elif self._is_op('('):
+            call = self._parse_call(target.name, start)
+            if call is None:
+                return None
+            statement = CallStatement(call, self._span(start))
+        else:
+            return self._fail(EXPECTED, "Expected ':=' or '(' after name", self._peek())
+
+        if not self._is_op(';') and self._word() not in _BLOCK_END:
+            return self._fail(EXPECTED, "Expected ';'", self._peek())
+        return statement
+
+    def _parse_if(self) -> Optional[IfStatement]:
+        start = self._advance()
+        branches = []
+        while True:
+            condition = self._parse_expression()
+            if condition is None or self._expect_keyword('THEN') is None:
+                return None
+            branches.append((condition, self._parse_statements(frozenset({'ELSIF', 'ELSE', 'END_IF'}))))
+            if self._word() != 'ELSIF':
+                break
+            self._advance()
+
+        else_body = None
+        if self._word() == 'ELSE':
+            self._advance()
+            else_body = self._parse_statements(frozenset({'END_IF'}))
+
+        if self._expect_keyword('END_IF') is None:
+            return None
+        return IfStatement(branches, else_body, self._span(start))
+
+    def _parse_case(self) -> Optional[CaseStatement]:
+        start = self._advance()
+        selector = self._parse_expression()
+        if selector is None or self._expect_keyword('OF') is None:
+            return None
+
+        branches = []
+        while self._peek() is not None and self._word() not in ('ELSE', 'END_CASE'):
+            branch_start = self._peek()
+            labels = []
+            while True:
+                label = self._parse_case_label()
+                if label is None:
+                    return None
+                labels.append(label)
+                if not self._is_op(','):
+                    break
+                self._advance()
+            if self._expect_op(':') is None:
+                return None
+            body = self._parse_statements(frozenset({'ELSE', 'END_CASE'}), case_labels=True)
+            branches.append(CaseBranch(labels, body, self._span(branch_start)))
+
+        else_body = None
+        if self._word() == 'ELSE':
+            self._advance()
+            else_body = self._parse_statements(frozenset({'END_CASE'}))
+
+        if self._expect_keyword('END_CASE') is None:
+            return None
+        return CaseStatement(selector, branches, else_body, self._span(start))
+
+    def _parse_case_label(self):
+        start = self._peek()
+        low = self._parse_unary()
+        if low is None or not self._is_op('..'):
+            return low
+        self._advance()
+        high = self._parse_unary()
+        if high is None:
+            return None
+        return CaseRange(low, high, self._span(start))
+
+    def _parse_loop(self, word: str) -> Optional[LoopStatement]:
+        start = self._advance()
+        if word == 'REPEAT':
+            body = self._parse_statements(frozenset({'UNTIL'}))
+            if self._expect_keyword('UNTIL') is None or self._parse_expression() is None \
+                    or self._expect_keyword('END_REPEAT') is None:
+                return None
+        else:
+            # The loop header is not translated, only skipped up to DO
+            while self._peek() is not None and self._word() != 'DO':
+                self._advance()
+            if self._expect_keyword('DO') is None:
+                return None
+            end_word = 'END_FOR' if word == 'FOR' else 'END_WHILE'
+            body = self._parse_statements(frozenset({end_word}))
+            if self._expect_keyword(end_word) is None:
+                return None
+        return LoopStatement(word, body, self._span(start))
+
+    # Expressions
+
+    def _parse_expression(self, min_precedence: int = 1):
+        start = self._peek()
+        left = self._parse_unary()
+        if left is None:
+            return None
+        while True:
+            token = self._peek()
+            if token is None or token.kind not in ('OP', 'KEYWORD'):
+                break
+            op = token.value.upper()
+            precedence = BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence < min_precedence:
+                break
+            self._advance()
+            right = self._parse_expression(precedence + 1)
+            if right is None:
+                return None
+            left = BinaryOp('AND' if op == '&' else op, left, right, self._span(start))
+        return left
+
+    def _parse_unary(self):
+        start = self._peek()
+        if start is None:
+            return self._fail(UNEXPECTED_END, "Unexpected end of input in expression", None)
+        if self._word() == 'NOT' or self._is_op('-'):
+            op = 'NOT' if self._advance().kind == 'KEYWORD' else '-'
+            operand = self._parse_unary()
+            if operand is None:
+                return None
+            return UnaryOp(op, operand, self._span(start))
+        return self._parse_primary()
+
+    def _parse_primary(self):
+        start = self._peek()
+        if self._is_op('('):
+            self._advance()
+            expression = self._parse_expression()
+            if expression is None or self._expect_op(')') is None:
+                return None
+            return expression
+        if start.kind in _LITERAL_KINDS or self._word() in ('TRUE', 'FALSE'):
+            self._advance()
+            text = start.value.upper() if start.kind == 'KEYWORD' else start.value
+            return Literal(text, self._span(start))
+        if start.kind in ('IDENT', 'ADDRESS'):
+            name = self._parse_name()
+            if name is None:
+                return None
+            if self._is_op('('):
+                return self._parse_call(name.name, start)
+            return name
+        return self._fail(UNEXPECTED, "Unexpected token in expression", start)
+
+    def _parse_name(self) -> Optional[Name]:
+        start = self._advance()
+        parts = [start.value]
+        while True:
+            if self._is_op('.') and self._peek(1) is not None and self._peek(1).kind in ('IDENT', 'NUMBER'):
+                self._advance()
+                parts.append('.' + self._advance().value)
+            elif self._is_op('['):
+                self._advance()
+                indexes = []
+                while True:
+                    index = self._parse_expression()
+                    if index is None:
+                        return None
+                    indexes.append(format_expr(index))
+                    if not self._is_op(','):
+                        break
+                    self._advance()
+                if self._expect_op(']') is None:
+                    return None
+                parts.append('[' + ', '.join(indexes) + ']')
+            else:
+                break
+        return Name(''.join(parts), self._span(start))
+
+    def _parse_call(self, name: str, start: Token) -> Optional[Call]:
+        if self._expect_op('(') is None:
+            return None
+        args = []
+        while not self._is_op(')'):
+            param = None
+            token = self._peek()
+            following = self._peek(1)
+            if token is not None and token.kind == 'IDENT' and following is not None \
+                    and following.kind == 'OP' and following.value in (':=', '=>'):
+                param = token.value
+                self._advance()
+                self._advance()
+            value = self._parse_expression()
+            if value is None:
+                return None
+            args.append((param, value))
+            if not self._is_op(','):
+                break
+            self._advance()
+        if self._expect_op(')') is None:
+            return None
+        return Call(name, args, self._span(start))
+
+
+def _token_span(token: Token) -> Span:
+    return Span(token.line, token.col, token.line, token.col + len(token.value))
+
+
+def parse_tokens(tokens: Iterable[Token],
+                 timings: Optional[Timings] = None) -> Tuple[CompilationUnit, List[Diagnostic], List[Diagnostic]]:
+    """Parse a token stream into (ast, errors, warnings); see diagnostics.Diagnostic"""
+    parser = STParser(tokens, timings)
+    return parser.parse(), parser.errors, parser.warnings
+
+
+_ast_cache = OrderedDict()
+_AST_CACHE_SIZE = 16
+
+
+def parse_source(source: str,
+                 timings: Optional[Timings] = None) -> Tuple[CompilationUnit, List[Diagnostic], List[Diagnostic]]:
+    """Parse ST source into (ast, errors, warnings), reusing recent results
+
+    Cached trees are shared between conversions, so callers must treat
+    them as read-only. ``timings`` only sees a parse that actually ran.
+    """
+    key = hashlib.blake2b(source.encode('utf-8'), digest_size=16).digest()
+    cached = _ast_cache.get(key)
+    if cached is not None:
+        _ast_cache.move_to_end(key)
+        return cached
+
+    result = parse_tokens(tokenize(source), timings)
+
+    _ast_cache[key] = result
+    if len(_ast_cache) > _AST_CACHE_SIZE:
+        _ast_cache.popitem(last=False)
+    return result
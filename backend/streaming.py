@@ -0,0 +1,150 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from allocator import AllocationPlan, plan_for_options
+from converter import SimpleLadderConverter
+from device_rules import DeviceRules
+from diagnostics import ABORTED, aborted, fatal, is_failure, payload as diagnostics_payload
+from executor import ConversionExecutor, ExecutorSaturated, JobTimedOut
+from st_parser import parse_source
+from symbols import build_device_map
+
+
+# Rungs travel from the worker in batches of this many, or fewer when
+# the converter has been quiet for FLUSH_INTERVAL seconds
+RUNG_BATCH = 16
+FLUSH_INTERVAL = 0.05
+# A client that takes nothing for this long is dropped, so it does not
+# hold a worker until the time limit
+CLIENT_STALL = 5.0
+
+
+def produce_rungs(source_code: str, rules: Optional[DeviceRules], allocation: AllocationPlan, events, cancelled,
+                  stall_timeout: float = CLIENT_STALL) -> dict:
+    """Convert in an executor worker, handing over rung dicts as they are built
+
+    Returns the trailer fields, or ``{'aborted': reason}`` once ``cancelled``
+    is set or the client has not made room for a batch in ``stall_timeout``
+    seconds.
+    """
+    def put(item) -> Optional[str]:
+        deadline = time.perf_counter() + stall_timeout
+        while not cancelled.is_set():
+            try:
+                events.put(item, timeout=0.1)
+                return None
+            except queue.Full:
+                if time.perf_counter() >= deadline:
+                    return f"client read nothing for {stall_timeout:g}s"
+        return "client disconnected"
+
+    converter = SimpleLadderConverter(rules, allocation=allocation)
+    unit, parse_errors, parse_warnings = parse_source(source_code)
+    batch = []
+    flushed_at = time.perf_counter()
+    for rung in converter.iter_rungs(unit, parse_errors, parse_warnings):
+        batch.append(rung.to_dict())
+        if len(batch) >= RUNG_BATCH or time.perf_counter() - flushed_at >= FLUSH_INTERVAL:
+            dropped = put(batch)
+            if dropped:
+                return {'aborted': dropped}
+            batch = []
+            flushed_at = time.perf_counter()
+    dropped = put(batch) if batch else None
+    if dropped:
+        return {'aborted': dropped}
+    return {
+        'errors': converter.errors,
+        'warnings': converter.warnings,
+        'device_map': converter.symbols.device_map(),
+        'device_list': converter.device_list(),
+        'device_usage': converter.devices.usage()
+    }
+
+
+def _next_batch(events, finished: threading.Event) -> Optional[list]:
+    """The next batch of rungs, or None once the job has ended and none are left"""
+    while True:
+        try:
+            return events.get(timeout=0.1)
+        except queue.Empty:
+            # Every put happens before the job returns, so an empty queue
+            # after it ended stays empty
+            if finished.is_set():
+                return None
+
+
+async def stream_conversion(source_code: str, executor: ConversionExecutor, plc_type: str = "mitsubishi",
+                            rules: Optional[DeviceRules] = None, allocation: Optional[AllocationPlan] = None,
+                            buffered_rungs: int = 64, stall_timeout: float = CLIENT_STALL) -> AsyncIterator[tuple]:
+    """Yield ``(event, data)`` pairs: metadata, one rung each, then trailer
+
+    The conversion runs as an ``executor`` job, so it counts against the
+    queue limit and time limit like any other. A full queue raises
+    ExecutorSaturated before the metadata event, so the caller can still
+    answer 429. At most about ``buffered_rungs`` rungs wait between the
+    worker and the client, so a slow reader holds the converter back
+    instead of the whole ladder piling up in memory; one that reads
+    nothing for ``stall_timeout`` seconds is dropped and frees the worker.
+    A stream cut short by that or the time limit ends with an unsuccessful
+    trailer carrying an ``ST902`` diagnostic.
+    """
+    start_time = time.perf_counter()
+    events, cancelled = executor.channel(max(1, buffered_rungs // RUNG_BATCH))
+    finished = threading.Event()
+    job = asyncio.ensure_future(executor.run(
+        produce_rungs, source_code, rules, allocation or plan_for_options(plc_type), events, cancelled,
+        stall_timeout
+    ))
+    job.add_done_callback(lambda _: finished.set())
+    # Let the job take its queue slot; a rejection surfaces here
+    await asyncio.sleep(0)
+    if job.done() and isinstance(job.exception(), ExecutorSaturated) and job.exception().status_code == 429:
+        raise job.exception()
+
+    index = 0
+    try:
+        yield 'metadata', {'plc_type': plc_type, 'generated_at': datetime.now().isoformat()}
+
+        while True:
+            batch = await asyncio.to_thread(_next_batch, events, finished)
+            if batch is None:
+                break
+            for rung in batch:
+                yield 'rung', {'index': index, 'rung': rung}
+                index += 1
+
+        try:
+            trailer, _, _ = await job
+            errors = [aborted(trailer['aborted'])] if 'aborted' in trailer else trailer['errors']
+        except JobTimedOut as e:
+            trailer, errors = {}, [aborted(str(e))]
+        except Exception as e:
+            trailer, errors = {}, [fatal(str(e))]
+        cut_short = any(error.code == ABORTED for error in errors)
+
+        yield 'trailer', {
+            'success': not cut_short and not is_failure(index, errors),
+            'rung_count': index,
+            'device_map': trailer.get('device_map') or build_device_map({}),
+            'device_list': trailer.get('device_list', []),
+            'device_usage': trailer.get('device_usage'),
+            **diagnostics_payload(errors, trailer.get('warnings', [])),
+            'processing_time': time.perf_counter() - start_time
+        }
+    finally:
+        # Client went away or we are done: release the worker
+        cancelled.set()
+
+
+def format_ndjson(event: str, data: dict) -> bytes:
+    return json.dumps({'type': event, **data}, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def format_sse(event: str, data: dict) -> bytes:
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode('utf-8')
@@ -0,0 +1,138 @@
+from sys import intern
+from typing import Dict, List, Optional
+
+# POU kinds whose variables are private to them; PROGRAM variables share
+# the plant-wide namespace with globals, as the generated device list shows
+_PRIVATE_SCOPES = ('FUNCTION_BLOCK', 'FUNCTION')
+
+
+class Symbol:
+    """One variable bound to a device address
+
+    ``key`` is unique in the table: the plain name for globals, program
+    variables and undeclared names, ``FB.name`` for function block locals.
+    ``device_type`` is None for undeclared names, which are allocated on
+    first use and left out of the device list.
+    """
+    __slots__ = ('key', 'address', 'device_type', 'data_type')
+
+    def __init__(self, key: str, address: str, device_type: Optional[str] = None, data_type: Optional[str] = None):
+        self.key = key
+        self.address = address
+        self.device_type = device_type
+        self.data_type = data_type
+
+
+class Scope:
+    __slots__ = ('kind', 'name', 'parent', 'symbols', 'instances', 'prefix')
+
+    def __init__(self, kind: str, name: str, parent: Optional['Scope'] = None):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.symbols: Dict[str, Symbol] = {}   # declared name -> symbol
+        self.instances: Dict[str, str] = {}    # FB instance name -> FB type
+        self.prefix = f'{name}.' if kind in _PRIVATE_SCOPES and name else ''
+
+
+class SymbolTable:
+    """Nested scopes (global, then one per POU) over a single address space
+
+    Lookups walk from the POU scope out to the globals. ``inst.member``
+    resolves through the instance's FB type. Names visible in no scope fall
+    back to the shared namespace, so code that uses a program variable from
+    a function block still finds it, and otherwise become undeclared
+    globals. ``by_address`` is the reverse index.
+    """
+
+    def __init__(self):
+        self.globals = Scope('GLOBAL', '')
+        self.scopes: Dict[tuple, Scope] = {}
+        self.keys: Dict[str, Symbol] = {}       # key -> symbol, in allocation order
+        self.by_address: Dict[str, Symbol] = {}
+
+    def scope(self, kind: str, name: str) -> Scope:
+        """The scope of a POU, created on first use"""
+        scope = self.scopes.get((kind, name))
+        if scope is None:
+            scope = self.scopes[(kind, name)] = Scope(kind, name, self.globals)
+        return scope
+
+    def key(self, scope: Scope, name: str) -> str:
+        return intern(scope.prefix + name)
+
+    def add(self, symbol: Symbol) -> Symbol:
+        self.keys[symbol.key] = symbol
+        self.by_address[symbol.address] = symbol
+        return symbol
+
+    def resolve(self, scope: Optional[Scope], name: str) -> Optional[Symbol]:
+        current = scope
+        while current is not None:
+            symbol = current.symbols.get(name)
+            if symbol is not None:
+                return symbol
+            current = current.parent
+
+        head, dot, member = name.partition('.')
+        if dot:
+            current = scope
+            while current is not None:
+                fb_type = current.instances.get(head)
+                if fb_type is not None:
+                    fb_scope = self.scopes.get(('FUNCTION_BLOCK', fb_type))
+                    if fb_scope is not None and member in fb_scope.symbols:
+                        return fb_scope.symbols[member]
+                    break
+                current = current.parent
+
+        return self.keys.get(name)
+
+    def remove(self, key: str) -> Optional[Symbol]:
+        symbol = self.keys.pop(key, None)
+        if symbol is not None:
+            self.by_address.pop(symbol.address, None)
+        return symbol
+
+    def unbind(self):
+        """Drop every scope binding but keep the symbols and their addresses"""
+        for scope in (self.globals, *self.scopes.values()):
+            scope.symbols.clear()
+            scope.instances.clear()
+
+    def addresses(self) -> Dict[str, str]:
+        """key -> address for every symbol, in allocation order"""
+        return {key: symbol.address for key, symbol in self.keys.items()}
+
+    def device_list(self) -> List[dict]:
+        """Declared devices, in declaration order"""
+        return [
+            {
+                'device_address': symbol.address,
+                'variable_name': symbol.key,
+                'device_type': symbol.device_type
+            }
+            for symbol in self.keys.values() if symbol.device_type is not None
+        ]
+
+    def device_map(self) -> dict:
+        return build_device_map(self.addresses())
+
+
+def build_device_map(variable_map: dict) -> dict:
+    """Group variable_map entries by device family for the API response"""
+    device_map = {
+        'inputs': {},
+        'outputs': {},
+        'internals': {},
+        'timers': {},
+        'counters': {}
+    }
+    for var_name, device_addr in variable_map.items():
+        if device_addr.startswith('X'):
+            device_map['inputs'][device_addr] = var_name
+        elif device_addr.startswith('Y'):
+            device_map['outputs'][device_addr] = var_name
+        elif device_addr.startswith('M'):
+            device_map['internals'][device_addr] = var_name
+    return device_map
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Keep the job store main opens on import out of backend/data
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='st-ladder-test-'))
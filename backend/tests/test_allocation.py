@@ -0,0 +1,79 @@
+import pytest
+
+from allocator import DeviceAllocator, DeviceSpaceError, model_for, plan_for_options
+from batch import convert_batch
+from converter import run_conversion
+from diagnostics import CONVERSION_FAILED, DEVICE_SPACE
+
+# 300 inputs on a model with 256 X points
+SOURCE = ('VAR\n' + ''.join(f'    Sensor{i} : BOOL;\n' for i in range(300)) + '    Lamp : BOOL;\nEND_VAR\n'
+          'IF Sensor0 THEN Lamp := TRUE; END_IF;\n'
+          'IF Sensor299 THEN Lamp := FALSE; END_IF;\n')
+
+
+def test_exhausted_declarations_are_errors():
+    result = run_conversion(SOURCE, 'fx3u')
+    codes = [error.code for error in result['errors']]
+    assert codes == [DEVICE_SPACE] * 44 + [CONVERSION_FAILED]
+    assert result['errors'][0].span.line == 258
+    assert result['rung_count'] == 1
+
+
+def test_batch_merge_reports_exhaustion_per_file():
+    report = convert_batch([('a.st', SOURCE)], 'fx3u', max_workers=1)
+    entry = report['files'][0]
+    assert [d['code'] for d in entry['diagnostics']] == [DEVICE_SPACE] * 44
+    assert report['errors'][0].startswith('a.st: Cannot allocate Sensor256: No free X devices left')
+    # The rung that reads Sensor299 has no address to use and is skipped
+    assert entry['rung_count'] == 1
+    assert report['success']
+
+
+def test_addresses_follow_the_model_radix():
+    model = model_for('fx3u')
+    assert model.label == 'MELSEC-F FX3U'
+    assert model.format('X', 8) == 'X10'
+    assert model.parse('x17') == ('X', 15)
+    with pytest.raises(DeviceSpaceError, match='octal'):
+        model.parse('X8')
+    with pytest.raises(DeviceSpaceError, match='does not exist'):
+        model.parse('X400')
+    with pytest.raises(DeviceSpaceError):
+        model.device('B')
+    # Open models take families they do not list
+    assert model_for('mitsubishi').parse('ZR10') == ('ZR', 10)
+
+
+def test_first_fit_reuses_released_addresses():
+    allocator = DeviceAllocator(model_for('fx3u'))
+    assert [allocator.allocate('X') for _ in range(9)][-1] == 'X10'
+    allocator.release('X3')
+    assert allocator.allocate('X') == 'X3'
+    assert allocator.allocate('X') == 'X11'
+    with pytest.raises(DeviceSpaceError, match='already in use'):
+        allocator.claim('X3')
+
+
+def test_plan_keeps_reserved_and_pinned_addresses():
+    plan = plan_for_options('fx3u', {'device_allocation': {'reserved': ['M0-M9'], 'pinned': {'Lamp': 'Y7'}}})
+    allocator = plan.allocator()
+    assert allocator.allocate('M') == 'M10'
+    assert allocator.allocate('Y', 'Lamp') == 'Y7'
+    assert allocator.allocate('Y') == 'Y0'
+    allocator.release('M5')
+    allocator.release('Y7')
+    assert allocator.allocate('M') == 'M11'
+    usage = allocator.usage()['M']
+    assert (usage['used'], usage['reserved'], usage['points']) == (2, 10, 7680)
+    with pytest.raises(DeviceSpaceError, match='reserved'):
+        plan_for_options('fx3u', {'device_allocation': {'reserved': ['M0-M9'], 'pinned': {'a': 'M3'}}})
+
+
+def test_pinned_address_must_match_the_device_family():
+    allocator = plan_for_options('fx3u', {'device_allocation': {'pinned': {'Lamp': 'X7'}}}).allocator()
+    with pytest.raises(DeviceSpaceError, match='pinned to X7 but needs a Y device'):
+        allocator.allocate('Y', 'Lamp')
+    source = 'VAR\n    Start : BOOL;\n    Lamp : BOOL;\nEND_VAR\nIF Start THEN Lamp := TRUE; END_IF;\n'
+    result = run_conversion(source, 'fx3u', {'device_allocation': {'pinned': {'Lamp': 'X7'}}})
+    assert result['errors'][0].code == DEVICE_SPACE
+    assert 'X7' not in result['device_map']['outputs']
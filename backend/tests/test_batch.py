@@ -0,0 +1,45 @@
+import io
+import zipfile
+
+from batch import convert_batch, expand_archive, split_jobs
+
+PUMP = 'VAR\n    Start : BOOL;\n    Pump : BOOL;\nEND_VAR\nIF Start THEN Pump := TRUE; END_IF;\n'
+FAN = 'VAR\n    Start : BOOL;\n    Fan : BOOL;\nEND_VAR\nIF Start THEN Fan := TRUE; END_IF;\n'
+
+
+def addresses(entry):
+    return [element['address'] for rung in entry['ladder_data']['rungs'] for element in rung['elements']
+            if element.get('address')]
+
+
+def test_files_share_one_device_namespace():
+    report = convert_batch([('pump.st', PUMP), ('fan.st', FAN)], max_workers=2)
+    pump, fan = report['files']
+    assert report['success']
+    # Start is the same input in both files; the outputs do not collide
+    assert addresses(pump)[0] == addresses(fan)[0]
+    assert addresses(pump)[-1] != addresses(fan)[-1]
+    assert report['summary']['device_count'] == 3
+
+
+def test_result_does_not_depend_on_worker_count():
+    files = [(f'f{i}.st', PUMP.replace('Pump', f'Pump{i}')) for i in range(5)]
+    serial = convert_batch(files, max_workers=1)
+    parallel = convert_batch(files, max_workers=3)
+    assert serial['device_map'] == parallel['device_map']
+    assert [entry['ladder_data'] for entry in serial['files']] == [entry['ladder_data'] for entry in parallel['files']]
+
+
+def test_split_jobs_keeps_file_order_indexes():
+    shares = split_jobs([('a', ''), ('b', ''), ('c', '')], 2)
+    assert shares == [[(0, 'a', ''), (2, 'c', '')], [(1, 'b', '')]]
+
+
+def test_archives_expand_to_sorted_st_members():
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w') as archive:
+        archive.writestr('z.st', 'z')
+        archive.writestr('notes.md', 'skip')
+        archive.writestr('a.st', 'a')
+    assert expand_archive('project.zip', data.getvalue()) == [('project.zip/a.st', b'a'), ('project.zip/z.st', b'z')]
+    assert expand_archive('single.st', b'x') == [('single.st', b'x')]
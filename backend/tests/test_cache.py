@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from cache import ResultCache, cache_hasher, cache_key, config_fingerprint
+
+BACKEND = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_key_covers_every_input():
+    key = cache_key("x := a;", "mitsubishi", {'b': 1, 'a': 2}, "1")
+    # Option order does not matter
+    assert key == cache_key("x := a;", "mitsubishi", {'a': 2, 'b': 1}, "1")
+    assert key != cache_key("x := b;", "mitsubishi", {'a': 2, 'b': 1}, "1")
+    assert key != cache_key("x := a;", "fx3u", {'a': 2, 'b': 1}, "1")
+    assert key != cache_key("x := a;", "mitsubishi", {'a': 2}, "1")
+    assert key != cache_key("x := a;", "mitsubishi", {'a': 2, 'b': 1}, "2")
+
+
+def test_streamed_key_matches_whole_source_key():
+    hasher = cache_hasher("mitsubishi", None, "1")
+    for chunk in ("x :=", " a;"):
+        hasher.update(chunk.encode('utf-8'))
+    assert hasher.hexdigest() == cache_key("x := a;", "mitsubishi", None, "1")
+
+
+def test_lru_evicts_by_count_and_bytes():
+    cache = ResultCache(max_entries=2, max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    assert cache.get('a') == b'1234'
+    cache.put('c', b'1234')
+    # 'b' was least recently used
+    assert cache.get('b') is None
+    cache.put('d', b'12345678')
+    assert cache.stats()['bytes'] <= 10
+    assert cache.get('d') == b'12345678'
+    # Larger than the whole budget: never kept
+    cache.put('e', b'x' * 11)
+    assert cache.get('e') is None
+
+
+def test_entries_expire(monkeypatch):
+    cache = ResultCache(ttl=10)
+    cache.put('a', b'1')
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'results.db')
+    cache = ResultCache(path=path)
+    cache.put('a', b'payload')
+    cache.close()
+
+    cache = ResultCache(path=path)
+    try:
+        assert cache.get('a') == b'payload'
+        assert cache.stats()['disk_hits'] == 1
+        # Promoted to the memory tier
+        assert cache.get('a') == b'payload'
+        assert cache.stats()['disk_hits'] == 1
+    finally:
+        cache.close()
+
+
+def test_convert_sends_a_weak_etag_that_revalidates(monkeypatch):
+    monkeypatch.setattr(main, 'result_cache', ResultCache())
+    request = {'source_code': 'IF a THEN y := TRUE; END_IF;', 'plc_type': 'fx3u'}
+    with TestClient(main.app) as client:
+        first = client.post('/api/convert', json=request)
+        etag = first.headers['etag']
+        assert etag.startswith('W/"') and first.headers['x-cache'] == 'MISS'
+        assert client.post('/api/convert', json=request).headers['x-cache'] == 'HIT'
+        assert client.post('/api/convert', json=request, headers={'If-None-Match': etag}).status_code == 304
+        # A fresh run after eviction differs in its timings but keeps the ETag
+        monkeypatch.setattr(main, 'result_cache', ResultCache())
+        again = client.post('/api/convert', json=request)
+        assert (again.headers['x-cache'], again.headers['etag']) == ('MISS', etag)
+
+
+def test_fingerprint_follows_table_content():
+    assert config_fingerprint({'a': 1, 'b': [1, 2]}) == config_fingerprint({'b': [1, 2], 'a': 1})
+    assert config_fingerprint({'a': 1}) != config_fingerprint({'a': 2})
+
+
+def _cache_version(**env):
+    script = 'import main; print(main.CACHE_VERSION)'
+    return subprocess.run([sys.executable, '-c', script], cwd=BACKEND, env={**os.environ, **env},
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_site_rule_table_is_part_of_the_key(tmp_path):
+    with open(os.path.join(BACKEND, 'device_rules.json'), encoding='utf-8') as f:
+        rules = json.load(f)
+    rules['default'] = {'prefix': 'D', 'device_type': 'DATA'}
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(rules), encoding='utf-8')
+    assert _cache_version(DEVICE_RULES_PATH=str(path)) != _cache_version()
+
+
+def test_model_table_is_part_of_the_key(tmp_path):
+    with open(os.path.join(BACKEND, 'plc_models.json'), encoding='utf-8') as f:
+        models = json.load(f)
+    models['fx3u']['devices']['X']['points'] = 128
+    path = tmp_path / 'models.json'
+    path.write_text(json.dumps(models), encoding='utf-8')
+    assert _cache_version(PLC_MODELS_PATH=str(path)) != _cache_version()
@@ -0,0 +1,55 @@
+import itertools
+import json
+
+import pytest
+
+from conditions import FALSE, TRUE, ConditionCompiler, contact_count
+from converter import run_conversion
+from st_parser import parse_source
+
+
+def condition(text):
+    unit, errors, _ = parse_source(f"IF {text} THEN y := TRUE; END_IF;")
+    assert not errors
+    return unit.pous[0].body[0].branches[0][0]
+
+
+def truth(node, values):
+    kind = node[0]
+    if kind == 'const':
+        return node[1]
+    if kind == 'lit':
+        return values[node[1]] == node[2]
+    results = [truth(child, values) for child in node[1]]
+    return all(results) if kind == 'and' else any(results)
+
+
+@pytest.mark.parametrize('text, contacts', [
+    ('a AND b OR a AND c', 3),
+    ('(a OR b) AND (a OR c)', 3),
+    ('a AND NOT (b OR NOT c)', 3),
+    ('a OR a AND b', 1),
+    ('a AND b OR a AND NOT b', 1),
+    ('a XOR b', 4),
+    ('(a OR b) AND NOT (a AND b) OR c', 5),
+])
+def test_minimized_network_is_equivalent_and_smaller(text, contacts):
+    plain = ConditionCompiler(simplify=False).compile([condition(text)])
+    minimized = ConditionCompiler().compile([condition(text)])
+    assert contact_count(minimized) == contacts
+    for bits in itertools.product((False, True), repeat=3):
+        values = dict(zip('abc', bits))
+        assert truth(minimized, values) == truth(plain, values)
+
+
+def test_constants_fold():
+    compiler = ConditionCompiler()
+    assert compiler.compile([condition('a OR NOT a')]) == TRUE
+    assert compiler.compile([condition('a AND NOT a')]) == FALSE
+    assert compiler.compile([condition('a'), condition('NOT a')]) == FALSE
+
+
+def test_or_reaches_the_ladder_as_a_parallel_block():
+    result = run_conversion("IF (a OR b) AND c THEN y := TRUE; END_IF;")
+    rung = json.loads(result['rungs_json'])[0]
+    assert [element['type'] for element in rung['elements']] == ['branch', 'contact', 'contact', 'contact', 'coil']
@@ -0,0 +1,86 @@
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+
+import pytest
+
+from device_rules import DEFAULT_RULES, DeviceRules, rules_for_options
+
+BACKEND = os.path.join(os.path.dirname(__file__), '..')
+
+CONFIG = {
+    'types': {'BOOL': None, 'INT': {'prefix': 'D', 'device_type': 'data'}},
+    'name_rules': [
+        {'prefix': 'X', 'starts_with': ['In', 'X'], 'contains': ['sens', 'sensor', 'btn']},
+        {'prefix': 'Y', 'starts_with': ['Out'], 'contains': ['lamp', 'la', 'motor']},
+        {'prefix': 'L', 'pattern': r'_L\d+$'},
+    ],
+    'default': {'prefix': 'M', 'device_type': 'relay'},
+}
+
+
+def naive_match(config, name):
+    """Each rule tried on its own, in order, as the table is documented"""
+    for rule in config['name_rules']:
+        if (any(name.startswith(prefix) for prefix in rule.get('starts_with', []))
+                or any(word.lower() in name.lower() for word in rule.get('contains', []))
+                or (rule.get('pattern') and re.search(rule['pattern'], name))):
+            return rule['prefix']
+    return None
+
+
+def test_first_rule_wins_wherever_it_matches():
+    rules = DeviceRules(CONFIG)
+    # 'lamp' is further left, but the sensor rule comes first
+    assert rules.match('lampSensor') == ('X', 'X')
+    assert rules.match('OutBtn') == ('X', 'X')
+    assert rules.match('Outlet') == ('Y', 'Y')
+    # starts_with is case-sensitive, contains is not
+    assert rules.match('input') is None
+    assert rules.match('MOTOR_L2') == ('Y', 'Y')
+    assert rules.match('pump_L2') == ('L', 'L')
+
+
+def test_types_and_default():
+    rules = DeviceRules(CONFIG)
+    assert rules.classify('InA', 'INT') == ('D', 'data')
+    assert rules.classify('pump', 'bool') == ('M', 'relay')
+    assert rules.classify('InA', 'STRING') is None
+
+
+def test_compiled_table_agrees_with_rule_by_rule_matching():
+    rules = DeviceRules(CONFIG)
+    pieces = ['In', 'X', 'Out', 'sens', 'SENSOR', 'la', 'Lamp', 'mot', 'btn', '_L1', '_L', 'a', '_', '7']
+    generator = random.Random(0)
+    for _ in range(5000):
+        name = ''.join(generator.choice(pieces) for _ in range(generator.randint(1, 5)))
+        match = rules.match(name)
+        assert (match[0] if match else None) == naive_match(CONFIG, name), name
+
+
+def test_request_overrides_merge_over_the_site_table():
+    rules = rules_for_options({'device_rules': {
+        'types': {'INT': {'prefix': 'W'}}, 'name_rules': [{'prefix': 'B', 'contains': ['flag']}]
+    }})
+    assert rules.classify('myFlag') == ('B', 'B')
+    assert rules.classify('n', 'INT') == ('W', 'W')
+    # Types the request does not mention keep the site's device
+    assert rules.classify('t', 'TIME') == DEFAULT_RULES.classify('t', 'TIME')
+    assert rules_for_options({}) is DEFAULT_RULES
+
+
+def test_request_patterns_are_rejected():
+    with pytest.raises(ValueError, match='pattern'):
+        rules_for_options({'device_rules': {'name_rules': [{'prefix': 'X', 'pattern': '(a+)+$'}]}})
+
+
+def test_site_rule_file_replaces_the_defaults(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(CONFIG), encoding='utf-8')
+    script = 'from device_rules import DEFAULT_RULES as r; print(r.classify("Outlet"), r.classify("pump"))'
+    output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND, capture_output=True, text=True, check=True,
+                            env={**os.environ, 'DEVICE_RULES_PATH': str(path)}).stdout
+    assert output.split() == ["('Y',", "'Y')", "('M',", "'relay')"]
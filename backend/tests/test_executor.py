@@ -0,0 +1,129 @@
+import asyncio
+import signal
+import time
+
+import pytest
+
+import executor as executor_module
+from executor import ConversionExecutor, ExecutorSaturated
+
+
+def nap(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def nap_ignoring_alarm(seconds):
+    # Stands in for a job stuck in C code, which the in-worker alarm cannot stop
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(seconds)
+    return seconds
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_queue_time_does_not_count_against_the_limit():
+    pool = ConversionExecutor(max_workers=1, timeout=0.5)
+
+    async def main():
+        return await asyncio.gather(*(pool.run(nap, 0.3) for _ in range(3)))
+
+    try:
+        outcomes = run(main())
+    finally:
+        pool.shutdown()
+    assert [result for result, _, _ in outcomes] == [0.3] * 3
+    # The last job queued behind two others for longer than the limit
+    assert max(queue_time for _, queue_time, _ in outcomes) > 0.5
+
+
+def test_timeout_aborts_only_the_slow_job():
+    pool = ConversionExecutor(max_workers=2, timeout=0.5)
+
+    async def main():
+        return await asyncio.gather(pool.run(nap, 10), pool.run(nap, 0.2), return_exceptions=True)
+
+    try:
+        slow, fast = run(main())
+        workers = pool._pool
+        assert isinstance(slow, ExecutorSaturated) and slow.status_code == 503
+        assert fast[0] == 0.2
+        # The worker survived the timeout, so the pool was not recycled
+        assert run(pool.run(nap, 0))[0] == 0
+        assert pool._pool is workers
+        assert pool.stats()['timed_out'] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_hung_worker_is_killed_and_other_jobs_are_retried(monkeypatch):
+    monkeypatch.setattr(executor_module, 'KILL_GRACE', 0.2)
+    pool = ConversionExecutor(max_workers=2, timeout=0.5)
+
+    async def late(seconds):
+        # Still running when the hung worker is killed, about 1.4s in
+        await asyncio.sleep(1.1)
+        return await pool.run(nap, seconds)
+
+    async def main():
+        return await asyncio.gather(pool.run(nap_ignoring_alarm, 10), late(0.4), return_exceptions=True)
+
+    try:
+        hung, healthy = run(main())
+        assert isinstance(hung, ExecutorSaturated) and hung.status_code == 503
+        assert 'time limit' in str(hung)
+        # The job sharing the killed pool was resubmitted rather than failed
+        assert healthy[0] == 0.4
+    finally:
+        pool.shutdown()
+
+
+def test_full_queue_is_rejected():
+    pool = ConversionExecutor(max_workers=1, max_queue=0, timeout=5)
+
+    async def main():
+        return await asyncio.gather(pool.run(nap, 0.2), pool.run(nap, 0), return_exceptions=True)
+
+    try:
+        first, second = run(main())
+    finally:
+        pool.shutdown()
+    assert first[0] == 0.2
+    assert isinstance(second, ExecutorSaturated) and second.status_code == 429
+
+
+@pytest.fixture(autouse=True)
+def _no_leaked_alarm():
+    yield
+    signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def touch(path):
+    open(path, 'w').close()
+
+
+def test_cancelled_waiter_drops_its_queued_job(tmp_path):
+    pool = ConversionExecutor(max_workers=1, timeout=5)
+    marker = tmp_path / 'ran'
+
+    async def main():
+        busy = asyncio.ensure_future(pool.run(nap, 0.5))
+        # Once the worker takes a job, the pool fills its call queue (one job
+        # beyond its workers) and those can no longer be cancelled
+        handed_over = [asyncio.ensure_future(pool.run(nap, 0)) for _ in range(2)]
+        queued = asyncio.ensure_future(pool.run(touch, str(marker)))
+        await asyncio.sleep(0.2)
+        queued.cancel()
+        await asyncio.gather(busy, *handed_over)
+        await asyncio.sleep(0.3)
+        return queued
+
+    try:
+        queued = run(main())
+        assert queued.cancelled()
+        assert not marker.exists()
+        assert pool.stats()['pending'] == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,50 @@
+import codecs
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from converter import run_conversion
+from export import instruction_list, parse_instruction_list, read_instructions
+from ladder import rung_from_dict
+from main import app
+
+SOURCE = ("VAR\n    Start : BOOL;\n    Motor : BOOL;\nEND_VAR\n"
+          + "IF (Start OR a) AND NOT b THEN Motor := TRUE; END_IF;\n" * 40)
+
+client = TestClient(app)
+
+
+def export(**params):
+    return client.post('/api/export', params=params, json={'source_code': SOURCE})
+
+
+def test_instruction_list_reads_back_to_the_same_program():
+    rungs = [rung_from_dict(rung) for rung in json.loads(run_conversion(SOURCE)['rungs_json'])]
+    text = ''.join(instruction_list(rungs))
+    assert text.rstrip().endswith('END')
+    read = list(read_instructions(parse_instruction_list(text.splitlines())))
+    # Comments are not part of the list, so compare the instructions
+    assert len(read) == 40
+    assert ''.join(instruction_list(read)) == text
+
+
+def test_default_export_is_shift_jis():
+    response = export(format='comments')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'text/csv; charset=Shift_JIS'
+    assert '"X0","Start"' in response.content.decode('cp932')
+
+
+@pytest.mark.parametrize('encoding, bom', [('utf-16', codecs.BOM_UTF16), ('utf-8-sig', codecs.BOM_UTF8)])
+def test_byte_order_mark_is_written_once(encoding, bom):
+    response = export(encoding=encoding)
+    assert response.status_code == 200
+    assert response.content.startswith(bom)
+    assert response.content.count(bom) == 1
+    assert response.content.decode(encoding).rstrip().endswith('END')
+
+
+@pytest.mark.parametrize('encoding', ['rot13', 'base64', 'no-such-codec'])
+def test_non_text_encodings_are_rejected(encoding):
+    assert export(encoding=encoding).status_code == 400
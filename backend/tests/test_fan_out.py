@@ -0,0 +1,58 @@
+import itertools
+import json
+
+import numpy as np
+import pytest
+
+from converter import run_conversion
+from ladder import rung_from_dict
+from simulator import LadderSimulator, Rows
+
+SOURCE = ("IF (a OR b) AND c AND NOT d THEN x := TRUE; y := TRUE; IF e THEN z := TRUE; w := TRUE; END_IF; END_IF;\n"
+          "IF a AND b AND c THEN p := TRUE; q := TRUE; r := TRUE; END_IF;\n")
+INPUTS = 'abcde'
+OUTPUTS = 'xyzwpqr'
+
+
+def addresses(result):
+    return {name: address for family in result['device_map'].values() for address, name in family.items()}
+
+
+def outputs(fan_out):
+    """Every output for all 32 input combinations, one scan each"""
+    result = run_conversion(SOURCE, options={'fan_out': fan_out} if fan_out else None)
+    devices = addresses(result)
+    rows = Rows()
+    simulator = LadderSimulator([rung_from_dict(rung) for rung in json.loads(result['rungs_json'])], rows)
+    state = np.zeros((len(rows), 1), dtype=np.uint64)
+    for vector, bits in enumerate(itertools.product((0, 1), repeat=len(INPUTS))):
+        for name, bit in zip(INPUTS, bits):
+            state[rows(devices[name])] |= np.uint64(bit << vector)
+    simulator.scan(state)
+    return {name: int(state[rows(devices[name])][0]) for name in OUTPUTS}, result
+
+
+@pytest.mark.parametrize('fan_out', ['relay', 'coils'])
+def test_fan_out_keeps_the_logic(fan_out):
+    expected, plain = outputs(None)
+    actual, result = outputs(fan_out)
+    assert actual == expected
+    assert any(expected.values())
+    if fan_out == 'coils':
+        assert result['rung_count'] < plain['rung_count']
+
+
+def test_relays_get_their_own_devices():
+    _, result = outputs('relay')
+    devices = addresses(result)
+    assert {'_COND0', '_COND1'} <= set(devices)
+    # One address per name: no relay shares a device with a variable or another relay
+    assert len(set(devices.values())) == len(devices)
+
+
+def test_relay_names_skip_declared_variables():
+    source = 'VAR\n    _COND0 : BOOL;\nEND_VAR\n' + SOURCE
+    result = run_conversion(source, options={'fan_out': 'relay'})
+    devices = addresses(result)
+    assert {'_COND0', '_COND1', '_COND2'} <= set(devices)
+    assert len(set(devices.values())) == len(devices)
@@ -0,0 +1,129 @@
+import json
+import time
+
+import converter
+import jobs
+from jobs import JobQueue, JobStore, run_job
+
+SOURCE = 'IF a THEN y := TRUE; END_IF;\n' * 20
+
+
+def wait_finished(store, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while store.get(job_id)['status'] not in jobs.FINISHED:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    return store.get(job_id)
+
+
+def test_run_job_stores_the_convert_response(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    store = JobStore(path)
+    job_id = store.submit(SOURCE, 'fx3u', {'fan_out': 'coils'})
+    assert store.get(job_id)['status'] == 'queued'
+    assert run_job(path, job_id) == 'done'
+    job = store.get(job_id)
+    assert (job['status'], job['success'], job['progress']['rungs']) == ('done', True, 20)
+    assert job['result_url'] == f'/api/jobs/{job_id}/result'
+    assert len(json.loads(store.result(job_id))['ladder_data']['rungs']) == 20
+    # A job only runs once
+    assert run_job(path, job_id) == 'cancelled'
+
+
+def test_cancelled_job_is_never_marked_done(tmp_path, monkeypatch):
+    path = str(tmp_path / 'jobs.db')
+    store = JobStore(path)
+    job_id = store.submit(SOURCE, 'mitsubishi', None)
+    monkeypatch.setattr(jobs, 'PROGRESS_INTERVAL', 0)
+    claim = JobStore.claim
+
+    def claim_then_cancel(self, job_id):
+        claimed = claim(self, job_id)
+        store.cancel(job_id)
+        return claimed
+    monkeypatch.setattr(JobStore, 'claim', claim_then_cancel)
+    assert run_job(path, job_id) == 'cancelled'
+    assert store.get(job_id)['status'] == 'cancelled'
+    assert store.result(job_id) is None
+    assert not store.cancel(job_id)
+
+
+def test_recover_requeues_running_jobs_and_cleanup_drops_old_ones(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    first = store.submit(SOURCE, 'mitsubishi', None)
+    second = store.submit(SOURCE, 'mitsubishi', None)
+    store.claim(first)
+    store.progress(first, 5)
+    finished = store.submit(SOURCE, 'mitsubishi', None)
+    store.cancel(finished)
+    assert store.recover() == [first, second]
+    assert store.get(first)['progress']['rungs'] == 0
+    assert store.cleanup(ttl=-1) == 1
+    assert store.get(finished) is None
+    assert store.stats()['queued'] == 2
+
+
+def test_queue_finishes_jobs_left_by_a_previous_process(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    # A job the last process was converting when it stopped
+    left = JobStore(path)
+    job_id = left.submit(SOURCE, 'mitsubishi', None)
+    left.claim(job_id)
+    left.close()
+
+    queue = JobQueue(path, max_workers=1)
+    try:
+        queue.start()
+        submitted = queue.submit(SOURCE)
+        assert wait_finished(queue.store, job_id)['status'] == 'done'
+        assert wait_finished(queue.store, submitted)['status'] == 'done'
+        assert queue.stats()['done'] == 2
+    finally:
+        queue.shutdown()
+
+
+def test_cancel_stops_a_job_while_it_parses(tmp_path, monkeypatch):
+    path = str(tmp_path / 'jobs.db')
+    store = JobStore(path)
+    job_id = store.submit(SOURCE, 'mitsubishi', None)
+    monkeypatch.setattr(jobs, 'PROGRESS_INTERVAL', 0)
+    monkeypatch.setattr(converter, 'PARSE_PROGRESS_TOKENS', 16)
+    tokenize = converter.tokenize
+
+    def tokenize_then_cancel(source):
+        for count, token in enumerate(tokenize(source)):
+            if count == 20:
+                store.cancel(job_id)
+            yield token
+
+    def convert(*args):
+        raise AssertionError('the cancelled job went on to convert')
+    monkeypatch.setattr(converter, 'tokenize', tokenize_then_cancel)
+    monkeypatch.setattr(converter, 'run_ast_conversion', convert)
+    assert run_job(path, job_id) == 'cancelled'
+    assert store.get(job_id)['status'] == 'cancelled'
+
+
+def test_cancelled_queued_job_leaves_the_queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), max_workers=1)
+    try:
+        running, queued = queue.submit(SOURCE), queue.submit(SOURCE)
+        assert queue.cancel(queued)
+        assert queued not in queue._futures
+        assert not queue.cancel(queued)
+        assert wait_finished(queue.store, running)['status'] == 'done'
+        assert queue.store.get(queued)['status'] == 'cancelled'
+        assert queue.store.result(queued) is None
+    finally:
+        queue.shutdown()
+
+
+def test_store_defaults_to_the_data_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv('JOB_STORE_PATH', raising=False)
+    monkeypatch.setenv('DATA_DIR', str(tmp_path / 'data'))
+    queue = JobQueue.from_env()
+    try:
+        assert queue.store.path == str(tmp_path / 'data' / 'st-ladder-jobs.sqlite3')
+        assert (tmp_path / 'data' / 'st-ladder-jobs.sqlite3').exists()
+    finally:
+        queue.shutdown()
@@ -0,0 +1,58 @@
+import json
+
+from converter import run_conversion
+from layout import BRANCH_SPACING, ELEMENT_SPACING, ELEMENT_X, ELEMENT_Y, MAX_COLUMNS, layout
+from ladder import Rung, rung_from_dict, rungs_to_json
+
+
+def nested_rung():
+    inner = (None, (('X0', 'a', True), ('X1', 'b', True)), None)
+    return Rung((None, (inner + ('X2', 'c', False), ('X3', 'd', True)), None), 'Y0', 'out', ('Y1', 'also'))
+
+
+def test_positions_follow_the_grid():
+    elements = nested_rung().to_dict()['elements']
+    assert [(element['type'], element['x'], element['y']) for element in elements] == [
+        ('branch', ELEMENT_X, ELEMENT_Y),
+        ('branch', ELEMENT_X, ELEMENT_Y),
+        ('contact', ELEMENT_X, ELEMENT_Y),
+        ('contact', ELEMENT_X, ELEMENT_Y + BRANCH_SPACING),
+        ('contact', ELEMENT_X + ELEMENT_SPACING, ELEMENT_Y),
+        ('contact', ELEMENT_X, ELEMENT_Y + 2 * BRANCH_SPACING),
+        # Coils after the widest branch, stacked
+        ('coil', ELEMENT_X + 2 * ELEMENT_SPACING, ELEMENT_Y),
+        ('coil', ELEMENT_X + 2 * ELEMENT_SPACING, ELEMENT_Y + BRANCH_SPACING),
+    ]
+    assert elements[0]['width'] == 2 * ELEMENT_SPACING and elements[0]['height'] == 3 * BRANCH_SPACING
+    assert elements[1]['width'] == ELEMENT_SPACING and elements[1]['height'] == 2 * BRANCH_SPACING
+
+
+def test_long_rungs_wrap():
+    contacts = tuple(item for i in range(MAX_COLUMNS + 2) for item in (f'X{i}', f'c{i}', True))
+    elements = Rung(contacts, 'Y0', 'out').to_dict()['elements']
+    wrap = elements[MAX_COLUMNS]
+    assert wrap == {'type': 'wrap', 'x': ELEMENT_X + MAX_COLUMNS * ELEMENT_SPACING, 'y': ELEMENT_Y,
+                    'to_y': ELEMENT_Y + BRANCH_SPACING}
+    assert elements[MAX_COLUMNS + 1]['x'] == ELEMENT_X
+    assert layout(MAX_COLUMNS + 2).rows == 2
+
+
+def test_layouts_are_shared_by_shape():
+    first = Rung(('X0', 'a', True), 'Y0', 'one')
+    second = Rung(('X9', 'z', False), 'Y9', 'two')
+    assert layout(1) is layout(1)
+    assert [(e['x'], e['y']) for e in first.to_dict()['elements']] == \
+        [(e['x'], e['y']) for e in second.to_dict()['elements']]
+
+
+def test_dict_round_trip_and_json_match():
+    rung = nested_rung()
+    assert rung_from_dict(rung.to_dict()) == rung
+    assert json.loads(rungs_to_json([rung])) == [rung.to_dict()]
+
+
+def test_converted_rungs_round_trip():
+    result = run_conversion("IF (a OR b AND c) AND NOT d THEN y := TRUE; z := TRUE; END_IF;",
+                            options={'fan_out': 'coils'})
+    for rung in json.loads(result['rungs_json']):
+        assert rung_from_dict(rung).to_dict() == rung
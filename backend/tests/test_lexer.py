@@ -0,0 +1,73 @@
+import os
+import re
+
+import pytest
+
+from lexer import Token, tokenize
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def kinds(source):
+    return [(token.kind, token.value) for token in tokenize(source)]
+
+
+def test_token_kinds():
+    assert kinds("IF x1 >= 16#FF THEN %QX0.1 := T#2s500ms; Motor.Run := 'a''b'; END_if") == [
+        ('KEYWORD', 'IF'), ('IDENT', 'x1'), ('OP', '>='), ('NUMBER', '16#FF'), ('KEYWORD', 'THEN'),
+        ('ADDRESS', '%QX0.1'), ('OP', ':='), ('LITERAL', 'T#2s500ms'), ('OP', ';'),
+        ('IDENT', 'Motor'), ('OP', '.'), ('IDENT', 'Run'), ('OP', ':='), ('STRING', "'a'"), ('STRING', "'b'"),
+        ('OP', ';'), ('KEYWORD', 'END_if'),
+    ]
+
+
+def test_time_and_numeric_literals():
+    assert kinds("T#1h2m3s TIME#10ms 1.5e3 2#1010_0101 1_000") == [
+        ('LITERAL', 'T#1h2m3s'), ('LITERAL', 'TIME#10ms'), ('NUMBER', '1.5e3'), ('NUMBER', '2#1010_0101'),
+        ('NUMBER', '1_000'),
+    ]
+
+
+def test_string_literals_keep_their_contents():
+    assert kinds("s := '(* not a comment *) // $' 日本語';") == [
+        ('IDENT', 's'), ('OP', ':='), ('STRING', "'(* not a comment *) // $' 日本語'"), ('OP', ';'),
+    ]
+
+
+def test_positions_survive_comments_spanning_lines():
+    source = "a := 1; (* one\ntwo\n  three *) b := 2;\n// line\n  c := 3; ;終わり x\nd"
+    assert [(token.value, token.line, token.col) for token in tokenize(source) if token.kind == 'IDENT'] == [
+        ('a', 1, 1), ('b', 3, 12), ('c', 5, 3), ('d', 6, 1),
+    ]
+
+
+def test_positions_are_offset_for_a_cut_out_section():
+    assert list(tokenize("x\n y", line=10, column=5)) == [Token('IDENT', 'x', 10, 5), Token('IDENT', 'y', 11, 2)]
+
+
+def test_unterminated_block_comment_runs_to_the_end():
+    assert kinds("a (* never closed\nb := 1;") == [('IDENT', 'a')]
+
+
+@pytest.mark.parametrize('char', ['?', '@', '!', '$', '`'])
+def test_illegal_characters_are_error_tokens(char):
+    tokens = list(tokenize(f"x := {char}y;"))
+    assert tokens[2] == Token('ERROR', char, 1, 6)
+    assert tokens[3].value == 'y'
+
+
+def legacy_tokens(source):
+    """Comment stripping of the former _preprocess_code regex cascade, then a plain split"""
+    cleaned = re.sub(r'\(\*.*?\*\)', '', source, flags=re.DOTALL)
+    cleaned = re.sub(r'//.*$', '', cleaned, flags=re.MULTILINE)
+    cleaned = re.sub(r';[^\x00-\x7F].*$', ';', cleaned, flags=re.MULTILINE)
+    cleaned = re.sub(r'[^\x00-\x7F]+', ' ', cleaned)
+    return re.findall(r":=|=>|<=|>=|<>|\*\*|\.\.|%\w+(?:\.\d+)*|[A-Za-z_]\w*#[\w.:+-]+|\d+(?:\.\d+)?|\w+|\S",
+                      cleaned)
+
+
+@pytest.mark.parametrize('name', ['sample_warehouse.st', 'sample-test.st'])
+def test_samples_match_the_previous_preprocessing(name):
+    with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+        source = f.read()
+    assert [token.value for token in tokenize(source)] == legacy_tokens(source)
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from benchmarks.corpus import generate_project
+from converter import run_conversion
+from executor import ExecutorSaturated
+from main import _gather_jobs
+from parallel import collect, convert_parallel, convert_sections, merge_sections, share_sections, split_sections
+
+SOURCE = generate_project(6, stations_per_block=4)
+
+
+def same_output(parallel, serial):
+    assert parallel['rungs_json'] == serial['rungs_json']
+    assert parallel['device_map'] == serial['device_map']
+    assert parallel['device_list'] == serial['device_list']
+    assert [str(error) for error in parallel['errors']] == [str(error) for error in serial['errors']]
+    assert [str(warning) for warning in parallel['warnings']] == [str(warning) for warning in serial['warnings']]
+
+
+@pytest.mark.parametrize('jobs', [2, 3, 7])
+def test_merged_sections_match_a_serial_run(jobs):
+    sections = split_sections(SOURCE)
+    assert len(sections) > jobs
+    shares = share_sections(SOURCE, sections, jobs)
+    results = collect([convert_sections(share) for share in shares])
+    same_output(merge_sections(results, 'fx5u'), run_conversion(SOURCE, 'fx5u'))
+
+
+def test_worker_processes_match_a_serial_run():
+    same_output(convert_parallel(SOURCE, max_workers=2), run_conversion(SOURCE))
+
+
+def test_one_rejected_share_cancels_the_rest():
+    async def rejected():
+        await asyncio.sleep(0.01)
+        raise ExecutorSaturated("full", status_code=429, retry_after=1)
+
+    async def main():
+        slow = asyncio.ensure_future(asyncio.sleep(10))
+        with pytest.raises(ExecutorSaturated):
+            await _gather_jobs([slow, rejected()])
+        await asyncio.sleep(0)
+        return slow
+
+    assert asyncio.run(main()).cancelled()
@@ -0,0 +1,41 @@
+import gzip
+import json
+
+import msgpack
+
+from converter import run_conversion
+from response_formats import (
+    JSON_TYPE, MSGPACK_TYPE, compact_payload, conversion_payload, encode_response, expand_payload, negotiate
+)
+
+
+def payload():
+    result = run_conversion("IF (a OR b) AND NOT c THEN y := TRUE; END_IF;\n"
+                            + 'IF d THEN z := TRUE; END_IF;\n' * 3)
+    return conversion_payload(result, 0.01)[1]
+
+
+def test_compact_form_expands_back():
+    data = json.loads(payload())
+    compact = compact_payload(data)
+    # Repeated device strings are sent once
+    assert len(compact['strings']) == len(set(compact['strings']))
+    assert expand_payload(compact) == data
+    assert expand_payload(msgpack.unpackb(msgpack.packb(compact))) == data
+
+
+def test_encoded_variants_decode_to_the_same_response():
+    body = payload()
+    assert gzip.decompress(encode_response(body, JSON_TYPE, 'gzip')) == body
+    # gzip output is stable, so its ETag is too
+    assert encode_response(body, JSON_TYPE, 'gzip') == encode_response(body, JSON_TYPE, 'gzip')
+    packed = encode_response(body, MSGPACK_TYPE, None)
+    assert len(packed) < len(body)
+    assert expand_payload(msgpack.unpackb(packed)) == json.loads(body)
+
+
+def test_negotiation():
+    assert negotiate(None, None) == (JSON_TYPE, None)
+    assert negotiate('application/msgpack', 'gzip') == (MSGPACK_TYPE, 'gzip')
+    assert negotiate('application/json, application/msgpack;q=0.5', None)[0] == JSON_TYPE
+    assert negotiate('text/html', 'gzip;q=0, identity')[1] is None
@@ -0,0 +1,84 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from converter import run_conversion
+from diagnostics import DEVICE_SPACE, payload
+from incremental import IncrementalSession, VersionConflict
+from main import app
+from test_allocation import SOURCE as CROWDED
+
+SOURCE = '''VAR
+    Start : BOOL;
+    Motor : BOOL;
+END_VAR
+PROGRAM Main
+IF Start THEN Motor := TRUE; END_IF;
+END_PROGRAM
+FUNCTION_BLOCK Pump
+IF Start THEN Motor := FALSE; END_IF;
+END_FUNCTION_BLOCK
+'''
+
+client = TestClient(app)
+
+
+def test_update_reconverts_only_the_changed_pou():
+    session = IncrementalSession()
+    first = session.update(SOURCE)
+    assert first['version'] == 1
+    assert len(first['added']) == 2
+
+    delta = session.update(SOURCE.replace('Motor := FALSE', 'Motor := TRUE'))
+    assert [entry['section'] for entry in delta['changed']] == ['FUNCTION_BLOCK:Pump']
+    assert delta['added'] == [] and delta['removed'] == []
+    # Addresses of unchanged declarations are kept
+    assert delta['device_updates'] == {}
+
+
+def test_edits_must_match_the_session_version():
+    session = IncrementalSession()
+    session.update(SOURCE)
+    offset = SOURCE.index('FALSE')
+    edit = {'offset': offset, 'length': 5, 'text': 'TRUE'}
+
+    session.update(edits=[edit], base_version=1)
+    assert 'Motor := TRUE; END_IF;\nEND_FUNCTION_BLOCK' in session.source
+    # The same edit against the version it was made on no longer applies
+    with pytest.raises(VersionConflict) as conflict:
+        session.update(edits=[edit], base_version=1)
+    assert conflict.value.version == 2
+    assert session.version == 2
+
+
+def test_patch_endpoint_reports_conflicts():
+    created = client.post('/api/sessions', json={'source_code': SOURCE}).json()
+    session_url = f"/api/sessions/{created['session_id']}"
+    edit = {'offset': SOURCE.index('FALSE'), 'length': 5, 'text': 'TRUE'}
+
+    response = client.patch(session_url, json={'edits': [edit]})
+    assert response.status_code == 400
+
+    response = client.patch(session_url, json={'edits': [edit], 'base_version': created['version']})
+    assert response.status_code == 200
+    assert response.json()['version'] == created['version'] + 1
+
+    response = client.patch(session_url, json={'edits': [edit], 'base_version': created['version']})
+    assert response.status_code == 409
+    assert response.json()['detail']['version'] == created['version'] + 1
+
+    response = client.patch(session_url, json={'edits': [{'offset': 10 ** 6, 'text': 'x'}],
+                                               'base_version': created['version'] + 1})
+    assert response.status_code == 400
+
+
+def test_declaration_diagnostics_match_a_full_conversion():
+    full = run_conversion(CROWDED, 'fx3u')
+    expected = payload(full['errors'], full['warnings'])['diagnostics']
+    session = IncrementalSession('fx3u')
+    assert session.update(CROWDED)['diagnostics'] == expected
+    # Reconverting one POU keeps the declarations' ST204s
+    edited = session.update(CROWDED.replace('Lamp := FALSE', 'Lamp := TRUE'))
+    assert [d['code'] for d in edited['diagnostics']].count(DEVICE_SPACE) == 44
+    # and they follow the declarations when code above them moves
+    moved = session.update('\n' + CROWDED.replace('Lamp := FALSE', 'Lamp := TRUE'))
+    assert moved['diagnostics'][0]['line'] == expected[0]['line'] + 1
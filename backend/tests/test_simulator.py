@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+from ladder import Rung
+from simulator import LadderSimulator, Rows, differential_test
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+# Assignments all become OUT coils of their branch condition; README, "既知の不一致"
+OUT_ONLY = 'converter emits OUT where ST needs RST, SET or the assigned expression'
+
+
+def test_rungs_evaluate_bitwise_with_out_semantics():
+    rows = Rows()
+    # Y0 := (X0 OR X1) AND NOT X2;  Y1 := Y0
+    rungs = [
+        Rung((None, (('X0', 'a', True), ('X1', 'b', True)), None, 'X2', 'c', False), 'Y0', 'y0'),
+        Rung(('Y0', 'y0', True), 'Y1', 'y1'),
+    ]
+    simulator = LadderSimulator(rungs, rows)
+    state = np.zeros((len(rows), 1), dtype=np.uint64)
+    # One vector per bit: all eight input combinations at once
+    state[rows('X0')] = 0b10101010
+    state[rows('X1')] = 0b11001100
+    state[rows('X2')] = 0b11110000
+    simulator.scan(state)
+    assert int(state[rows('Y0')][0]) == 0b00001110
+    # A later rung sees the earlier rung's result in the same scan
+    assert int(state[rows('Y1')][0]) == 0b00001110
+
+
+def test_differences_come_back_as_a_counterexample():
+    # The converter writes the assignment as an unconditional coil
+    report = differential_test("y := a AND NOT b;\n", vectors=64, scans=2)
+    assert not report['equivalent']
+    assert report['compared']
+    mismatch = report['mismatch']
+    inputs = mismatch['inputs'][-1]
+    assert mismatch['outputs']['y'] == {'ladder': True, 'st': inputs['a'] and not inputs['b']}
+
+
+@pytest.mark.parametrize('fan_out', [None, 'relay', 'coils'])
+def test_branch_outputs_match_for_one_scan(fan_out):
+    source = ("IF a AND b THEN y := TRUE; ELSIF c OR d THEN z := TRUE; ELSE w := TRUE; END_IF;\n"
+              "CASE n OF 1: p := TRUE; 2, 3: q := TRUE; ELSE r := TRUE; END_CASE;\n")
+    report = differential_test(source, vectors=1024, scans=1, fan_out=fan_out)
+    assert report['equivalent'], report['mismatch']
+    assert report['compared'] == ['y', 'z', 'w', 'p', 'q', 'r']
+
+
+@pytest.mark.xfail(strict=True, reason=OUT_ONLY)
+@pytest.mark.parametrize('source', [
+    "IF a THEN y := FALSE; END_IF;\n",
+    "y := a AND NOT b;\n",
+    "IF a THEN y := TRUE; END_IF;\n",
+])
+def test_known_divergences(source):
+    report = differential_test(source, vectors=256, scans=2)
+    assert report['equivalent'], report['mismatch']
+
+
+@pytest.mark.xfail(strict=True, reason=OUT_ONLY)
+@pytest.mark.parametrize('name', ['sample_warehouse.st', 'sample-test.st'])
+def test_samples_convert_to_equivalent_ladders(name):
+    with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+        report = differential_test(f.read(), vectors=1024, scans=3)
+    assert report['compared']
+    assert report['equivalent'], report['mismatch']
@@ -0,0 +1,15 @@
+from diagnostics import ERROR, EXPECTED
+from st_parser import parse_source
+
+
+def test_call_after_broken_subscript_is_reported():
+    unit, errors, warnings = parse_source("x := a[1(2);\ny := TRUE;\n")
+    assert [(error.severity, error.code, error.span.line) for error in errors] == [(ERROR, EXPECTED, 1)]
+    assert str(errors[0]) == "Error parsing line 1: '(' - Expected ']'"
+    # Parsing resumes at the next statement
+    assert [statement.target.name for statement in unit.pous[0].body] == ['y']
+
+
+def test_call_after_broken_subscript_inside_if():
+    unit, errors, warnings = parse_source("IF a[1(2) THEN x := TRUE; END_IF;")
+    assert errors and errors[0].code == EXPECTED
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from converter import run_conversion
+from executor import ConversionExecutor, ExecutorSaturated
+from main import app
+from streaming import stream_conversion
+
+SOURCE = ''.join(f'IF In{i} AND NOT Stop THEN Out{i} := TRUE; END_IF;\n' for i in range(40))
+
+
+def nap(seconds):
+    time.sleep(seconds)
+
+
+async def collect(stream):
+    return [event async for event in stream]
+
+
+@pytest.fixture
+def pool():
+    pool = ConversionExecutor(max_workers=1, max_queue=0, timeout=10)
+    yield pool
+    pool.shutdown()
+
+
+def test_stream_matches_full_conversion(pool):
+    events = asyncio.run(collect(stream_conversion(SOURCE, pool, buffered_rungs=16)))
+    expected = run_conversion(SOURCE)
+    assert events[0][0] == 'metadata'
+    assert [data['rung'] for event, data in events if event == 'rung'] == json.loads(expected['rungs_json'])
+    event, trailer = events[-1]
+    assert event == 'trailer' and trailer['success']
+    assert trailer['rung_count'] == 40
+    assert trailer['device_map'] == expected['device_map']
+    # The conversion ran as an executor job
+    assert pool.stats()['completed'] == 1
+
+
+def test_stream_is_rejected_when_the_executor_is_full(pool):
+    async def main():
+        busy = asyncio.ensure_future(pool.run(nap, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorSaturated) as rejected:
+            await stream_conversion(SOURCE, pool).__anext__()
+        await busy
+        return rejected.value
+
+    assert asyncio.run(main()).status_code == 429
+
+
+def test_stream_endpoint_sends_ndjson():
+    with TestClient(app) as client:
+        response = client.post('/api/convert/stream', json={'source_code': SOURCE})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line['type'] for line in lines] == ['metadata'] + ['rung'] * 40 + ['trailer']
+    assert [line['index'] for line in lines[1:-1]] == list(range(40))
+
+
+def test_stalled_client_is_dropped_with_an_aborted_trailer(pool):
+    async def main():
+        stream = stream_conversion(SOURCE, pool, buffered_rungs=16, stall_timeout=0.3)
+        first = await stream.__anext__()
+        # Read nothing while the worker waits for room
+        await asyncio.sleep(1)
+        return [first] + await collect(stream)
+
+    events = asyncio.run(main())
+    event, trailer = events[-1]
+    assert event == 'trailer' and not trailer['success']
+    # Only the batch queued before the stall got through
+    assert trailer['rung_count'] == 16
+    assert [d['code'] for d in trailer['diagnostics']] == ['ST902']
+    assert trailer['errors'] == ['Conversion aborted: client read nothing for 0.3s']
+    assert pool.stats()['completed'] == 1
+
+
+def test_time_limit_ends_the_stream_with_an_aborted_trailer():
+    pool = ConversionExecutor(max_workers=1, timeout=0.5)
+
+    async def main():
+        stream = stream_conversion(SOURCE, pool, buffered_rungs=16, stall_timeout=10)
+        first = await stream.__anext__()
+        await asyncio.sleep(1)
+        return [first] + await collect(stream)
+
+    try:
+        event, trailer = asyncio.run(main())[-1]
+    finally:
+        pool.shutdown()
+    assert event == 'trailer' and not trailer['success']
+    assert trailer['errors'] == ['Conversion aborted: Conversion exceeded the 0.5s time limit']
+    assert trailer['diagnostics'][0]['code'] == 'ST902'
+    assert trailer['device_map']['inputs'] == {}
@@ -0,0 +1,43 @@
+from symbols import Symbol, SymbolTable, build_device_map
+
+
+def table():
+    symbols = SymbolTable()
+    symbols.globals.symbols['Start'] = symbols.add(Symbol('Start', 'X0', 'INPUT'))
+    pump = symbols.scope('FUNCTION_BLOCK', 'Pump')
+    pump.symbols['Run'] = symbols.add(Symbol(symbols.key(pump, 'Run'), 'M0', 'INTERNAL'))
+    main = symbols.scope('PROGRAM', 'Main')
+    main.instances['pump1'] = 'Pump'
+    return symbols, pump, main
+
+
+def test_lookups_walk_out_to_the_globals():
+    symbols, pump, main = table()
+    assert symbols.resolve(pump, 'Run').address == 'M0'
+    assert symbols.resolve(main, 'Start').address == 'X0'
+    # Function block locals are private to the block
+    assert symbols.resolve(main, 'Run') is None
+    assert symbols.key(pump, 'Run') == 'Pump.Run'
+
+
+def test_instance_members_resolve_through_the_fb_type():
+    symbols, _, main = table()
+    assert symbols.resolve(main, 'pump1.Run').address == 'M0'
+    assert symbols.resolve(main, 'pump1.Missing') is None
+
+
+def test_remove_and_unbind_keep_indexes_consistent():
+    symbols, pump, main = table()
+    symbols.unbind()
+    assert symbols.resolve(pump, 'Run') is None
+    # Still reachable by key until removed
+    assert symbols.resolve(main, 'Start').address == 'X0'
+    symbols.remove('Start')
+    assert 'X0' not in symbols.by_address
+    assert symbols.addresses() == {'Pump.Run': 'M0'}
+
+
+def test_device_map_groups_by_family():
+    assert build_device_map({'a': 'X0', 'b': 'Y1', 'c': 'M2', 'd': 'D0'}) == {
+        'inputs': {'X0': 'a'}, 'outputs': {'Y1': 'b'}, 'internals': {'M2': 'c'}, 'timers': {}, 'counters': {}
+    }
@@ -0,0 +1,87 @@
+import codecs
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache import ResultCache
+from lexer import StreamTokenizer, tokenize
+from upload import SourceDecoder
+
+SOURCE = ("VAR\n    Start : BOOL; (* 起動\n ボタン *)\n    Lamp : BOOL;\nEND_VAR\n"
+          "IF Start AND T#1s > t THEN Lamp := TRUE; END_IF; // 点灯\n")
+
+
+def streamed(chunks):
+    tokenizer = StreamTokenizer()
+    tokens = []
+    for chunk in chunks:
+        tokens += tokenizer.feed(chunk)
+    return tokens + tokenizer.close()
+
+
+def test_every_chunk_boundary_gives_the_same_tokens():
+    expected = list(tokenize(SOURCE))
+    for cut in range(1, len(SOURCE)):
+        assert streamed([SOURCE[:cut], SOURCE[cut:]]) == expected, cut
+    assert streamed(SOURCE) == expected
+
+
+def test_long_block_comment_across_many_chunks():
+    source = "a := 1;\n(*" + "comment\n" * 1000 + "*) b := 2;\n"
+    tokens = streamed(source[i:i + 7] for i in range(0, len(source), 7))
+    assert tokens == list(tokenize(source))
+    assert tokens[-4].line == 1002
+
+
+@pytest.mark.parametrize('data, encoding', [
+    (codecs.BOM_UTF8 + 'x := 1; // 日本語'.encode('utf-8'), 'utf-8-sig'),
+    ('x := 1; // 日本語'.encode('utf-16'), 'utf-16'),
+    ('x := 1; // 日本語'.encode('utf-8'), 'utf-8'),
+    ('x := 1; // 日本語'.encode('cp932'), 'cp932'),
+])
+def test_encoding_is_detected(data, encoding):
+    decoder = SourceDecoder()
+    # Split inside a multibyte character
+    text = decoder.decode(data[:-1]) + decoder.decode(data[-1:], final=True)
+    assert decoder.encoding == encoding
+    assert text == 'x := 1; // 日本語'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, 'result_cache', ResultCache())
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_shift_jis_upload_converts(client):
+    response = client.post('/api/upload-convert', files={'file': ('a.st', SOURCE.encode('cp932'))})
+    assert response.status_code == 200
+    assert response.json()['device_map']['inputs'] == {'X0': 'Start', 'X1': 'T#1s > t'}
+
+
+def test_oversized_uploads_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(main, 'UPLOAD_MAX_BYTES', 10)
+    assert client.post('/api/upload-convert', content=SOURCE.encode()).status_code == 413
+    # Without a Content-Length the limit applies while streaming
+    chunks = (SOURCE.encode()[i:i + 4] for i in range(0, len(SOURCE), 4))
+    assert client.post('/api/upload-convert', content=chunks).status_code == 413
+
+
+def test_cached_result_is_served_before_parsing(client, monkeypatch):
+    options = '{"fan_out": "coils"}'
+    first = client.post('/api/convert', json={'source_code': SOURCE, 'options': {'fan_out': 'coils'}})
+    # Same key as /api/convert for the same text and options
+    monkeypatch.setattr(main, '_run_conversion', None)
+    upload = client.post('/api/upload-convert', params={'options': options}, content=SOURCE.encode())
+    assert (upload.headers['x-cache'], upload.headers['etag']) == ('HIT', first.headers['etag'])
+    revalidated = client.post('/api/upload-convert', data={'options': options},
+                              files={'file': ('a.st', SOURCE.encode())}, headers={'If-None-Match': first.headers['etag']})
+    assert revalidated.status_code == 304
+
+
+def test_upload_options_are_checked(client):
+    assert client.post('/api/upload-convert', params={'options': '{"fan_out": "nope"}'},
+                       content=SOURCE.encode()).status_code == 400
+    assert client.post('/api/upload-convert', params={'options': '[1]'}, content=SOURCE.encode()).status_code == 400
@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+import main
+import warmup
+from allocator import MODELS
+from warmup import StartupReport, warm_up
+
+
+def test_warm_up_converts_once_per_model_in_a_stable_order(monkeypatch):
+    converted = []
+    run_conversion = warmup.run_conversion
+
+    def recording(source_code, plc_type, options):
+        converted.append(plc_type)
+        return run_conversion(source_code, plc_type, options)
+    monkeypatch.setattr(warmup, 'run_conversion', recording)
+    assert warm_up() > 0
+    # Aliases share a model and are converted once
+    assert converted == sorted({model.name for model in MODELS.values()})
+
+
+def test_first_request_skips_health_and_metrics():
+    report = StartupReport()
+    report.record_request('/api/health', 'GET', 0.1)
+    report.record_request('/metrics', 'GET', 0.1)
+    report.record_request('/api/convert', 'POST', 0.25)
+    report.record_request('/api/export', 'POST', 0.5)
+    assert report.stats()['first_request'] == {'route': '/api/convert', 'method': 'POST', 'latency': 0.25}
+
+
+def test_failed_warm_up_is_reported_in_health(monkeypatch):
+    def broken():
+        raise RuntimeError("no models")
+    monkeypatch.setattr(main, 'STARTUP_WARMUP', True)
+    monkeypatch.setattr(main, 'warm_up', broken)
+    monkeypatch.setattr(main.startup, 'warmup_error', None)
+    monkeypatch.setattr(main.startup, 'first_request', None)
+    with TestClient(main.app) as client:
+        startup = client.get('/api/health').json()['startup']
+        assert startup['warmup_error'] == 'no models'
+        assert startup['first_request'] is None
+        client.post('/api/convert', json={'source_code': 'IF a THEN y := TRUE; END_IF;'})
+        assert client.get('/api/health').json()['startup']['first_request']['route'] == '/api/convert'
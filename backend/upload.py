@@ -0,0 +1,70 @@
+import codecs
+from typing import AsyncIterator, Optional
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class SourceDecoder:
+    """Incremental bytes-to-text decoding with encoding detection
+
+    Without an explicit encoding, the first few KB decide: a BOM wins,
+    otherwise valid UTF-8 means UTF-8 and anything else is taken as
+    Shift-JIS (cp932), which is what GX Works and most Japanese vendor
+    tools export.
+    """
+
+    SNIFF_BYTES = 4096
+
+    def __init__(self, encoding: Optional[str] = None):
+        self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)() if encoding else None
+        self._head = b''
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        if self._decoder is None:
+            self._head += data
+            if len(self._head) < self.SNIFF_BYTES and not final:
+                return ''
+            data, self._head = self._head, b''
+            self.encoding = self._detect(data, final)
+            self._decoder = codecs.getincrementaldecoder(self.encoding)()
+        return self._decoder.decode(data, final)
+
+    @staticmethod
+    def _detect(head: bytes, final: bool) -> str:
+        if head.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(head, final)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            return 'cp932'
+
+
+async def read_upload(chunks: AsyncIterator[bytes], decoder: SourceDecoder, max_bytes: int, hasher=None) -> str:
+    """Decode an upload while it is still arriving
+
+    ``hasher`` receives the UTF-8 text for the result cache key, so a cached
+    result can be served before anything is parsed. Raises UploadTooLarge
+    as soon as more than ``max_bytes`` have been received.
+    """
+    parts = []
+    received = 0
+
+    def add(text: str):
+        if text:
+            parts.append(text)
+            if hasher is not None:
+                hasher.update(text.encode('utf-8'))
+
+    async for data in chunks:
+        received += len(data)
+        if received > max_bytes:
+            raise UploadTooLarge(f"File exceeds the {max_bytes} byte upload limit")
+        add(decoder.decode(data))
+    add(decoder.decode(b'', final=True))
+    return ''.join(parts)
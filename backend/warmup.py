@@ -0,0 +1,98 @@
+"""Cold start: warm-up conversion and startup timings for /api/health
+
+A freshly started process pays once for whatever is built on first use:
+the layout and condition caches, the allocation plan per PLC model and
+the response model's serializer. warm_up() converts a small built-in
+program for every model so the first real request does not, and it runs
+before the conversion worker pool forks, so the workers inherit the warm
+caches.
+"""
+import time
+from typing import Optional
+
+from allocator import MODELS
+from converter import run_conversion
+from response_formats import conversion_payload
+
+# Touches every construct the converter handles: IF/ELSIF/ELSE, CASE,
+# NOT/AND/OR, comparisons, arithmetic, timers and located variables
+SAMPLE = """PROGRAM WarmUp
+VAR
+    Start AT %IX0.0 : BOOL;
+    Stop AT %IX0.1 : BOOL;
+    Sensor : BOOL;
+    Motor AT %QX0.0 : BOOL;
+    Lamp : BOOL;
+    Running : BOOL := FALSE;
+    Count : INT := 0;
+    Mode : INT := 0;
+    T1 : TON;
+END_VAR
+
+IF Start AND NOT Stop THEN
+    Running := TRUE;
+ELSIF Stop OR (Sensor AND Count >= 10) THEN
+    Running := FALSE;
+ELSE
+    Lamp := NOT Lamp;
+END_IF;
+
+CASE Mode OF
+    0: Motor := FALSE;
+    1, 2: Motor := Running;
+ELSE
+    Motor := Running AND Sensor;
+END_CASE;
+
+IF Running AND Sensor THEN
+    Count := Count + 1;
+    T1(IN := TRUE, PT := T#2S);
+END_IF;
+Lamp := T1.Q OR Count <> 0;
+END_PROGRAM
+"""
+
+# Requests that say nothing about a cold start
+_UNTIMED_ROUTES = ('/', '/api/health', '/metrics', 'unmatched')
+
+
+def warm_up() -> float:
+    """Convert SAMPLE once per PLC model and serialize it; returns the seconds taken"""
+    start = time.perf_counter()
+    for plc_type in sorted({model.name for model in MODELS.values()}):
+        conversion_payload(run_conversion(SAMPLE, plc_type, {}), 0.0)
+    return time.perf_counter() - start
+
+
+class StartupReport:
+    """How long this process took to become useful
+
+    ``import_time`` covers importing the app module, ``warmup_time`` the
+    in-process warm-up and ``worker_warmup_time`` the first job on the
+    worker pool, which starts the pool. The first request other than
+    health and metrics is recorded with its latency.
+    """
+
+    def __init__(self):
+        self.import_time: Optional[float] = None
+        self.warmup_time: Optional[float] = None
+        self.worker_warmup_time: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+        self.first_request: Optional[dict] = None
+
+    def record_request(self, route: str, method: str, seconds: float):
+        if self.first_request is None and route not in _UNTIMED_ROUTES:
+            self.first_request = {'route': route, 'method': method, 'latency': round(seconds, 6)}
+
+    def stats(self) -> dict:
+        return {
+            'import_time': _seconds(self.import_time),
+            'warmup_time': _seconds(self.warmup_time),
+            'worker_warmup_time': _seconds(self.worker_warmup_time),
+            'warmup_error': self.warmup_error,
+            'first_request': self.first_request
+        }
+
+
+def _seconds(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
@@ -12,18 +12,58 @@ interface LadderViewComponentProps {
   height?: number;
 }
 
+// One element as placed by the server (backend/layout.py). Positions are
+// relative to the rung: `x` is the left edge of the element's grid cell
+// and `y` the height of the wire through it.
 interface LadderElement {
-  type: 'contact' | 'coil' | 'function' | 'line';
+  type: 'contact' | 'coil' | 'branch' | 'wrap';
   address?: string;
   description?: string;
+  isNormallyOpen?: boolean;
   x: number;
   y: number;
-  width: number;
+  width?: number;   // branch: the box its parallel branches occupy
+  height?: number;
+  to_y?: number;    // wrap: the row the line continues on
+}
+
+interface PlacedRung {
+  elements: LadderElement[];
+  top: number;      // Canvas y of the rung's origin
   height: number;
-  isNormallyOpen?: boolean;
-  label?: string;
+  railX: number;    // Right power rail
 }
 
+// Must match the server grid in backend/layout.py
+const FIRST_COLUMN_X = 40;
+const CELL_WIDTH = 80;
+const ROW_HEIGHT = 60;
+const LEFT_RAIL_X = 20;
+const DIAGRAM_TOP = 10;
+const RUNG_GAP = 20;
+const LABEL_SPACE = 40;
+
+const elementRight = (element: LadderElement) =>
+  element.x + (element.type === 'branch' ? element.width || 0 : CELL_WIDTH);
+
+const elementLastRow = (element: LadderElement) =>
+  element.type === 'branch' ? element.y + (element.height || ROW_HEIGHT) - ROW_HEIGHT : element.y;
+
+// Stack rungs top to bottom; everything inside a rung comes from the server
+const placeRungs = (rungs: any[]): PlacedRung[] => {
+  const placed: PlacedRung[] = [];
+  let top = DIAGRAM_TOP;
+  rungs.forEach((rung) => {
+    const elements: LadderElement[] = rung.elements || [];
+    if (elements.length === 0) return;
+    const height = Math.max(...elements.map(elementLastRow)) + LABEL_SPACE;
+    const railX = Math.max(...elements.map(elementRight));
+    placed.push({ elements, top, height, railX });
+    top += height + RUNG_GAP;
+  });
+  return placed;
+};
+
 const LadderViewComponent: React.FC<LadderViewComponentProps> = ({
   ladderData,
   width = 800,
@@ -35,20 +75,6 @@ const LadderViewComponent: React.FC<LadderViewComponentProps> = ({
   const [offset, setOffset] = useState({ x: 0, y: 0 });
   const [canvasSize, setCanvasSize] = useState({ width: 800, height: 600 });
 
-  console.log('LadderViewComponent received:', ladderData);
-  console.log('Number of rungs:', ladderData?.rungs?.length || 0);
-  if (ladderData?.rungs) {
-    ladderData.rungs.forEach((rung, index) => {
-      console.log(`Rung ${index}:`, rung);
-      console.log(`Rung ${index} elements:`, rung.elements?.length || 0);
-    });
-  }
-
-  const GRID_SIZE = 20;
-  const RUNG_HEIGHT = 100;
-  const ELEMENT_WIDTH = 60;
-  const ELEMENT_HEIGHT = 40;
-
   useEffect(() => {
     const canvas = canvasRef.current;
     if (!canvas || !ladderData) return;
@@ -56,263 +82,184 @@ const LadderViewComponent: React.FC<LadderViewComponentProps> = ({
     const ctx = canvas.getContext('2d');
     if (!ctx) return;
 
-    console.log('Canvas dimensions:', canvas.width, canvas.height);
-    console.log('Drawing with scale:', scale, 'offset:', offset);
+    ctx.fillStyle = '#ffffff';
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+    placeRungs(ladderData.rungs).forEach((rung) => drawRung(ctx, rung));
 
-    // Clear the canvas
-    ctx.clearRect(0, 0, canvas.width, canvas.height);
+  }, [ladderData, scale, offset, canvasSize]);
+
+  const drawWire = (ctx: CanvasRenderingContext2D, x1: number, y1: number, x2: number, y2: number) => {
+    ctx.strokeStyle = '#333333';
+    ctx.lineWidth = 2;
+    ctx.beginPath();
+    ctx.moveTo(x1, y1);
+    ctx.lineTo(x2, y2);
+    ctx.stroke();
+  };
 
-    // Draw ladder rungs with proper coordinates
-    console.log('Drawing ladder elements with proper positioning');
-    drawLadderRungsFixed(ctx, ladderData.rungs);
+  const drawRung = (ctx: CanvasRenderingContext2D, rung: PlacedRung) => {
+    const { elements, top, height, railX } = rung;
 
-  }, [ladderData, scale, offset, canvasSize]);
+    // Power rails
+    ctx.strokeStyle = '#333333';
+    ctx.lineWidth = 4;
+    ctx.beginPath();
+    ctx.moveTo(LEFT_RAIL_X, top);
+    ctx.lineTo(LEFT_RAIL_X, top + height);
+    ctx.moveTo(railX, top);
+    ctx.lineTo(railX, top + height);
+    ctx.stroke();
 
-  const drawGrid = (ctx: CanvasRenderingContext2D, width: number, height: number) => {
-    console.log(`Drawing grid: ${width}x${height}`);
-    ctx.strokeStyle = '#e0e0e0';
-    ctx.lineWidth = 1;
+    // The main line starts at the first element
+    drawWire(ctx, LEFT_RAIL_X, top + elements[0].y, elements[0].x, top + elements[0].y);
+
+    const coils = elements.filter((element) => element.type === 'coil');
+    let wraps = 0;
+    elements.forEach((element) => {
+      switch (element.type) {
+        case 'contact':
+          drawContact(ctx, element.x, top + element.y, element.isNormallyOpen !== false, element.address || '');
+          break;
+        case 'coil':
+          drawCoil(ctx, element.x, top + element.y, element.address || '');
+          drawWire(ctx, element.x + CELL_WIDTH, top + element.y, railX, top + element.y);
+          break;
+        case 'branch':
+          drawBranch(ctx, element, elements, top);
+          break;
+        case 'wrap':
+          wraps += 1;
+          drawWrap(ctx, element, top, wraps);
+          break;
+      }
+    });
 
-    for (let x = 0; x <= width; x += GRID_SIZE) {
-      ctx.beginPath();
-      ctx.moveTo(x, 0);
-      ctx.lineTo(x, height);
-      ctx.stroke();
+    // Coils driven by the same condition hang off one vertical line
+    if (coils.length > 1) {
+      const x = coils[0].x;
+      drawWire(ctx, x, top + coils[0].y, x, top + coils[coils.length - 1].y);
     }
+  };
 
-    for (let y = 0; y <= height; y += GRID_SIZE) {
-      ctx.beginPath();
-      ctx.moveTo(0, y);
-      ctx.lineTo(width, y);
-      ctx.stroke();
+  // A parallel block: each branch starts on the block's left edge, one row
+  // below the other; short branches are wired through to the right edge
+  const drawBranch = (ctx: CanvasRenderingContext2D, block: LadderElement, elements: LadderElement[], top: number) => {
+    const left = block.x;
+    const right = block.x + (block.width || 0);
+    const bottom = block.y + (block.height || ROW_HEIGHT);
+    const inBlock = (element: LadderElement) =>
+      element !== block && element.x >= left && elementRight(element) <= right
+      && element.y >= block.y && elementLastRow(element) < bottom;
+    // A branch is as tall as the tallest block on its first row
+    const rows: number[] = [];
+    for (let y = block.y; y < bottom;) {
+      const row = elements.filter((element) => inBlock(element) && element.y === y);
+      if (row.length === 0) break;
+      rows.push(y);
+      const end = Math.max(...row.map(elementRight));
+      if (end < right) {
+        drawWire(ctx, end, top + y, right, top + y);
+      }
+      y += Math.max(...row.map((element) => element.type === 'branch' ? element.height || ROW_HEIGHT : ROW_HEIGHT));
     }
+    if (rows.length === 0) return;
 
-    // Draw border to show canvas boundaries
-    ctx.strokeStyle = '#ff0000';
-    ctx.lineWidth = 2;
-    ctx.strokeRect(0, 0, width, height);
+    const last = rows[rows.length - 1];
+    drawWire(ctx, left, top + rows[0], left, top + last);
+    drawWire(ctx, right, top + rows[0], right, top + last);
   };
 
-  const drawLadderRungsFixed = (ctx: CanvasRenderingContext2D, rungs: any[]) => {
-    console.log('drawLadderRungsFixed called with', rungs.length, 'rungs');
+  // The line runs on in the next row band: numbered marks at both ends
+  const drawWrap = (ctx: CanvasRenderingContext2D, wrap: LadderElement, top: number, mark: number) => {
+    const y = top + wrap.y;
+    const nextY = top + (wrap.to_y ?? wrap.y);
+    drawWire(ctx, wrap.x, y, wrap.x + 12, y);
+    drawWrapMark(ctx, wrap.x + 12, y, mark);
+    drawWrapMark(ctx, LEFT_RAIL_X + 4, nextY, mark);
+    drawWire(ctx, LEFT_RAIL_X + 16, nextY, FIRST_COLUMN_X, nextY);
+  };
 
-    // Clear previous coordinate system and test shapes - focus just on ladder
-    ctx.fillStyle = '#ffffff';
-    ctx.fillRect(0, 0, ctx.canvas.width, ctx.canvas.height);
-
-    const START_Y = 80; // Start position for first rung
-    const RUNG_SPACING = 120; // Space between rungs
-    const POWER_RAIL_X = 30;
-    const ELEMENT_SPACING = 150; // Space between elements
-
-    rungs.forEach((rung, rungIndex) => {
-      const rungY = START_Y + rungIndex * RUNG_SPACING;
-      console.log(`Drawing fixed rung ${rungIndex} at y=${rungY}`);
-
-      // Draw power rail for this rung
-      ctx.strokeStyle = '#333333';
-      ctx.lineWidth = 4;
-      ctx.beginPath();
-      ctx.moveTo(POWER_RAIL_X, rungY + 20);
-      ctx.lineTo(POWER_RAIL_X, rungY + 80);
-      ctx.stroke();
-
-      if (rung.elements && rung.elements.length > 0) {
-        console.log(`Rung ${rungIndex} has ${rung.elements.length} elements`);
-
-        // Draw each element in the rung
-        rung.elements.forEach((element: LadderElement, elementIndex: number) => {
-          const elementX = POWER_RAIL_X + 60 + elementIndex * ELEMENT_SPACING;
-          const elementY = rungY + 50; // Center in rung
-
-          console.log(`Drawing element ${elementIndex}: ${element.type} (${element.address}) at (${elementX}, ${elementY})`);
-
-          // Draw the element based on its type
-          if (element.type === 'contact') {
-            drawContactFixed(ctx, elementX, elementY, element.isNormallyOpen !== false, element.address || '');
-          } else if (element.type === 'coil') {
-            drawCoilFixed(ctx, elementX, elementY, element.address || '');
-          }
-
-          // Draw connection from power rail to first element
-          if (elementIndex === 0) {
-            ctx.strokeStyle = '#666666';
-            ctx.lineWidth = 2;
-            ctx.beginPath();
-            ctx.moveTo(POWER_RAIL_X, elementY);
-            ctx.lineTo(elementX - 30, elementY);
-            ctx.stroke();
-          }
-
-          // Draw connection to next element
-          if (elementIndex < rung.elements.length - 1) {
-            const nextElementX = POWER_RAIL_X + 60 + (elementIndex + 1) * ELEMENT_SPACING;
-            ctx.strokeStyle = '#666666';
-            ctx.lineWidth = 2;
-            ctx.beginPath();
-            ctx.moveTo(elementX + 30, elementY);
-            ctx.lineTo(nextElementX - 30, elementY);
-            ctx.stroke();
-          }
-        });
-      }
-    });
+  const drawWrapMark = (ctx: CanvasRenderingContext2D, x: number, y: number, mark: number) => {
+    ctx.fillStyle = '#333333';
+    ctx.beginPath();
+    ctx.moveTo(x, y - 6);
+    ctx.lineTo(x + 12, y);
+    ctx.lineTo(x, y + 6);
+    ctx.closePath();
+    ctx.fill();
+
+    ctx.font = '10px Arial';
+    ctx.textAlign = 'center';
+    ctx.fillText(String(mark), x + 6, y - 10);
   };
 
-  const drawContactFixed = (ctx: CanvasRenderingContext2D, x: number, y: number, normallyOpen: boolean, address: string) => {
-    console.log(`Drawing fixed contact at (${x}, ${y}), address: ${address}`);
+  // Contacts and coils fill their grid cell: wire in, symbol, wire out
+  const drawContact = (ctx: CanvasRenderingContext2D, cellX: number, y: number, normallyOpen: boolean, address: string) => {
+    const x = cellX + CELL_WIDTH / 2;
 
-    // Draw connection lines
     ctx.strokeStyle = '#333333';
-    ctx.lineWidth = 3;
-
-    // Left line
+    ctx.lineWidth = 2;
     ctx.beginPath();
-    ctx.moveTo(x - 30, y);
-    ctx.lineTo(x - 10, y);
+    ctx.moveTo(cellX, y);
+    ctx.lineTo(x - 8, y);
+    ctx.moveTo(x + 8, y);
+    ctx.lineTo(cellX + CELL_WIDTH, y);
     ctx.stroke();
 
-    // Right line
+    // Contact symbol: two plates, with a diagonal when normally closed
+    ctx.lineWidth = 3;
     ctx.beginPath();
-    ctx.moveTo(x + 10, y);
-    ctx.lineTo(x + 30, y);
-    ctx.stroke();
-
-    // Contact symbol
-    if (normallyOpen) {
-      // Open contact - draw two separate lines with gap
-      ctx.beginPath();
-      ctx.moveTo(x - 10, y);
-      ctx.lineTo(x - 2, y);
-      ctx.stroke();
-
-      ctx.beginPath();
-      ctx.moveTo(x + 2, y);
-      ctx.lineTo(x + 10, y);
-      ctx.stroke();
-    } else {
-      // Closed contact - draw continuous line with diagonal
-      ctx.beginPath();
-      ctx.moveTo(x - 10, y);
-      ctx.lineTo(x + 10, y);
-      ctx.stroke();
-
-      // Diagonal line for closed contact
-      ctx.beginPath();
-      ctx.moveTo(x - 6, y - 6);
-      ctx.lineTo(x + 6, y + 6);
-      ctx.stroke();
+    ctx.moveTo(x - 8, y - 10);
+    ctx.lineTo(x - 8, y + 10);
+    ctx.moveTo(x + 8, y - 10);
+    ctx.lineTo(x + 8, y + 10);
+    if (!normallyOpen) {
+      ctx.moveTo(x - 12, y + 10);
+      ctx.lineTo(x + 12, y - 10);
     }
+    ctx.stroke();
 
-    // Draw address label
     ctx.fillStyle = '#2563eb';
     ctx.font = 'bold 12px Arial';
     ctx.textAlign = 'center';
     ctx.fillText(address, x, y + 25);
   };
 
-  const drawCoilFixed = (ctx: CanvasRenderingContext2D, x: number, y: number, address: string) => {
-    console.log(`Drawing fixed coil at (${x}, ${y}), address: ${address}`);
+  const drawCoil = (ctx: CanvasRenderingContext2D, cellX: number, y: number, address: string) => {
+    const x = cellX + CELL_WIDTH / 2;
 
-    // Draw connection lines
     ctx.strokeStyle = '#333333';
-    ctx.lineWidth = 3;
-
-    // Left line
-    ctx.beginPath();
-    ctx.moveTo(x - 30, y);
-    ctx.lineTo(x - 15, y);
-    ctx.stroke();
-
-    // Right line
+    ctx.lineWidth = 2;
     ctx.beginPath();
-    ctx.moveTo(x + 15, y);
-    ctx.lineTo(x + 30, y);
+    ctx.moveTo(cellX, y);
+    ctx.lineTo(x - 12, y);
+    ctx.moveTo(x + 12, y);
+    ctx.lineTo(cellX + CELL_WIDTH, y);
     ctx.stroke();
 
-    // Draw coil circle
+    ctx.lineWidth = 3;
     ctx.beginPath();
     ctx.arc(x, y, 12, 0, Math.PI * 2);
     ctx.stroke();
 
-    // Draw address label
     ctx.fillStyle = '#dc2626';
     ctx.font = 'bold 12px Arial';
     ctx.textAlign = 'center';
     ctx.fillText(address, x, y + 25);
   };
 
-  const drawLadderRungs = (ctx: CanvasRenderingContext2D, rungs: any[]) => {
-    console.log('drawLadderRungs called with', rungs.length, 'rungs');
-    console.log('RUNG_HEIGHT:', RUNG_HEIGHT);
-    rungs.forEach((rung, rungIndex) => {
-      const y = rungIndex * RUNG_HEIGHT + 20;
-      console.log(`Drawing rung ${rungIndex} at y=${y}, elements:`, rung.elements);
-      console.log(`Canvas height should be at least ${y + RUNG_HEIGHT + 20}`);
-
-      drawPowerRail(ctx, y);
-
-      if (rung.elements) {
-        // Simple linear drawing - just draw all elements in order
-        rung.elements.forEach((element: LadderElement, elementIndex: number) => {
-          const x = element.x || (elementIndex * ELEMENT_WIDTH + 40);
-          const elementY = element.y || y;
-          console.log(`Rung ${rungIndex} Element ${elementIndex}: ${element.type} at (${x}, ${elementY}), address: ${element.address}`);
-          drawElement(ctx, element, x, elementY);
-
-          // Draw connections between elements
-          if (elementIndex < rung.elements.length - 1) {
-            const nextElement = rung.elements[elementIndex + 1];
-            const nextX = nextElement.x || ((elementIndex + 1) * ELEMENT_WIDTH + 40);
-            const nextY = nextElement.y || y;
-
-            console.log(`Drawing connection from (${x + ELEMENT_WIDTH}, ${elementY + ELEMENT_HEIGHT/2}) to (${nextX}, ${nextY + ELEMENT_HEIGHT/2})`);
-            drawConnection(ctx, x + ELEMENT_WIDTH, elementY + ELEMENT_HEIGHT / 2,
-                           nextX, nextY + ELEMENT_HEIGHT / 2);
-          }
-        });
-
-        // Draw power rail connections
-        if (rung.elements.length > 0) {
-          const firstElement = rung.elements[0];
-          const firstX = firstElement.x || 40;
-          const firstY = firstElement.y || y;
-
-          // Connect left rail to first element
-          drawConnection(ctx, 20, firstY + ELEMENT_HEIGHT / 2, firstX, firstY + ELEMENT_HEIGHT / 2);
-        }
-      }
-    });
-  };
-
   // Calculate the total dimensions of the ladder diagram
   const calculateDiagramDimensions = () => {
     if (!ladderData || ladderData.rungs.length === 0) {
       return { width: 800, height: 400 };
     }
 
-    const START_Y = 80;
-    const RUNG_SPACING = 120;
-    const POWER_RAIL_X = 30;
-    const ELEMENT_SPACING = 150;
-
-    const maxElements = Math.max(...ladderData.rungs.map(rung => rung.elements?.length || 0));
-    const requiredWidth = POWER_RAIL_X + 60 + maxElements * ELEMENT_SPACING + 50;
-    const requiredHeight = START_Y + ladderData.rungs.length * RUNG_SPACING + 100;
-
-    const diagramWidth = Math.max(800, requiredWidth);
-    const diagramHeight = Math.max(400, requiredHeight);
-
-    console.log('Fixed layout dimensions:', {
-      rungsCount: ladderData.rungs.length,
-      maxElements: maxElements,
-      requiredWidth: requiredWidth,
-      requiredHeight: requiredHeight,
-      finalWidth: diagramWidth,
-      finalHeight: diagramHeight
-    });
+    const rungs = placeRungs(ladderData.rungs);
+    const requiredWidth = Math.max(0, ...rungs.map((rung) => rung.railX)) + 40;
+    const last = rungs[rungs.length - 1];
+    const requiredHeight = last ? last.top + last.height + DIAGRAM_TOP : 0;
 
-    return { width: diagramWidth, height: diagramHeight };
+    return { width: Math.max(800, requiredWidth), height: Math.max(400, requiredHeight) };
   };
 
   // Fit diagram to screen
@@ -330,8 +277,6 @@ const LadderViewComponent: React.FC<LadderViewComponentProps> = ({
     const scaleY = availableHeight / diagramDimensions.height;
     const newScale = Math.min(scaleX, scaleY, 1.5); // Cap at 1.5x zoom
 
-    console.log('Fit to screen:', { availableWidth, availableHeight, diagramDimensions, newScale });
-
     setScale(newScale);
     setOffset({ x: 20, y: 20 }); // Start with some padding
   };
@@ -340,7 +285,6 @@ const LadderViewComponent: React.FC<LadderViewComponentProps> = ({
   useEffect(() => {
     if (ladderData && ladderData.rungs.length > 0) {
       const dimensions = calculateDiagramDimensions();
-      console.log('Setting canvas size to:', dimensions);
       setCanvasSize(dimensions);
       // Reset scale to 1 and no offset for testing
       setScale(1);
@@ -354,142 +298,6 @@ const LadderViewComponent: React.FC<LadderViewComponentProps> = ({
     }
   }, [ladderData]);
 
-  const drawPowerRail = (ctx: CanvasRenderingContext2D, y: number) => {
-    ctx.strokeStyle = '#333';
-    ctx.lineWidth = 3;
-    ctx.beginPath();
-    ctx.moveTo(20, y);
-    ctx.lineTo(20, y + RUNG_HEIGHT - 20);
-    ctx.stroke();
-  };
-
-  const drawConnection = (ctx: CanvasRenderingContext2D, x1: number, y1: number, x2: number, y2: number) => {
-    ctx.strokeStyle = '#666';
-    ctx.lineWidth = 2;
-    ctx.beginPath();
-    ctx.moveTo(x1, y1);
-    ctx.lineTo(x2, y2);
-    ctx.stroke();
-  };
-
-  const drawElement = (ctx: CanvasRenderingContext2D, element: LadderElement, x: number, y: number) => {
-    const centerX = x + ELEMENT_WIDTH / 2;
-    const centerY = y + ELEMENT_HEIGHT / 2;
-
-    console.log(`Drawing element: ${element.type} at (${x}, ${y}), center: (${centerX}, ${centerY})`);
-
-    switch (element.type) {
-      case 'contact':
-        drawContact(ctx, centerX, centerY, element.isNormallyOpen !== false);
-        break;
-      case 'coil':
-        drawCoil(ctx, centerX, centerY);
-        break;
-      case 'function':
-        drawFunction(ctx, x, y, element.label || 'FUNC');
-        break;
-    }
-
-    if (element.address || element.description) {
-      drawLabel(ctx, centerX, y + ELEMENT_HEIGHT + 15, element.address || '');
-    }
-  };
-
-  const drawContact = (ctx: CanvasRenderingContext2D, x: number, y: number, normallyOpen: boolean) => {
-    console.log(`Drawing contact at (${x}, ${y}), normallyOpen: ${normallyOpen}`);
-    ctx.strokeStyle = '#333';
-    ctx.lineWidth = 3;
-
-    ctx.beginPath();
-    // Left line
-    ctx.moveTo(x - 20, y);
-    ctx.lineTo(x - 8, y);
-
-    if (normallyOpen) {
-      // Open contact - gap in the middle
-      ctx.moveTo(x - 8, y);
-      ctx.lineTo(x - 2, y);
-
-      // Gap
-      ctx.moveTo(x + 2, y);
-      ctx.lineTo(x + 8, y);
-    } else {
-      // Closed contact - diagonal line
-      ctx.moveTo(x - 8, y);
-      ctx.lineTo(x + 8, y);
-
-      // Diagonal line for closed contact
-      ctx.beginPath();
-      ctx.moveTo(x - 6, y - 6);
-      ctx.lineTo(x + 6, y + 6);
-      ctx.stroke();
-    }
-
-    // Right line
-    ctx.moveTo(x + 8, y);
-    ctx.lineTo(x + 20, y);
-
-    ctx.stroke();
-  };
-
-  const drawCoil = (ctx: CanvasRenderingContext2D, x: number, y: number) => {
-    console.log(`Drawing coil at (${x}, ${y})`);
-    ctx.strokeStyle = '#333';
-    ctx.lineWidth = 3;
-
-    // Left line
-    ctx.beginPath();
-    ctx.moveTo(x - 20, y);
-    ctx.lineTo(x - 15, y);
-    ctx.stroke();
-
-    // Coil circle
-    ctx.beginPath();
-    ctx.arc(x, y, 10, 0, Math.PI * 2);
-    ctx.stroke();
-
-    // Right line
-    ctx.beginPath();
-    ctx.moveTo(x + 15, y);
-    ctx.lineTo(x + 20, y);
-    ctx.stroke();
-  };
-
-  const drawFunction = (ctx: CanvasRenderingContext2D, x: number, y: number, label: string) => {
-    ctx.strokeStyle = '#333';
-    ctx.fillStyle = '#f8f8f8';
-    ctx.lineWidth = 2;
-
-    ctx.fillRect(x, y, ELEMENT_WIDTH, ELEMENT_HEIGHT);
-    ctx.strokeRect(x, y, ELEMENT_WIDTH, ELEMENT_HEIGHT);
-
-    ctx.fillStyle = '#333';
-    ctx.font = '10px Arial';
-    ctx.textAlign = 'center';
-    ctx.textBaseline = 'middle';
-    ctx.fillText(label, x + ELEMENT_WIDTH / 2, y + ELEMENT_HEIGHT / 2);
-  };
-
-  const drawLabel = (ctx: CanvasRenderingContext2D, x: number, y: number, text: string) => {
-    if (!text) return;
-
-    console.log(`Drawing label "${text}" at (${x}, ${y})`);
-    ctx.fillStyle = '#2563eb';
-    ctx.font = 'bold 12px Arial';
-    ctx.textAlign = 'center';
-    ctx.textBaseline = 'middle';
-
-    // Draw background
-    const metrics = ctx.measureText(text);
-    const padding = 4;
-    ctx.fillStyle = 'rgba(255, 255, 255, 0.9)';
-    ctx.fillRect(x - metrics.width/2 - padding, y - 10, metrics.width + padding * 2, 20);
-
-    // Draw text
-    ctx.fillStyle = '#2563eb';
-    ctx.fillText(text, x, y);
-  };
-
   const handleZoom = (delta: number) => {
     setScale(prev => Math.max(0.5, Math.min(3, prev + delta * 0.1)));
   };